@@ -0,0 +1,461 @@
+"""
+Admission Service
+Asyncio HTTP/JSON front end for the Part2 engine
+- POST /score, /recommendations, /study-plan, /reports
+- GET /reports/<id>, /health
+- POST /admin/reload (catalog hot-swap from the configured override file), served only on a
+  separate admin listener bound to localhost and checked against an optional admin token
+CPU-bound work runs off the event loop; concurrent scoring requests are
+micro-batched into one process_comprehensive_admission_batch call.
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from catalog_registry import CatalogRegistry
+from compiled_catalog import LEARNING_STYLES, STUDY_NICHES
+from micro_batcher import admission_batcher
+from report_renderer import ReportRenderer, ReportQueueFull
+from request_profiler import RequestProfiler, instrument_engine
+from memory_budget import MemoryBudget
+
+# student_data fields the engine reads, with the JSON types they must have
+STUDENT_FIELDS = {
+    'name': str,
+    'preferred_course': str,
+    'jamb_score': (int, float),
+    'jamb_subjects': list,
+    'olevel_grades': dict,
+    'learning_style': str,
+    'study_niche': str
+}
+CHOICES = {'learning_style': LEARNING_STYLES, 'study_niche': STUDY_NICHES}
+
+# Fields of a client-supplied result / recommendations that the PDF and study plan read
+RESULT_FIELDS = {'admission_status': str, 'message': str}
+PREDICTION_FIELDS = {'probability': (int, float), 'level': str, 'advice': str}
+UNIVERSITY_OPTION_FIELDS = {'university': str, 'eligible': bool, 'cutoff': (int, float)}
+RECOMMENDATION_FIELDS = {
+    'course': str,
+    'category': str,
+    'match_score': (int, float),
+    'success_probability': (int, float),
+    'salary_range': str,
+    'job_demand': str
+}
+
+REASONS = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'
+}
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _is_type(value, types):
+    types = types if isinstance(types, tuple) else (types,)
+    # JSON true/false are not numbers
+    return isinstance(value, types) and (bool in types or not isinstance(value, bool))
+
+
+def _check_fields(value, fields, prefix=''):
+    """ServiceError(400) unless value is an object holding fields with the given JSON types"""
+    if not isinstance(value, dict):
+        raise ServiceError(400, f"{prefix.rstrip('.') or 'student_data'} must be a JSON object")
+    for field, types in fields.items():
+        if field not in value:
+            raise ServiceError(400, f"Missing field: '{prefix}{field}'")
+        if not _is_type(value[field], types):
+            raise ServiceError(400, f"Field '{prefix}{field}' has the wrong type")
+
+
+def _check_recommendations(recommendations, prefix):
+    if not isinstance(recommendations, list):
+        raise ServiceError(400, f"{prefix} must be a JSON array")
+    for i, recommendation in enumerate(recommendations):
+        _check_fields(recommendation, RECOMMENDATION_FIELDS, f"{prefix}[{i}].")
+
+
+def _check_result(result):
+    """ServiceError(400) unless a client-supplied result has the shape reports and study plans read"""
+    _check_fields(result, RESULT_FIELDS, 'result.')
+    if result.get('success_prediction'):
+        _check_fields(result['success_prediction'], PREDICTION_FIELDS, 'result.success_prediction.')
+    options = result.get('university_options')
+    if options:
+        if not isinstance(options, dict):
+            raise ServiceError(400, 'result.university_options must be a JSON object')
+        for code, option in options.items():
+            _check_fields(option, UNIVERSITY_OPTION_FIELDS, f"result.university_options.{code}.")
+    if 'recommendations' in result:
+        _check_recommendations(result['recommendations'], 'result.recommendations')
+
+
+def _json_default(value):
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def json_response(status, payload, headers=None):
+    body = json.dumps(payload, default=_json_default).encode('utf-8')
+    return status, dict({'Content-Type': 'application/json'}, **(headers or {})), body
+
+
+class AdmissionService:
+    def __init__(self, advanced_system, enhanced_features, report_renderer=None, executor=None,
+                 max_inflight=64, max_body_bytes=1024 * 1024, max_batch_size=32, max_wait_ms=5, registry=None,
+                 profiler=None, memory_budget_bytes=None, admin_token=None):
+        self.registry = registry or CatalogRegistry(advanced_system.system, advanced_system)
+        # Batchers belong to a catalog snapshot; retire them when it is swapped out
+        self.registry.subscribe(lambda old, new: old.close())
+        self.features = enhanced_features
+        self.reports = report_renderer or ReportRenderer()
+        self.profiler = profiler
+        instrument_engine(profiler, enhanced_features=enhanced_features, report_renderer=self.reports)
+        self.executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix='scoring')
+        self.max_inflight = max_inflight
+        self.max_body_bytes = max_body_bytes
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.admin_token = admin_token
+        self.memory_budget = None
+        self._enforcing = None
+        if memory_budget_bytes:
+            self.memory_budget = MemoryBudget(memory_budget_bytes, self.registry, self.reports, enhanced_features)
+        self.inflight = 0
+        self.started = time.time()
+        self.requests_served = 0
+        self.requests_rejected = 0
+
+    async def handle(self, method, path, body=b''):
+        """Dispatch one request; returns (status, headers, body bytes)"""
+        path = path.split('?', 1)[0].rstrip('/') or '/'
+        if path == '/health':
+            return self._health()
+
+        if self.inflight >= self.max_inflight:
+            self.requests_rejected += 1
+            return json_response(503, {'error': 'Server busy, retry shortly'}, {'Retry-After': '1'})
+        if len(body) > self.max_body_bytes:
+            return json_response(413, {'error': 'Request body too large'})
+
+        self.inflight += 1
+        try:
+            return await self._route(method, path, body)
+        except ServiceError as exc:
+            return json_response(exc.status, {'error': exc.message})
+        except Exception as exc:
+            return json_response(500, {'error': f"{type(exc).__name__}: {exc}"})
+        finally:
+            self.inflight -= 1
+            self.requests_served += 1
+            self._enforce_memory_budget()
+
+    def _enforce_memory_budget(self):
+        # Eviction can spill a model to disk, so it runs on the executor, one pass at a time
+        if self.memory_budget is None or (self._enforcing is not None and not self._enforcing.done()):
+            return
+        self._enforcing = self.executor.submit(self.memory_budget.enforce)
+
+    def _batcher(self):
+        """(snapshot, batcher) for the live catalog snapshot"""
+        return self.registry.resource('admission_batcher', self._build_batcher)
+
+    def _build_batcher(self, snapshot):
+        # Each snapshot has its own engine instance to instrument
+        instrument_engine(self.profiler, snapshot.part2)
+        return admission_batcher(snapshot.part2, self.max_batch_size, self.max_wait_ms)
+
+    async def _route(self, method, path, body):
+        if path.startswith('/reports/'):
+            if method != 'GET':
+                raise ServiceError(405, 'Use GET to fetch a report')
+            return self._get_report(path[len('/reports/'):])
+
+        routes = {
+            '/score': self._score,
+            '/recommendations': self._recommendations,
+            '/study-plan': self._study_plan,
+            '/reports': self._create_report
+        }
+        handler = routes.get(path)
+        if handler is None:
+            raise ServiceError(404, f"Unknown endpoint {path}")
+        if method != 'POST':
+            raise ServiceError(405, f"Use POST for {path}")
+        return await handler(self._parse_json(body))
+
+    def _parse_json(self, body):
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise ServiceError(400, 'Body must be JSON')
+        if not isinstance(payload, dict):
+            raise ServiceError(400, 'Body must be a JSON object')
+        return payload
+
+    def _student_data(self, payload):
+        """The request's student_data (or the payload itself), checked for the fields the engine reads"""
+        student_data = payload.get('student_data', payload)
+        _check_fields(student_data, STUDENT_FIELDS)
+        if 'state' in student_data and not isinstance(student_data['state'], str):
+            raise ServiceError(400, "Field 'state' has the wrong type")
+        for field, choices in CHOICES.items():
+            if student_data[field] not in choices:
+                raise ServiceError(400, f"Field '{field}' must be one of {', '.join(choices)}")
+        if not all(isinstance(subject, str) for subject in student_data['jamb_subjects']):
+            raise ServiceError(400, "Field 'jamb_subjects' must be a list of strings")
+        if not all(isinstance(grade, str) for grade in student_data['olevel_grades'].values()):
+            raise ServiceError(400, "Field 'olevel_grades' must map subjects to grade strings")
+        return student_data
+
+    async def _admission(self, student_data):
+        # A swap can retire the snapshot (closing its batcher) between lookup and submit; retry on the new one
+        while True:
+            snapshot, batcher = self._batcher()
+            try:
+                future = batcher.submit(student_data)
+                break
+            except RuntimeError:
+                if self.registry.current() is snapshot:
+                    raise
+        return await asyncio.wrap_future(future)
+
+    async def _scored(self, payload):
+        """(student_data, result, recommendations) from a payload, scoring if needed"""
+        student_data = self._student_data(payload)
+        result = payload.get('result')
+        if result is None:
+            result = await self._admission(student_data)
+        else:
+            _check_result(result)
+        if 'recommendations' in payload:
+            _check_recommendations(payload['recommendations'], 'recommendations')
+        recommendations = payload.get('recommendations', result.get('recommendations', []))
+        return student_data, result, recommendations
+
+    async def _score(self, payload):
+        result = await self._admission(self._student_data(payload))
+        return json_response(200, result)
+
+    async def _recommendations(self, payload):
+        result = await self._admission(self._student_data(payload))
+        return json_response(200, {'recommendations': result['recommendations']})
+
+    async def _study_plan(self, payload):
+        student_data, result, recommendations = await self._scored(payload)
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(
+            self.executor, self.features.generate_study_plan, student_data, result, recommendations,
+            self.registry.current().catalog)
+        return json_response(200, plan)
+
+    async def _create_report(self, payload):
+        student_data, result, recommendations = await self._scored(payload)
+        try:
+            key, future = self.reports.submit(student_data, result, recommendations)
+        except ReportQueueFull:
+            return json_response(503, {'error': 'Report queue full, retry shortly'}, {'Retry-After': '1'})
+        return json_response(202, {
+            'report_id': key,
+            'status': 'ready' if future.done() else 'pending',
+            'url': f"/reports/{key}"
+        })
+
+    async def handle_admin(self, method, path, headers=None):
+        """Dispatch one admin-listener request; returns (status, headers, body bytes)"""
+        path = path.split('?', 1)[0].rstrip('/') or '/'
+        token = (headers or {}).get('x-admin-token', '')
+        if self.admin_token is not None and not hmac.compare_digest(token.encode(), self.admin_token.encode()):
+            return json_response(401, {'error': 'Missing or wrong X-Admin-Token'})
+        if path != '/admin/reload':
+            return json_response(404, {'error': f"Unknown admin endpoint {path}"})
+        if method != 'POST':
+            return json_response(405, {'error': 'Use POST for /admin/reload'})
+        try:
+            return await self._reload_catalog()
+        except ServiceError as exc:
+            return json_response(exc.status, {'error': exc.message})
+
+    async def _reload_catalog(self):
+        """Rebuild the catalog from the configured override file off the event loop and swap it in"""
+        future = self.registry.reload_async()
+        try:
+            snapshot = await asyncio.wrap_future(future)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            raise ServiceError(400, f"Catalog reload failed, still serving version {self.registry.version}: {exc}")
+        return json_response(200, snapshot.info())
+
+    def _get_report(self, key):
+        pdf_bytes = self.reports.get(key)
+        if pdf_bytes is not None:
+            return 200, {'Content-Type': 'application/pdf'}, pdf_bytes
+        if self.reports.is_pending(key):
+            return json_response(202, {'report_id': key, 'status': 'pending'}, {'Retry-After': '1'})
+        raise ServiceError(404, 'Report not found or expired')
+
+    def _health(self):
+        return json_response(200, {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'inflight': self.inflight,
+            'max_inflight': self.max_inflight,
+            'requests_served': self.requests_served,
+            'requests_rejected': self.requests_rejected,
+            'catalog': self.registry.info(),
+            'batching': self._batcher()[1].metrics(),
+            'report_cache': self.reports.cache.stats(),
+            'profiling': self.profiler.metrics() if self.profiler else None,
+            'memory': self.memory_budget.report() if self.memory_budget else None
+        })
+
+    async def _handle_admin_connection(self, reader, writer):
+        await self._handle_connection(reader, writer, admin=True)
+
+    async def _handle_connection(self, reader, writer, admin=False):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), timeout=30)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write(writer, *json_response(400, {'error': 'Malformed request line'}), keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0) or 0)
+                if length > self.max_body_bytes:
+                    await self._write(writer, *json_response(413, {'error': 'Request body too large'}), keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                if admin:
+                    status, response_headers, response_body = await self.handle_admin(method.upper(), target, headers)
+                else:
+                    status, response_headers, response_body = await self.handle(method.upper(), target, body)
+                await self._write(writer, status, response_headers, response_body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, headers, body, keep_alive=True):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        headers = dict(headers, **{'Content-Length': str(len(body)),
+                                   'Connection': 'keep-alive' if keep_alive else 'close'})
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8080, admin_port=None):
+        """Serve scoring on host:port and, if admin_port is given, /admin/reload on localhost only"""
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        if admin_port is None:
+            async with server:
+                await server.serve_forever()
+            return
+        admin_server = await asyncio.start_server(self._handle_admin_connection, '127.0.0.1', admin_port)
+        async with server, admin_server:
+            await asyncio.gather(server.serve_forever(), admin_server.serve_forever())
+
+
+class LocalResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class LocalClient:
+    """In-process client: calls the service dispatcher without sockets"""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def get(self, path):
+        return LocalResponse(*await self.service.handle('GET', path))
+
+    async def post(self, path, payload):
+        body = json.dumps(payload, default=_json_default).encode('utf-8')
+        return LocalResponse(*await self.service.handle('POST', path, body))
+
+    async def admin_post(self, path, token=None):
+        headers = {'x-admin-token': token} if token is not None else {}
+        return LocalResponse(*await self.service.handle_admin('POST', path, headers))
+
+
+def main():
+    from enhanced_features import EnhancedFeatures
+
+    parser = argparse.ArgumentParser(description='Admission scoring HTTP service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-inflight', type=int, default=64)
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--catalog-overrides', help='JSON file of catalog overrides (reloaded when it changes)')
+    parser.add_argument('--profile-every', type=int, default=0, help='cProfile 1 in N requests (0 = off)')
+    parser.add_argument('--profile-slow-ms', type=float, help='Sample stacks of requests slower than this')
+    parser.add_argument('--profile-dir', default='data/profiles')
+    parser.add_argument('--admin-port', type=int,
+                        help='Serve POST /admin/reload on 127.0.0.1:PORT (off by default)')
+    parser.add_argument('--admin-token', default=os.environ.get('ADMISSION_ADMIN_TOKEN'),
+                        help='Required X-Admin-Token for the admin listener (default: $ADMISSION_ADMIN_TOKEN)')
+    parser.add_argument('--memory-budget-mb', type=float,
+                        help='Evict PDF cache, result cache, then cold models beyond this many MB')
+    args = parser.parse_args()
+
+    registry = CatalogRegistry(override_path=args.catalog_overrides)
+    if args.catalog_overrides:
+        registry.watch()
+    snapshot = registry.current()
+    profiler = None
+    if args.profile_every or args.profile_slow_ms is not None:
+        profiler = RequestProfiler(args.profile_dir, args.profile_every, args.profile_slow_ms)
+    service = AdmissionService(snapshot.part2, EnhancedFeatures(), registry=registry,
+                               max_inflight=args.max_inflight, max_batch_size=args.max_batch_size,
+                               max_wait_ms=args.max_wait_ms, profiler=profiler,
+                               memory_budget_bytes=int(args.memory_budget_mb * 1024 * 1024) if args.memory_budget_mb else None,
+                               admin_token=args.admin_token)
+    print(f"Admission service listening on http://{args.host}:{args.port}")
+    if args.admin_port is not None:
+        print(f"Admin listener on http://127.0.0.1:{args.admin_port}")
+    asyncio.run(service.serve(args.host, args.port, args.admin_port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Applicant Index
+University-side reverse query: every applicant in a stored cohort eligible
+for a course x university offering, ranked by predicted success
+"""
+
+import numpy as np
+from cohort import Cohort
+
+
+class ApplicantIndex:
+    def __init__(self, advanced_system, cohort):
+        self.engine = advanced_system
+        self.catalog = advanced_system.system.get_compiled_catalog()
+        self.cohort = cohort
+
+        # Sorted score column: row ids ordered by descending JAMB score
+        scores = cohort.jamb_scores
+        self.order = np.argsort(-scores.astype(np.float64), kind='stable')
+        self.sorted_scores = scores[self.order]
+
+        # Per-course postings (rows passing JAMB + O'Level, in score order)
+        self._postings = {}
+        self._success = {}
+
+    @classmethod
+    def from_profiles(cls, advanced_system, profiles):
+        catalog = advanced_system.system.get_compiled_catalog()
+        return cls(advanced_system, Cohort.from_profiles(catalog, profiles))
+
+    def postings(self, course_id):
+        """Score-ordered rows meeting the JAMB combination and O'Level credits"""
+        if course_id not in self._postings:
+            cohort = self.cohort
+            valid = self.catalog.subject_valid(course_id, cohort)
+            self._postings[course_id] = self.order[valid[self.order]]
+        return self._postings[course_id]
+
+    def success(self, course_id):
+        """Predicted success aligned with postings(course_id)"""
+        if course_id not in self._success:
+            rows = self.postings(course_id)
+            course = self.catalog.course_names[course_id]
+            self._success[course_id] = self.engine.predict_success_for_rows(course, self.cohort, rows)
+        return self._success[course_id]
+
+    def warm(self, courses=None):
+        """Build postings and success columns ahead of queries"""
+        for course in courses or self.catalog.course_names:
+            course_id = self.catalog.course_index[course]
+            self.postings(course_id)
+            self.success(course_id)
+
+    def eligible_rows(self, course_id, cutoff):
+        """Range scan of a course posting down to the cutoff score"""
+        rows = self.postings(course_id)
+        scores = self.cohort.jamb_scores[rows]
+        # Postings are descending by score -> search the negated (ascending) column
+        end = np.searchsorted(-scores.astype(np.float64), -float(cutoff), side='right')
+        return rows[:end], self.success(course_id)[:end]
+
+    def eligible_applicants(self, course, uni_code, page=1, page_size=50):
+        """All applicants eligible for course at uni_code, ranked by predicted success"""
+        result = {
+            'course': course,
+            'university_code': uni_code,
+            'university': None,
+            'cutoff': None,
+            'total': 0,
+            'page': page,
+            'page_size': page_size,
+            'applicants': []
+        }
+
+        offering = self.catalog.offering(course, uni_code)
+        if offering is None:
+            return result
+        course_id, uni_id = offering
+
+        cutoff = self.catalog.cutoffs[course_id, uni_id]
+        result['university'] = self.catalog.system.universities[uni_code]['name']
+        result['cutoff'] = self.catalog.system.courses[course]['universities'][uni_code]['cutoff']
+
+        rows, success = self.eligible_rows(course_id, cutoff)
+        result['total'] = len(rows)
+
+        # Rank by predicted success, then JAMB score (rows are already score ordered)
+        ranking = np.argsort(-success, kind='stable')
+        start = max(page - 1, 0) * page_size
+        page_idx = ranking[start:start + page_size]
+
+        cohort = self.cohort
+        catchment = self.catalog.catchment[uni_id]
+        for idx in page_idx:
+            row = int(rows[idx])
+            state = int(cohort.states[row])
+            result['applicants'].append({
+                'row': row,
+                'name': cohort.name(row),
+                'jamb_score': cohort.jamb_scores[row].item(),
+                'state': self.catalog.states[state] if state >= 0 else '',
+                'success_probability': float(success[idx]),
+                'catchment_advantage': bool(state >= 0 and catchment[state])
+            })
+
+        return result
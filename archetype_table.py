@@ -0,0 +1,250 @@
+"""
+Archetype Table
+Precomputed recommendation candidates for quantized applicant archetypes:
+- An archetype is a JAMB subject combination, a score bucket (between consecutive course
+  minimum cutoffs), the credit pattern over subjects some course requires, and whether the
+  5-credit minimum is met
+- Which courses recommend_intelligent_alternatives may return is fixed within an archetype;
+  match scores still depend on exact grades, so the table stores each archetype's candidate
+  courses and only those are ranked for a student
+- Archetypes are enumerated offline from an applicant population (generated, or a
+  Parquet/Arrow cohort) and saved as a compact .npz
+- Profiles outside the table, and tables built for another catalog, fall back to the exact scan
+
+    python archetype_table.py build --students 500000 --output data/archetypes.npz
+    python archetype_table.py check --table data/archetypes.npz --profiles 2000 --seed 1
+"""
+
+import argparse
+import bisect
+import sys
+import time
+import numpy as np
+from catalog_registry import catalog_fingerprint
+from compiled_catalog import GRADE_VALUES
+
+CREDIT_VALUE = GRADE_VALUES['C6']
+MIN_CREDITS = 5
+
+
+def score_edges(catalog):
+    """Distinct course minimum cutoffs; a score's bucket is how many of them it reaches"""
+    return sorted(set(catalog.min_cutoff.tolist()))
+
+
+def required_mask(catalog):
+    """O'Level vocab bits some course requires a credit in"""
+    mask = 0
+    for required in catalog.olevel_required:
+        mask |= int(required)
+    return mask
+
+
+def cohort_archetypes(catalog, cohort):
+    """(jamb masks, credit patterns, buckets) per cohort row; rows that can have no candidates are all zero"""
+    edges = np.array(score_edges(catalog))
+    buckets = np.searchsorted(edges, cohort.jamb_scores, side='right')
+    empty = (cohort.credits < MIN_CREDITS) | (buckets == 0)
+    jamb_masks = np.where(empty, np.uint64(0), cohort.jamb_masks.astype(np.uint64))
+    patterns = np.where(empty, np.uint64(0), cohort.credit_masks.astype(np.uint64) & np.uint64(required_mask(catalog)))
+    return jamb_masks, patterns, np.where(empty, 0, buckets).astype(np.uint64)
+
+
+class ArchetypeTable:
+    def __init__(self, catalog, fingerprint, jamb_masks, credit_patterns, buckets, candidates):
+        self.catalog = catalog
+        self.fingerprint = fingerprint
+        self.edges = score_edges(catalog)
+        self.required_mask = required_mask(catalog)
+        self.arrays = {'jamb_masks': jamb_masks, 'credit_patterns': credit_patterns,
+                       'buckets': buckets, 'candidates': candidates}
+        self._pattern_shift = len(catalog.jamb_vocab)
+        self._bucket_shift = self._pattern_shift + len(catalog.olevel_vocab)
+        self._table = {
+            self._pack(jamb, pattern, bucket): bits
+            for jamb, pattern, bucket, bits in zip(jamb_masks.tolist(), credit_patterns.tolist(),
+                                                   buckets.tolist(), candidates.tolist())
+        }
+        # Students with too few credits or a score below every cutoff have no candidates
+        self._table.setdefault(0, 0)
+        self._arrays = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _pack(self, jamb, pattern, bucket):
+        return jamb | pattern << self._pattern_shift | bucket << self._bucket_shift
+
+    def __len__(self):
+        return len(self._table)
+
+    @classmethod
+    def build(cls, catalog, cohorts):
+        """Table over every archetype occurring in the given Cohorts"""
+        seen = []
+        for cohort in cohorts:
+            seen.append(np.unique(np.column_stack(cohort_archetypes(catalog, cohort)), axis=0))
+        rows = np.unique(np.concatenate(seen), axis=0) if seen else np.zeros((0, 3), dtype=np.uint64)
+        jamb_masks, credit_patterns, buckets = rows[:, 0], rows[:, 1], rows[:, 2]
+
+        # Candidate bits use the same rules as process_comprehensive_admission_cohort
+        edges = np.array(score_edges(catalog))
+        course_buckets = np.searchsorted(edges, catalog.min_cutoff, side='right')
+        credits = np.where(buckets > 0, MIN_CREDITS, 0)
+        candidates = np.zeros(len(rows), dtype=np.uint64)
+        for course_id in range(len(catalog.course_names)):
+            valid = (catalog.jamb_valid(course_id, jamb_masks) &
+                     catalog.olevel_valid(course_id, credit_patterns, credits) &
+                     (buckets >= course_buckets[course_id]))
+            candidates |= valid.astype(np.uint64) << np.uint64(course_id)
+        return cls(catalog, catalog_fingerprint(catalog.system), jamb_masks, credit_patterns, buckets, candidates)
+
+    def save(self, path):
+        np.savez_compressed(path, fingerprint=np.array(self.fingerprint),
+                            courses=np.array(self.catalog.course_names), **self.arrays)
+
+    @classmethod
+    def load(cls, path, catalog):
+        data = np.load(path)
+        if data['courses'].tolist() != list(catalog.course_names):
+            raise ValueError(f"{path} was built for a different course list")
+        return cls(catalog, str(data['fingerprint']), data['jamb_masks'], data['credit_patterns'],
+                   data['buckets'], data['candidates'])
+
+    def attach(self, advanced_system):
+        """Serve advanced_system's candidate lookups from this table if it was built for the same catalog"""
+        if catalog_fingerprint(advanced_system.system) != self.fingerprint:
+            return False
+        advanced_system.recommendation_table = self
+        return True
+
+    @classmethod
+    def attach_file(cls, path, advanced_system):
+        """Load and attach a table file; None if there is no path or the catalog has changed"""
+        if not path:
+            return None
+        try:
+            table = cls.load(path, advanced_system.system.get_compiled_catalog())
+        except ValueError:
+            # Built for another course list (e.g. a reload added a course): use the exact scan
+            return None
+        return table if table.attach(advanced_system) else None
+
+    def key(self, student_profile):
+        """Archetype key of a student_data dict"""
+        catalog = self.catalog
+        jamb = 0
+        for subject in student_profile.get('jamb_subjects', []):
+            bit = catalog.jamb_bits.get(subject)
+            if bit is not None:
+                jamb |= 1 << bit
+
+        credits = 0
+        pattern = 0
+        for subject, grade in student_profile.get('olevel_grades', {}).items():
+            if GRADE_VALUES.get(grade, 0) >= CREDIT_VALUE:
+                credits += 1
+                bit = catalog.olevel_bits.get(subject)
+                if bit is not None:
+                    pattern |= 1 << bit
+
+        bucket = bisect.bisect_right(self.edges, student_profile.get('jamb_score', 0))
+        if credits < MIN_CREDITS or bucket == 0:
+            return 0
+        return self._pack(jamb, pattern & self.required_mask, bucket)
+
+    def candidates(self, student_profile):
+        """Read-only bool array of candidate courses, or None if the archetype is not in the table"""
+        bits = self._table.get(self.key(student_profile))
+        if bits is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        array = self._arrays.get(bits)
+        if array is None:
+            array = np.array([bits >> course_id & 1 for course_id in range(len(self.catalog.course_names))],
+                             dtype=bool)
+            array.flags.writeable = False
+            self._arrays[bits] = array
+        return array
+
+    def info(self):
+        return {'archetypes': len(self._table), 'hits': self.hits, 'misses': self.misses}
+
+
+def _build(args):
+    from ultimate_admission_system import UltimateAdmissionSystem
+    from cohort_generator import CohortGenerator
+
+    catalog = UltimateAdmissionSystem().get_compiled_catalog()
+    started = time.perf_counter()
+    if args.input:
+        from arrow_ingest import iter_cohorts
+        cohorts = iter_cohorts(catalog, args.input)
+    else:
+        cohorts = CohortGenerator(catalog, seed=args.seed).iter_chunks(args.students)
+    table = ArchetypeTable.build(catalog, cohorts)
+    table.save(args.output)
+    print(f"{len(table)} archetypes in {time.perf_counter() - started:.1f}s -> {args.output}")
+    return 0
+
+
+def _check(args):
+    from ultimate_admission_system import UltimateAdmissionSystem
+    from ultimate_admission_system_part2 import UltimateAdmissionSystemPart2
+    from cohort_generator import CohortGenerator
+    from result_records import to_plain
+
+    part1 = UltimateAdmissionSystem()
+    exact = UltimateAdmissionSystemPart2(part1)
+    tabled = UltimateAdmissionSystemPart2(part1)
+    table = ArchetypeTable.load(args.table, part1.get_compiled_catalog())
+    if not table.attach(tabled):
+        print("FAIL: table was built for a different catalog")
+        return 1
+
+    cohort = CohortGenerator(part1.get_compiled_catalog(), seed=args.seed).generate(args.profiles)
+    profiles = [cohort.profile(row) for row in range(len(cohort))]
+
+    started = time.perf_counter()
+    for profile in profiles:
+        table.key(profile)
+    lookup_us = (time.perf_counter() - started) / len(profiles) * 1e6
+
+    timings = {}
+    outputs = {}
+    for name, engine in (('exact', exact), ('table', tabled)):
+        started = time.perf_counter()
+        outputs[name] = [engine.recommend_intelligent_alternatives(profile) for profile in profiles]
+        timings[name] = time.perf_counter() - started
+    mismatches = sum(to_plain(a) != to_plain(b) for a, b in zip(outputs['exact'], outputs['table']))
+
+    info = table.info()
+    print(f"{len(profiles)} profiles, {info['archetypes']} archetypes, hit rate {info['hits'] / len(profiles):.1%}")
+    print(f"  key lookup   {lookup_us:.1f} us/profile")
+    print(f"  exact scan   {timings['exact'] / len(profiles) * 1e3:.3f} ms/profile")
+    print(f"  table        {timings['table'] / len(profiles) * 1e3:.3f} ms/profile")
+    print(f"  mismatches   {mismatches}")
+    return 1 if mismatches else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or check a recommendation archetype table')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='Enumerate archetypes from a cohort and save the table')
+    build.add_argument('--input', help='Parquet/Arrow cohort file (default: a generated cohort)')
+    build.add_argument('--students', type=int, default=500000)
+    build.add_argument('--seed', type=int, default=0)
+    build.add_argument('--output', default='data/archetypes.npz')
+
+    check = commands.add_parser('check', help='Compare table lookups against the exact scan')
+    check.add_argument('--table', default='data/archetypes.npz')
+    check.add_argument('--profiles', type=int, default=2000)
+    check.add_argument('--seed', type=int, default=1)
+
+    args = parser.parse_args()
+    return _build(args) if args.command == 'build' else _check(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Arrow Ingest
+Reads Arrow/Parquet cohorts straight into Cohort columns, without a student_data dict per row:
+- jamb_score: numeric column (read zero-copy when the batch has no nulls)
+- jamb_subjects: list<string> column -> JAMB bitmasks
+- O'Level grades: a map<string, string|int> column (subject -> grade), and/or wide
+  'olevel:<Subject>' columns holding grade strings or grade values (0 / null = not taken)
+- learning_style, study_niche, state, preferred_course: string or dictionary columns
+- name, and state / preferred_course values outside the catalog: read lazily per row
+- Grades outside GRADE_VALUES count as F9, as in Cohort.from_profiles; rows holding one
+  keep their original grades, read lazily per row
+Python objects are created per distinct string value (Arrow dictionaries), never per row.
+Subjects outside the catalog vocabularies count toward O'Level totals but have no column.
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from cohort import Cohort
+from compiled_catalog import GRADE_NAMES, GRADE_VALUES, LEARNING_STYLES, STUDY_NICHES
+
+DEFAULT_COLUMNS = {
+    'jamb_score': 'jamb_score',
+    'jamb_subjects': 'jamb_subjects',
+    'olevel_grades': 'olevel_grades',
+    'learning_style': 'learning_style',
+    'study_niche': 'study_niche',
+    'state': 'state',
+    'preferred_course': 'preferred_course',
+    'name': 'name'
+}
+RAW_FIELDS = ('state', 'preferred_course')
+GRADE_PREFIX = 'olevel:'
+CREDIT_VALUE = GRADE_VALUES['C6']
+
+
+def dictionary_codes(array, values, unknown=-1, missing=-1):
+    """Positions in values for each row of a string/dictionary array (nulls -> missing)"""
+    if not pa.types.is_dictionary(array.type):
+        array = pc.dictionary_encode(array)
+    index = {value: i for i, value in enumerate(values)}
+    lookup = np.array([index.get(value, unknown) for value in array.dictionary.to_pylist()] + [missing],
+                      dtype=np.int64)
+    indices = array.indices.fill_null(len(lookup) - 1).to_numpy(zero_copy_only=False)
+    return lookup[indices]
+
+
+def _numeric(array, fill=0):
+    """NumPy view of a numeric array (zero-copy unless it has nulls)"""
+    if array.null_count:
+        array = array.fill_null(fill)
+    return array.to_numpy(zero_copy_only=array.type != pa.bool_())
+
+
+def _grade_values(array, null_value=0):
+    """(grade values (1-9, 0 = not taken), unknown grade string mask) for a string or integer grade array"""
+    if pa.types.is_integer(array.type):
+        return _numeric(array, null_value).astype(np.int8, copy=False), np.zeros(len(array), dtype=bool)
+    grades = list(GRADE_VALUES)
+    # Unknown grade strings count as F9, as in Cohort.from_profiles
+    codes = dictionary_codes(array, grades, unknown=len(grades), missing=len(grades) + 1)
+    values = np.array([GRADE_VALUES[grade] for grade in grades] + [1, null_value], dtype=np.int8)[codes]
+    return values, codes == len(grades)
+
+
+def _flatten(array):
+    """(values, parent row) for a list or map array; offsets respect slicing and nulls"""
+    offsets = array.offsets.to_numpy()
+    parents = np.repeat(np.arange(len(array)), np.diff(offsets))
+    # .values is the whole child array; a zero-copy slice keeps just this batch's entries
+    return array.values.slice(offsets[0], offsets[-1] - offsets[0]), parents
+
+
+class _ArrowGrades:
+    """Original olevel_grades of flagged rows (None for other rows), converting one row at a time"""
+
+    def __init__(self, rows, graded=None, wide=()):
+        self.rows = rows
+        self.graded = graded
+        self.wide = list(wide)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, row):
+        if not self.rows[row]:
+            return None
+        grades = dict(self.graded[row].as_py() or []) if self.graded is not None else {}
+        for subject, array in self.wide:
+            value = array[row].as_py()
+            if value:
+                grades[subject] = GRADE_NAMES.get(value, value) if isinstance(value, int) else value
+        return grades
+
+
+class _ChainedLookup:
+    """Per-row lookup across consecutive cohorts' lookups (None rows where a cohort has none)"""
+
+    def __init__(self, lookups, lengths):
+        self.lookups = lookups
+        self.starts = np.cumsum([0] + lengths)
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def __getitem__(self, row):
+        part = int(np.searchsorted(self.starts, row, side='right')) - 1
+        lookup = self.lookups[part]
+        return lookup[row - int(self.starts[part])] if lookup is not None else None
+
+
+class _ArrowNames:
+    """String lookup over an Arrow column, converting one row at a time"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, row):
+        return self.array[row].as_py() or ''
+
+
+def cohort_from_batch(catalog, batch, columns=None):
+    """Cohort for one Arrow RecordBatch"""
+    names = dict(DEFAULT_COLUMNS, **(columns or {}))
+    fields = set(batch.schema.names)
+    n = batch.num_rows
+
+    def column(key):
+        name = names[key]
+        return batch.column(name) if name in fields else None
+
+    scores = column('jamb_score')
+    if scores is None:
+        jamb_scores = np.zeros(n, dtype=np.int32)
+    else:
+        jamb_scores = _numeric(scores)
+        if jamb_scores.dtype.kind not in 'iu':
+            jamb_scores = jamb_scores.astype(np.float64, copy=False)
+
+    jamb_masks = np.zeros(n, dtype=np.uint64)
+    subjects = column('jamb_subjects')
+    if subjects is not None:
+        flat, parents = _flatten(subjects)
+        bits = dictionary_codes(flat, catalog.jamb_vocab)
+        known = bits >= 0
+        np.bitwise_or.at(jamb_masks, parents[known], np.left_shift(np.uint64(1), bits[known].astype(np.uint64)))
+
+    grades = np.zeros((n, len(catalog.olevel_vocab)), dtype=np.int8)
+    credit_masks = np.zeros(n, dtype=np.uint64)
+    credits = np.zeros(n, dtype=np.int16)
+    olevel_counts = np.zeros(n, dtype=np.int16)
+    olevel_totals = np.zeros(n, dtype=np.int32)
+    raw_grades = np.zeros(n, dtype=bool)
+    wide = []
+
+    graded = column('olevel_grades')
+    if graded is not None:
+        # map<subject, grade>: one flat pass over all (student, subject, grade) entries
+        entries, parents = _flatten(graded)
+        bits = dictionary_codes(entries.field(0), catalog.olevel_vocab)
+        # Every map entry is a subject taken; a null grade counts as F9, as in Cohort.from_profiles
+        grade_column = entries.field(1)
+        values, unknown = _grade_values(grade_column, null_value=1)
+        # Rows with unknown or null grades keep the originals (a profile shows them, not F9)
+        if grade_column.null_count:
+            unknown = unknown | grade_column.is_null().to_numpy(zero_copy_only=False)
+        raw_grades[parents[unknown]] = True
+        olevel_counts += np.bincount(parents, minlength=n).astype(np.int16)
+        olevel_totals += np.bincount(parents, weights=values, minlength=n).astype(np.int32)
+        credit = values >= CREDIT_VALUE
+        credits += np.bincount(parents, weights=credit, minlength=n).astype(np.int16)
+        known = bits >= 0
+        grades[parents[known], bits[known]] = values[known]
+        credited = known & credit
+        np.bitwise_or.at(credit_masks, parents[credited],
+                         np.left_shift(np.uint64(1), bits[credited].astype(np.uint64)))
+
+    for name in batch.schema.names:
+        if not name.startswith(GRADE_PREFIX):
+            continue
+        values, unknown = _grade_values(batch.column(name))
+        raw_grades |= unknown
+        wide.append((name[len(GRADE_PREFIX):], batch.column(name)))
+        taken = values > 0
+        credit = values >= CREDIT_VALUE
+        olevel_counts += taken
+        olevel_totals += values
+        credits += credit
+        bit = catalog.olevel_bits.get(name[len(GRADE_PREFIX):])
+        if bit is not None:
+            grades[:, bit] = values
+            credit_masks |= credit.astype(np.uint64) << np.uint64(bit)
+
+    def codes(key, values, missing):
+        array = column(key)
+        if array is None:
+            return np.full(n, missing, dtype=np.int16)
+        return dictionary_codes(array, values, missing=missing).astype(np.int16)
+
+    # Unknown states and courses keep their original strings, as student_data dicts do
+    raw_values = {key: _ArrowNames(column(key)) for key in RAW_FIELDS if column(key) is not None}
+    if raw_grades.any():
+        raw_values['olevel_grades'] = _ArrowGrades(raw_grades, graded, wide)
+    name_column = column('name')
+    return Cohort(
+        catalog, jamb_scores, jamb_masks, credit_masks, credits, grades, olevel_counts, olevel_totals,
+        styles=codes('learning_style', LEARNING_STYLES, LEARNING_STYLES.index('Visual')),
+        niches=codes('study_niche', STUDY_NICHES, STUDY_NICHES.index('Practical')),
+        states=codes('state', catalog.states, -1),
+        preferred_courses=codes('preferred_course', catalog.course_names, -1),
+        names=_ArrowNames(name_column) if name_column is not None else None,
+        raw_values=raw_values
+    )
+
+
+def iter_cohorts(catalog, source, columns=None, batch_size=65536):
+    """Cohort per record batch of a Parquet/Arrow IPC file, Table or RecordBatch"""
+    if isinstance(source, pa.RecordBatch):
+        yield cohort_from_batch(catalog, source, columns)
+        return
+    if isinstance(source, pa.Table):
+        batches = source.to_batches(max_chunksize=batch_size)
+    elif str(source).endswith(('.arrow', '.feather', '.ipc')):
+        # Memory-mapped IPC batches are read in place
+        reader = pa.ipc.open_file(pa.memory_map(str(source)))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(source).iter_batches(batch_size=batch_size)
+    for batch in batches:
+        yield cohort_from_batch(catalog, batch, columns)
+
+
+def concat_cohorts(catalog, cohorts):
+    """One Cohort from several (e.g. the batches of one file)"""
+    cohorts = list(cohorts)
+    if not cohorts:
+        return Cohort.from_profiles(catalog, [])
+    if len(cohorts) == 1:
+        return cohorts[0]
+
+    def stack(attr):
+        return np.concatenate([getattr(cohort, attr) for cohort in cohorts])
+
+    def chained(lookups):
+        if all(isinstance(lookup, _ArrowNames) for lookup in lookups):
+            return _ArrowNames(pa.chunked_array([lookup.array for lookup in lookups]))
+        return None
+
+    names = chained([cohort.names for cohort in cohorts])
+    raw_values = {}
+    for key in RAW_FIELDS + ('olevel_grades',):
+        lookups = [cohort.raw_values.get(key) for cohort in cohorts]
+        if any(lookup is not None for lookup in lookups):
+            chain = chained(lookups)
+            raw_values[key] = chain if chain is not None else _ChainedLookup(lookups, [len(c) for c in cohorts])
+    return Cohort(
+        catalog, stack('jamb_scores'), stack('jamb_masks'), stack('credit_masks'), stack('credits'),
+        stack('grades'),
+        stack('olevel_counts'), stack('olevel_totals'), stack('styles'), stack('niches'), stack('states'),
+        preferred_courses=stack('preferred_courses'), names=names,
+        raw_values=raw_values
+    )
+
+
+def read_cohort(catalog, source, columns=None, batch_size=65536):
+    """Whole Parquet/Arrow source as one Cohort"""
+    return concat_cohorts(catalog, iter_cohorts(catalog, source, columns, batch_size))
@@ -0,0 +1,217 @@
+"""
+Catalog Registry
+Versioned catalog snapshots with atomic hot-swap:
+- Each snapshot is an immutable (Part1, Part2, compiled catalog) triple
+- New snapshots are built and indexed off the hot path, then swapped in one assignment
+- Derived objects (indexes, batchers, views) are cached per snapshot, so a swap
+  invalidates them by version
+- Overrides (e.g. this cycle's cutoffs) come from a JSON file deep-merged into Part1 data
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ultimate_admission_system import UltimateAdmissionSystem
+from ultimate_admission_system_part2 import UltimateAdmissionSystemPart2
+
+# Part1 attributes an override file may patch
+OVERRIDABLE = ('courses', 'universities', 'career_paths', 'states')
+
+
+def deep_merge(base, overrides):
+    """Recursively merge override dicts into base (in place); non-dict values replace"""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            deep_merge(base[key], value)
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+
+def catalog_fingerprint(system):
+    """Stable hash of the catalog data a snapshot was built from"""
+    payload = json.dumps({name: getattr(system, name) for name in OVERRIDABLE}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class SnapshotClosed(RuntimeError):
+    """The snapshot was retired by a swap; retry on registry.current()"""
+
+
+class CatalogSnapshot:
+    def __init__(self, version, part1, part2, source=None):
+        self.version = version
+        self.part1 = part1
+        self.part2 = part2
+        self.catalog = part1.get_compiled_catalog()
+        self.fingerprint = catalog_fingerprint(part1)
+        self.source = source
+        self.loaded_at = time.time()
+        self._resources = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def resource(self, name, factory):
+        """Per-snapshot cached object built on first use by factory(snapshot).
+        
+        Raises SnapshotClosed once the snapshot is closed, so nothing is built
+        (and never released) on a retired snapshot.
+        """
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._lock:
+                if self.closed:
+                    raise SnapshotClosed(f"Catalog snapshot {self.version} is closed")
+                resource = self._resources.get(name)
+                if resource is None:
+                    resource = factory(self)
+                    self._resources[name] = resource
+        return resource
+
+    def close(self):
+        """Release per-snapshot resources that hold threads (e.g. micro-batchers)"""
+        with self._lock:
+            self.closed = True
+            resources, self._resources = self._resources, {}
+        for resource in resources.values():
+            if hasattr(resource, 'close'):
+                resource.close(wait=False)
+
+    def info(self):
+        return {
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'courses': len(self.part1.courses),
+            'universities': len(self.part1.universities)
+        }
+
+
+class CatalogRegistry:
+    def __init__(self, part1=None, part2=None, override_path=None):
+        part1 = part1 or UltimateAdmissionSystem()
+        if override_path:
+            self._apply_overrides(part1, self._read_overrides(override_path))
+        part2 = part2 or UltimateAdmissionSystemPart2(part1)
+        self.override_path = override_path
+        self._snapshot = CatalogSnapshot(1, part1, part2, source=override_path)
+        self._swap_lock = threading.Lock()
+        self._listeners = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalog-reload')
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self.last_error = None
+
+    def current(self):
+        """The live snapshot; callers should hold on to it for the whole request"""
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def resource(self, name, factory):
+        """(snapshot, resource) from the live snapshot, retrying if a swap retires it mid-call"""
+        while True:
+            snapshot = self._snapshot
+            try:
+                return snapshot, snapshot.resource(name, factory)
+            except SnapshotClosed:
+                # Closed snapshots have always been swapped out already
+                continue
+
+    def subscribe(self, callback):
+        """callback(old_snapshot, new_snapshot) is called after every swap"""
+        self._listeners.append(callback)
+
+    def _read_overrides(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(OVERRIDABLE)
+        if unknown:
+            raise ValueError(f"Unknown catalog sections in {path}: {sorted(unknown)}")
+        return overrides
+
+    def _apply_overrides(self, part1, overrides):
+        for name, value in overrides.items():
+            if isinstance(value, dict):
+                deep_merge(getattr(part1, name), value)
+            else:
+                setattr(part1, name, copy.deepcopy(value))
+
+    def build(self, overrides=None, path=None):
+        """Build and index a new snapshot without touching the live one"""
+        part1 = UltimateAdmissionSystem()
+        path = path or self.override_path
+        if path:
+            self._apply_overrides(part1, self._read_overrides(path))
+        if overrides:
+            self._apply_overrides(part1, overrides)
+
+        # Models are not catalog data; carry them over to the new engine
+        previous = self._snapshot.part2
+        part2 = UltimateAdmissionSystemPart2(part1)
+        part2.ml_models = previous.ml_models
+        part2.encoders = previous.encoders
+
+        # Compiling here surfaces malformed overrides before anything is swapped
+        return CatalogSnapshot(None, part1, part2, source=path)
+
+    def reload(self, overrides=None, path=None):
+        """Build a snapshot and swap it in; returns the new live snapshot"""
+        try:
+            snapshot = self.build(overrides, path)
+        except Exception as exc:
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            raise
+
+        with self._swap_lock:
+            old = self._snapshot
+            snapshot.version = old.version + 1
+            # Single reference assignment: readers see either the old or the new snapshot
+            self._snapshot = snapshot
+        self.last_error = None
+
+        for callback in self._listeners:
+            callback(old, snapshot)
+        return snapshot
+
+    def reload_async(self, overrides=None, path=None):
+        """reload() on the background builder thread; returns a Future"""
+        return self._executor.submit(self.reload, overrides, path)
+
+    def watch(self, path=None, interval=5.0):
+        """Reload whenever the override file's modification time changes"""
+        path = path or self.override_path
+        if not path:
+            raise ValueError('No override file to watch')
+        self.override_path = path
+        self._stop_watching.clear()
+
+        def poll():
+            last_mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            while not self._stop_watching.wait(interval):
+                mtime = os.path.getmtime(path) if os.path.exists(path) else None
+                if mtime != last_mtime:
+                    last_mtime = mtime
+                    try:
+                        self.reload(path=path)
+                    except Exception:
+                        pass  # keep serving the current snapshot; error is in last_error
+
+        self._watcher = threading.Thread(target=poll, name='catalog-watch', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop_watching.set()
+        self._executor.shutdown(wait=False)
+
+    def info(self):
+        info = self._snapshot.info()
+        info['last_error'] = self.last_error
+        return info
@@ -0,0 +1,74 @@
+"""
+Catalog View
+Static option lists for the UI, built once per process:
+- States, JAMB subjects, O'Level grades and subject groups
+- Course picker sorted and grouped by category
+- Mobile CSS
+"""
+
+from compiled_catalog import LEARNING_STYLES, STUDY_NICHES
+
+GRADES = ['A1', 'B2', 'B3', 'C4', 'C5', 'C6', 'D7', 'E8', 'F9']
+NOT_TAKEN = 'Not Taken'
+
+ALL_JAMB_SUBJECTS = [
+    'English Language', 'Mathematics', 'Physics', 'Chemistry', 'Biology',
+    'Economics', 'Government', 'Literature in English', 'Geography',
+    'Agricultural Science', 'Commerce', 'Accounting', 'History',
+    'Christian Religious Studies', 'Islamic Religious Studies', 'Fine Art',
+    'French', 'Arabic', 'Hausa', 'Igbo', 'Yoruba', 'Music'
+]
+
+CORE_SUBJECTS = ['English Language', 'Mathematics', 'Physics', 'Chemistry', 'Biology']
+
+# (expander title, widget key prefix, column count, subjects)
+OLEVEL_GROUPS = [
+    ("🏛️ SOCIAL SCIENCES", 'social', 4, [
+        'Government', 'Economics', 'Geography', 'History', 'Civic Education',
+        'Social Studies', 'Commerce', 'Accounting'
+    ]),
+    ("📚 LANGUAGES & LITERATURE", 'lang', 3, [
+        'Literature in English', 'French', 'Arabic', 'Hausa', 'Igbo', 'Yoruba'
+    ]),
+    ("🎨 ARTS & CREATIVE", 'arts', 4, [
+        'Fine Art', 'Visual Arts', 'Music', 'Technical Drawing'
+    ]),
+    ("🌾 AGRICULTURAL & TECHNICAL", 'agric', 3, [
+        'Agricultural Science', 'Animal Husbandry', 'Food and Nutrition',
+        'Home Economics', 'Computer Studies', 'Data Processing'
+    ]),
+    ("⛪ RELIGIOUS STUDIES", 'rel', 3, [
+        'Christian Religious Studies', 'Islamic Religious Studies', 'Bible Knowledge'
+    ]),
+    ("🔬 ADDITIONAL SCIENCES", 'add_sci', 4, [
+        'Further Mathematics', 'Statistics', 'Health Education', 'Physical Education'
+    ])
+]
+
+
+class CatalogView:
+    def __init__(self, system, enhanced_features):
+        self.states = list(system.states)
+        self.genders = ['Male', 'Female']
+        self.learning_styles = list(LEARNING_STYLES)
+        self.study_niches = list(STUDY_NICHES)
+        self.jamb_subjects = list(ALL_JAMB_SUBJECTS)
+        self.grades = list(GRADES)
+        self.grade_options = self.grades + [NOT_TAKEN]
+        self.core_subjects = list(CORE_SUBJECTS)
+        self.olevel_groups = OLEVEL_GROUPS
+        self.mobile_css = enhanced_features.get_mobile_css()
+
+        # Course picker: categories alphabetically, courses alphabetically within each
+        self.course_groups = {}
+        for course, course_data in system.courses.items():
+            self.course_groups.setdefault(course_data.get('category', 'Other'), []).append(course)
+        self.course_groups = {category: sorted(courses) for category, courses in sorted(self.course_groups.items())}
+        self.course_category = {course: category
+                                for category, courses in self.course_groups.items() for course in courses}
+        self.course_options = [course for courses in self.course_groups.values() for course in courses]
+        self.course_labels = {course: f"{category} · {course}" for course, category in self.course_category.items()}
+
+    def course_label(self, course):
+        """format_func for the course selectbox"""
+        return self.course_labels.get(course, course)
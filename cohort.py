@@ -0,0 +1,134 @@
+"""
+Cohort
+Columnar (NumPy) representation of a set of student profiles
+"""
+
+import json
+import numpy as np
+from compiled_catalog import GRADE_VALUES, GRADE_NAMES, LEARNING_STYLES, STUDY_NICHES
+
+
+class Cohort:
+    def __init__(self, catalog, jamb_scores, jamb_masks, credit_masks, credits, grades,
+                 olevel_counts, olevel_totals, styles, niches, states,
+                 preferred_courses=None, names=None, profiles=None, raw_values=None):
+        self.catalog = catalog
+        self.jamb_scores = np.asarray(jamb_scores)
+        self.jamb_masks = np.asarray(jamb_masks, dtype=np.uint64)
+        self.credit_masks = np.asarray(credit_masks, dtype=np.uint64)
+        self.credits = np.asarray(credits, dtype=np.int16)
+        self.grades = np.asarray(grades, dtype=np.int8)
+        self.olevel_counts = np.asarray(olevel_counts, dtype=np.int16)
+        self.olevel_totals = np.asarray(olevel_totals, dtype=np.int32)
+        self.styles = np.asarray(styles, dtype=np.int8)
+        self.niches = np.asarray(niches, dtype=np.int8)
+        self.states = np.asarray(states, dtype=np.int16)
+        n = len(self.jamb_scores)
+        if preferred_courses is None:
+            preferred_courses = np.full(n, -1, dtype=np.int16)
+        self.preferred_courses = np.asarray(preferred_courses, dtype=np.int16)
+        self.names = names
+        self.profiles = profiles
+        # field -> per-row original values, read where the columns lost them (unknown codes or grades)
+        self.raw_values = raw_values or {}
+
+    def __len__(self):
+        return len(self.jamb_scores)
+
+    @classmethod
+    def from_profiles(cls, catalog, profiles):
+        """Encode a list of student_data dicts"""
+        n = len(profiles)
+        n_subjects = len(catalog.olevel_vocab)
+        jamb_scores = []
+        jamb_masks = np.zeros(n, dtype=np.uint64)
+        credit_masks = np.zeros(n, dtype=np.uint64)
+        credits = np.zeros(n, dtype=np.int16)
+        grades = np.zeros((n, n_subjects), dtype=np.int8)
+        olevel_counts = np.zeros(n, dtype=np.int16)
+        olevel_totals = np.zeros(n, dtype=np.int32)
+        styles = np.full(n, -1, dtype=np.int8)
+        niches = np.full(n, -1, dtype=np.int8)
+        states = np.full(n, -1, dtype=np.int16)
+        preferred = np.full(n, -1, dtype=np.int16)
+        names = []
+
+        for i, profile in enumerate(profiles):
+            jamb_scores.append(profile.get('jamb_score', 0))
+            jamb_masks[i] = catalog.encode_jamb_subjects(profile.get('jamb_subjects', []))
+
+            olevel_grades = profile.get('olevel_grades', {})
+            mask = 0
+            for subject, grade in olevel_grades.items():
+                value = GRADE_VALUES.get(grade, 1)
+                olevel_totals[i] += value
+                is_credit = grade in GRADE_VALUES and value >= 4
+                if is_credit:
+                    credits[i] += 1
+                bit = catalog.olevel_bits.get(subject)
+                if bit is not None:
+                    grades[i, bit] = value
+                    if is_credit:
+                        mask |= 1 << bit
+            credit_masks[i] = mask
+            olevel_counts[i] = len(olevel_grades)
+
+            style = profile.get('learning_style', 'Visual')
+            styles[i] = LEARNING_STYLES.index(style) if style in LEARNING_STYLES else -1
+            niche = profile.get('study_niche', 'Practical')
+            niches[i] = STUDY_NICHES.index(niche) if niche in STUDY_NICHES else -1
+            states[i] = catalog.state_index.get(profile.get('state', ''), -1)
+            preferred[i] = catalog.course_index.get(profile.get('preferred_course'), -1)
+            names.append(profile.get('name', ''))
+
+        jamb_scores = np.asarray(jamb_scores) if n else np.zeros(0, dtype=np.int32)
+        if jamb_scores.dtype.kind in 'iu':
+            jamb_scores = jamb_scores.astype(np.int32)
+        else:
+            jamb_scores = jamb_scores.astype(np.float64)
+
+        return cls(catalog, jamb_scores, jamb_masks, credit_masks, credits, grades,
+                   olevel_counts, olevel_totals, styles, niches, states,
+                   preferred_courses=preferred, names=names, profiles=list(profiles))
+
+    @classmethod
+    def load_jsonl(cls, catalog, path):
+        """Load a stored cohort (one student_data JSON object per line)"""
+        with open(path, 'r') as f:
+            profiles = [json.loads(line) for line in f if line.strip()]
+        return cls.from_profiles(catalog, profiles)
+
+    def profile(self, row):
+        """student_data dict for a row (materialized from columns if needed)"""
+        if self.profiles is not None:
+            return self.profiles[row]
+
+        catalog = self.catalog
+        olevel_grades = self._raw_value('olevel_grades', row, None)
+        if olevel_grades is None:
+            olevel_grades = {}
+            for bit in np.flatnonzero(self.grades[row]):
+                olevel_grades[catalog.olevel_vocab[bit]] = GRADE_NAMES[int(self.grades[row, bit])]
+        style, niche, state = int(self.styles[row]), int(self.niches[row]), int(self.states[row])
+        preferred = int(self.preferred_courses[row])
+        return {
+            'name': self.names[row] if self.names is not None else f"Applicant {row}",
+            'state': catalog.states[state] if state >= 0 else self._raw_value('state', row),
+            'preferred_course': (catalog.course_names[preferred] if preferred >= 0 else
+                                 self._raw_value('preferred_course', row)),
+            'jamb_score': self.jamb_scores[row].item(),
+            'jamb_subjects': catalog.decode_jamb_subjects(self.jamb_masks[row]),
+            'olevel_grades': olevel_grades,
+            'learning_style': LEARNING_STYLES[style] if style >= 0 else 'Visual',
+            'study_niche': STUDY_NICHES[niche] if niche >= 0 else 'Practical'
+        }
+
+    def _raw_value(self, field, row, default=''):
+        values = self.raw_values.get(field)
+        value = values[row] if values is not None else None
+        return default if value is None else value
+
+    def name(self, row):
+        if self.names is not None:
+            return self.names[row]
+        return f"Applicant {row}"
@@ -0,0 +1,381 @@
+"""
+Cohort Coordinator
+Splits a cohort across worker processes or machines that share a directory, with no queue service:
+- prepare: shard a JSONL profile file into work units under <dir>/pending
+- work: claim units by atomic rename into <dir>/claimed, score them with the batched
+  Part2 engine, publish results to <dir>/done, and heartbeat the claim while working
+- Claims whose heartbeat is older than the lease (a dead or stalled node) and units
+  that raised are put back in pending, up to max_attempts, then moved to <dir>/failed
+- The heartbeat renews a claim only while scoring progresses, so a hung but live worker
+  loses its claim after one lease without a finished batch
+- A late owner's result still counts: a shard in done is never treated as failed
+- merge: concatenate done units in shard order, so output order matches the input
+
+Run everything on one box, with worker processes standing in for nodes:
+    python cohort_coordinator.py run cohort.jsonl results.jsonl --dir data/run --workers 4
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from result_records import json_default
+
+JOB_FILE = 'job.json'
+STATES = ('pending', 'claimed', 'done', 'failed')
+
+
+def _write_json(path, payload):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _shard_name(shard):
+    return f"shard-{shard:06d}"
+
+
+class CohortJob:
+    """A sharded cohort run in a shared directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.config = _read_json(os.path.join(directory, JOB_FILE))
+
+    @classmethod
+    def prepare(cls, input_path, directory, shard_size=5000, max_attempts=3, lease_seconds=60):
+        """Shard input_path (one student_data JSON object per line) into pending work units"""
+        for state in STATES + ('shards',):
+            os.makedirs(os.path.join(directory, state), exist_ok=True)
+        if os.path.exists(os.path.join(directory, JOB_FILE)):
+            raise FileExistsError(f"{directory} already holds a job")
+
+        shard = rows = 0
+        out = None
+        with open(input_path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if out is None:
+                    out = open(os.path.join(directory, 'shards', f"{_shard_name(shard)}.jsonl"), 'wb')
+                out.write(line if line.endswith(b'\n') else line + b'\n')
+                rows += 1
+                if rows % shard_size == 0:
+                    out.close()
+                    out = None
+                    shard += 1
+        if out is not None:
+            out.close()
+            shard += 1
+
+        for i in range(shard):
+            unit = {'shard': i, 'rows': min(shard_size, rows - i * shard_size), 'attempts': 0, 'errors': []}
+            _write_json(os.path.join(directory, 'pending', f"{_shard_name(i)}.json"), unit)
+        # Written last: workers treat a directory without job.json as not ready
+        _write_json(os.path.join(directory, JOB_FILE), {
+            'input': os.path.abspath(input_path), 'rows': rows, 'shards': shard, 'shard_size': shard_size,
+            'max_attempts': max_attempts, 'lease_seconds': lease_seconds, 'created': time.time()
+        })
+        return cls(directory)
+
+    def _path(self, state, name):
+        return os.path.join(self.directory, state, name)
+
+    def _list(self, state, suffix):
+        return sorted(name for name in os.listdir(os.path.join(self.directory, state)) if name.endswith(suffix))
+
+    def is_done(self, shard):
+        return os.path.exists(self._path('done', f"{_shard_name(shard)}.jsonl"))
+
+    def _failed(self):
+        # A unit parked in failed just before a late owner completed it is not a failure
+        return [name for name in self._list('failed', '.json')
+                if not os.path.exists(self._path('done', f"{name[:-len('.json')]}.jsonl"))]
+
+    def status(self):
+        done = len(self._list('done', '.jsonl'))
+        failed = len(self._failed())
+        return {
+            'shards': self.config['shards'],
+            'pending': len(self._list('pending', '.json')),
+            'claimed': len(self._list('claimed', '.json')),
+            'done': done,
+            'failed': failed,
+            'finished': done + failed >= self.config['shards']
+        }
+
+    # Claims
+
+    def claim(self, worker_id):
+        """(unit, claim path) for the first pending unit this worker wins, or None"""
+        for name in self._list('pending', '.json'):
+            claim_path = self._path('claimed', f"{name[:-len('.json')]}.{worker_id}.json")
+            try:
+                # Only one worker's rename can succeed; the rest see the file gone
+                os.rename(self._path('pending', name), claim_path)
+            except FileNotFoundError:
+                continue
+            os.utime(claim_path)
+            return _read_json(claim_path), claim_path
+        return None
+
+    def heartbeat(self, claim_path):
+        """Renew a claim's lease; False once it has been reclaimed from this worker"""
+        try:
+            os.utime(claim_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, unit, claim_path, lines):
+        # Identical output from a late duplicate worker simply replaces the file
+        output = self._path('done', f"{_shard_name(unit['shard'])}.jsonl")
+        tmp_path = f"{output}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, output)
+        self._release(claim_path)
+        # A reclaimer may have given up on this shard while it was being scored
+        try:
+            os.remove(self._path('failed', f"{_shard_name(unit['shard'])}.json"))
+        except FileNotFoundError:
+            pass
+
+    def fail(self, unit, claim_path, error):
+        """Give a unit back for retry, or park it in failed after max_attempts"""
+        if not self._release(claim_path):
+            return  # already reclaimed and requeued by someone else
+        self._requeue(unit, error)
+
+    def _release(self, claim_path):
+        try:
+            os.remove(claim_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _requeue(self, unit, error):
+        unit = dict(unit, attempts=unit['attempts'] + 1, errors=unit['errors'] + [error])
+        name = f"{_shard_name(unit['shard'])}.json"
+        if self.is_done(unit['shard']):
+            return
+        if unit['attempts'] >= self.config['max_attempts']:
+            _write_json(self._path('failed', name), unit)
+        else:
+            _write_json(self._path('pending', name), unit)
+
+    def reclaim_stalled(self, now=None):
+        """Requeue claims whose lease has expired; returns the shards reclaimed"""
+        now = now or time.time()
+        reclaimed = []
+        for name in self._list('claimed', '.json'):
+            claim_path = self._path('claimed', name)
+            try:
+                if now - os.path.getmtime(claim_path) < self.config['lease_seconds']:
+                    continue
+                # Renaming first makes the reclaim atomic against other reclaimers and the owner
+                stolen = f"{claim_path}.{uuid.uuid4().hex}.reclaim"
+                os.rename(claim_path, stolen)
+            except FileNotFoundError:
+                continue
+            unit = _read_json(stolen)
+            os.remove(stolen)
+            owner = name[len(_shard_name(unit['shard'])) + 1:-len('.json')]
+            self._requeue(unit, f"lease expired (worker {owner})")
+            reclaimed.append(unit['shard'])
+        return reclaimed
+
+    # Output
+
+    def shard_profiles(self, shard):
+        with open(self._path('shards', f"{_shard_name(shard)}.jsonl"), 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def merge(self, output_path):
+        """Concatenate finished shards in shard order; raises if any shard is missing or failed"""
+        failed = self._failed()
+        if failed:
+            errors = {name: _read_json(self._path('failed', name))['errors'][-1] for name in failed}
+            raise RuntimeError(f"{len(failed)} shards failed: {errors}")
+        missing = [shard for shard in range(self.config['shards']) if not self.is_done(shard)]
+        if missing:
+            raise RuntimeError(f"{len(missing)} shards not finished (first: {missing[0]})")
+
+        rows = 0
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, 'wb') as out:
+            for shard in range(self.config['shards']):
+                with open(self._path('done', f"{_shard_name(shard)}.jsonl"), 'rb') as f:
+                    for line in f:
+                        out.write(line)
+                        rows += 1
+        os.replace(tmp_path, output_path)
+        return rows
+
+
+class CohortWorker:
+    def __init__(self, directory, advanced_system=None, worker_id=None, batch_size=256, poll_seconds=0.5):
+        self.job = CohortJob(directory)
+        self.advanced_system = advanced_system
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.poll = poll_seconds
+        self.processed = 0
+        self.failures = 0
+        self._progress = time.monotonic()
+
+    def _engine(self):
+        if self.advanced_system is None:
+            from ultimate_admission_system import UltimateAdmissionSystem
+            from ultimate_admission_system_part2 import UltimateAdmissionSystemPart2
+            self.advanced_system = UltimateAdmissionSystemPart2(UltimateAdmissionSystem())
+        return self.advanced_system
+
+    def score(self, profiles):
+        """Result JSON lines for profiles, in order"""
+        engine = self._engine()
+        lines = []
+        self._progress = time.monotonic()
+        for start in range(0, len(profiles), self.batch_size):
+            for result in engine.process_comprehensive_admission_batch(profiles[start:start + self.batch_size]):
+                lines.append(json.dumps(result, default=json_default) + '\n')
+            # Each finished batch lets the heartbeat renew the claim for another lease
+            self._progress = time.monotonic()
+        return lines
+
+    def run(self, max_units=None, die_after=None):
+        """Work until no units are left; returns the number of units completed.
+
+        die_after exits the process right after claiming that many units, leaving the claim
+        to expire as a crashed node would (for exercising retries on one box).
+        """
+        job = self.job
+        claims = 0
+        while max_units is None or self.processed < max_units:
+            job.reclaim_stalled()
+            claimed = job.claim(self.worker_id)
+            if claimed is None:
+                if job.status()['finished']:
+                    break
+                time.sleep(self.poll)
+                continue
+            claims += 1
+            if die_after is not None and claims >= die_after:
+                os._exit(1)
+
+            unit, claim_path = claimed
+            if job.is_done(unit['shard']):
+                job._release(claim_path)
+                continue
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(claim_path, stop), daemon=True)
+            heartbeat.start()
+            try:
+                lines = self.score(job.shard_profiles(unit['shard']))
+            except Exception as exc:
+                self.failures += 1
+                job.fail(unit, claim_path, f"{type(exc).__name__}: {exc} (worker {self.worker_id})")
+                traceback.print_exc()
+                continue
+            finally:
+                stop.set()
+                heartbeat.join()
+            job.complete(unit, claim_path, lines)
+            self.processed += 1
+        return self.processed
+
+    def _heartbeat(self, claim_path, stop):
+        lease = self.job.config['lease_seconds']
+        interval = max(lease / 3.0, 0.05)
+        while not stop.wait(interval):
+            if time.monotonic() - self._progress >= lease:
+                # No batch finished for a whole lease: let the claim expire so the unit is retried
+                continue
+            if not self.job.heartbeat(claim_path):
+                break
+
+
+def run_local(input_path, output_path, directory, workers=4, shard_size=5000, max_attempts=3,
+              lease_seconds=60, die_after=None):
+    """Prepare, run worker subprocesses on this machine, and merge; returns (rows, status)"""
+    job = CohortJob.prepare(input_path, directory, shard_size, max_attempts, lease_seconds)
+    command = [sys.executable, os.path.abspath(__file__), 'work', directory]
+    processes = []
+    for i in range(workers):
+        worker_command = command + ['--worker-id', f"local-{i}"]
+        # The first worker optionally plays a node that dies mid-run
+        if die_after is not None and i == 0:
+            worker_command += ['--die-after', str(die_after)]
+        processes.append(subprocess.Popen(worker_command))
+    for process in processes:
+        process.wait()
+
+    # Dead workers may leave claims behind; sweep them up here until every shard settles
+    if not job.status()['finished']:
+        subprocess.run(command + ['--worker-id', 'local-sweeper'])
+    return job.merge(output_path), job.status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shard a cohort across worker processes sharing a directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    prepare = commands.add_parser('prepare', help='Shard a JSONL profile file into work units')
+    prepare.add_argument('input')
+    prepare.add_argument('directory')
+    run = commands.add_parser('run', help='Prepare, run local worker processes and merge')
+    run.add_argument('input')
+    run.add_argument('output')
+    run.add_argument('--dir', dest='directory', required=True)
+    run.add_argument('--workers', type=int, default=4)
+    for command in (prepare, run):
+        command.add_argument('--shard-size', type=int, default=5000)
+        command.add_argument('--max-attempts', type=int, default=3)
+        command.add_argument('--lease-seconds', type=float, default=60)
+
+    work = commands.add_parser('work', help='Claim and score units until none are left')
+    work.add_argument('directory')
+    work.add_argument('--worker-id')
+    work.add_argument('--batch-size', type=int, default=256)
+    for command in (work, run):
+        command.add_argument('--die-after', type=int, help='Exit abruptly after claiming this many units')
+
+    status = commands.add_parser('status')
+    status.add_argument('directory')
+    merge = commands.add_parser('merge')
+    merge.add_argument('directory')
+    merge.add_argument('output')
+    args = parser.parse_args()
+
+    if args.command == 'prepare':
+        job = CohortJob.prepare(args.input, args.directory, args.shard_size, args.max_attempts, args.lease_seconds)
+        print(f"{job.config['rows']} profiles in {job.config['shards']} shards under {args.directory}")
+    elif args.command == 'work':
+        worker = CohortWorker(args.directory, worker_id=args.worker_id, batch_size=args.batch_size)
+        worker.run(die_after=args.die_after)
+        print(f"worker {worker.worker_id}: {worker.processed} units, {worker.failures} failures")
+    elif args.command == 'status':
+        print(json.dumps(CohortJob(args.directory).status(), indent=2))
+    elif args.command == 'merge':
+        print(f"{CohortJob(args.directory).merge(args.output)} results -> {args.output}")
+    else:
+        started = time.perf_counter()
+        rows, state = run_local(args.input, args.output, args.directory, args.workers, args.shard_size,
+                                args.max_attempts, args.lease_seconds, args.die_after)
+        print(f"{rows} results from {state['shards']} shards in {time.perf_counter() - started:.1f}s -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""
+Cohort Generator
+Seeded, vectorized synthetic applicants written straight into Cohort columns:
+- JAMB combinations drawn from the catalog's compiled rules (ANY_ONE_OF / ANY_TWO_FROM /
+  ANY_THREE_FROM), with a tunable share of off-rule combinations
+- O'Level grades on the A1-F9 scale, correlated with the JAMB score through a latent ability
+- Tunable score, state, learning-style and study-niche distributions
+- Generated in fixed-size chunks, each seeded from (seed, chunk index), so a seed
+  always gives the same cohort; Parquet output streams one row group per chunk
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from cohort import Cohort
+from compiled_catalog import GRADE_VALUES, LEARNING_STYLES, STUDY_NICHES
+
+CHUNK_ROWS = 1 << 18
+
+# A1 ... F9, best first
+GRADE_ORDER = sorted(GRADE_VALUES, key=GRADE_VALUES.get, reverse=True)
+DEFAULT_GRADE_PROBS = [0.07, 0.10, 0.14, 0.16, 0.15, 0.13, 0.10, 0.08, 0.07]
+
+
+def _pack(bits):
+    """(n, k <= 64) bool -> uint64 masks with bit j set where column j is True"""
+    packed = np.packbits(bits, axis=1, bitorder='little')
+    padded = np.zeros((len(bits), 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view('<u8').ravel()
+
+
+def _popcount(masks):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks)
+    bits = (masks[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    return bits.sum(axis=1)
+
+
+def _probabilities(probs, n, name):
+    if probs is None:
+        return np.full(n, 1.0 / n)
+    probs = np.asarray(probs, dtype=np.float64)
+    if len(probs) != n or probs.min() < 0 or probs.sum() <= 0:
+        raise ValueError(f"{name} needs {n} non-negative weights")
+    return probs / probs.sum()
+
+
+class CohortGenerator:
+    def __init__(self, catalog, seed=0, score_mean=230, score_std=40, score_range=(100, 400),
+                 style_probs=None, niche_probs=None, state_probs=None, course_probs=None,
+                 grade_probs=None, on_rule_rate=0.85, preferred_match_rate=0.6,
+                 olevel_subjects=8, ability_weight=0.6):
+        self.catalog = catalog
+        self.seed = seed
+        self.score_mean = score_mean
+        self.score_std = score_std
+        self.score_range = score_range
+        self.style_probs = _probabilities(style_probs, len(LEARNING_STYLES), 'style_probs')
+        self.niche_probs = _probabilities(niche_probs, len(STUDY_NICHES), 'niche_probs')
+        self.state_probs = _probabilities(state_probs, len(catalog.states), 'state_probs')
+        self.course_probs = _probabilities(course_probs, len(catalog.course_names), 'course_probs')
+        # Standard-normal thresholds between grade values, from F9 (1) up to A1 (9);
+        # the logistic approximation of the normal CDF is inverted once here
+        grade_probs = _probabilities(grade_probs or DEFAULT_GRADE_PROBS, len(GRADE_ORDER), 'grade_probs')
+        cdf = np.clip(np.cumsum(grade_probs[::-1])[:-1], 1e-9, 1 - 1e-9)
+        self.grade_thresholds = (np.log(cdf / (1 - cdf)) / 1.702).astype(np.float32)
+        self.on_rule_rate = on_rule_rate
+        self.preferred_match_rate = preferred_match_rate
+        self.olevel_subjects = olevel_subjects
+        self.ability_weight = ability_weight
+
+        system = catalog.system
+        # Only real subject bits: drops aliases and literally-matched malformed rule strings
+        self._jamb_real = catalog.encode_jamb_subjects(system.jamb_subjects)
+        self._jamb_pool = np.array([bit for bit in range(len(catalog.jamb_vocab)) if self._jamb_real >> bit & 1])
+        self._english = catalog.encode_jamb_subjects(['English Language'])
+        self._rules = []
+        for groups in catalog.jamb_rules:
+            rule = []
+            for options, needed in groups:
+                options = [option & self._jamb_real for option in options if option & self._jamb_real]
+                if options:
+                    rule.append((np.array(options, dtype=np.uint64), min(needed, len(options))))
+            self._rules.append(rule)
+
+        n_subjects = len(catalog.olevel_vocab)
+        self._core = catalog.olevel_bits.get('English Language'), catalog.olevel_bits.get('Mathematics')
+        self._required = np.zeros((len(catalog.course_names), n_subjects), dtype=bool)
+        for course_id, mask in enumerate(catalog.olevel_required):
+            self._required[course_id] = (int(mask) >> np.arange(n_subjects)) & 1
+
+    def _rng(self, chunk):
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(chunk,)))
+
+    def generate(self, n, workers=1):
+        """Cohort of n applicants"""
+        chunks = list(self.iter_chunks(n, workers))
+        if not chunks:
+            return self._chunk(0, 0)
+        if len(chunks) == 1:
+            return chunks[0]
+        fields = ('jamb_scores', 'jamb_masks', 'credit_masks', 'credits', 'grades', 'olevel_counts',
+                  'olevel_totals', 'styles', 'niches', 'states')
+        columns = {field: np.concatenate([getattr(chunk, field) for chunk in chunks]) for field in fields}
+        preferred = np.concatenate([chunk.preferred_courses for chunk in chunks])
+        return Cohort(self.catalog, preferred_courses=preferred, **columns)
+
+    def iter_chunks(self, n, workers=1):
+        """The cohort of generate(n), one chunk-sized Cohort at a time.
+
+        Chunks are independent, so workers > 1 generates them on threads (NumPy releases
+        the GIL for the bulk of the work) without changing the output.
+        """
+        sizes = [(index, min(CHUNK_ROWS, n - start)) for index, start in enumerate(range(0, n, CHUNK_ROWS))]
+        if workers <= 1:
+            for index, size in sizes:
+                yield self._chunk(index, size)
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cohort-generator') as pool:
+            yield from pool.map(lambda item: self._chunk(*item), sizes)
+
+    def _chunk(self, index, n):
+        catalog = self.catalog
+        rng = self._rng(index)
+
+        # Latent ability drives both the JAMB score and O'Level grades
+        ability = rng.standard_normal(n)
+        noise = rng.standard_normal(n)
+        w = self.ability_weight
+        scores = self.score_mean + self.score_std * (np.sqrt(w) * ability + np.sqrt(1 - w) * noise)
+        jamb_scores = np.clip(np.rint(scores), *self.score_range).astype(np.int32)
+
+        # Track: the course the applicant's subjects were chosen for
+        n_courses = len(catalog.course_names)
+        track = rng.choice(n_courses, size=n, p=self.course_probs)
+        preferred = np.where(rng.random(n) < self.preferred_match_rate, track,
+                             rng.choice(n_courses, size=n, p=self.course_probs)).astype(np.int16)
+
+        jamb_masks = self._jamb_combinations(rng, track, rng.random(n) < self.on_rule_rate)
+        grades = self._olevel_grades(rng, track, ability)
+
+        credit_masks = _pack(grades >= GRADE_VALUES['C6'])
+        return Cohort(
+            catalog, jamb_scores, jamb_masks,
+            credit_masks=credit_masks,
+            credits=_popcount(credit_masks),
+            grades=grades,
+            olevel_counts=_popcount(_pack(grades > 0)),
+            olevel_totals=grades.sum(axis=1, dtype=np.int32),
+            styles=rng.choice(len(LEARNING_STYLES), size=n, p=self.style_probs),
+            niches=rng.choice(len(STUDY_NICHES), size=n, p=self.niche_probs),
+            states=rng.choice(len(catalog.states), size=n, p=self.state_probs),
+            preferred_courses=preferred
+        )
+
+    def _jamb_combinations(self, rng, track, on_rule):
+        """English plus subjects satisfying the track course's rule, topped up to four"""
+        n = len(track)
+        masks = np.full(n, self._english, dtype=np.uint64)
+        for course_id, rule in enumerate(self._rules):
+            rows = np.flatnonzero(on_rule & (track == course_id))
+            if len(rows) == 0:
+                continue
+            for options, needed in rule:
+                # First `needed` options of a random permutation per row
+                picks = np.argsort(rng.random((len(rows), len(options))), axis=1)[:, :needed]
+                masks[rows] |= np.bitwise_or.reduce(options[picks], axis=1)
+
+        # Top up (or fill off-rule rows) with distinct random subjects
+        pool = self._jamb_pool.astype(np.uint64)
+        short = np.flatnonzero(_popcount(masks) < 4)
+        while len(short):
+            # Duplicate draws leave the row short; it is retried on the next pass
+            masks[short] |= np.left_shift(np.uint64(1), pool[rng.integers(len(pool), size=len(short))])
+            short = short[_popcount(masks[short]) < 4]
+        return masks
+
+    def _olevel_grades(self, rng, track, ability):
+        """Grade values (0 = not taken) for required, core and extra subjects"""
+        n = len(track)
+        n_subjects = self._required.shape[1]
+        taken = self._required[track]
+        for bit in self._core:
+            if bit is not None:
+                taken[:, bit] = True
+
+        # Extra subjects at a rate that brings the expected total to olevel_subjects
+        n_taken = taken.sum(axis=1, keepdims=True)
+        extra_rate = np.clip((self.olevel_subjects - n_taken) / np.maximum(n_subjects - n_taken, 1), 0, 1)
+        extra_rate = extra_rate.astype(np.float32)
+        taken |= rng.random((n, n_subjects), dtype=np.float32) < extra_rate
+
+        # Only taken cells are graded: ability shifts the whole transcript, noise varies by subject
+        cells = np.flatnonzero(taken)
+        w = self.ability_weight
+        latent = rng.standard_normal(len(cells), dtype=np.float32)
+        latent *= np.float32(np.sqrt(1 - w))
+        latent += np.float32(np.sqrt(w)) * ability.astype(np.float32)[cells // n_subjects]
+
+        # Grade value = 1 + number of thresholds the latent score clears
+        values = np.ones(len(cells), dtype=np.int8)
+        for threshold in self.grade_thresholds:
+            values += latent > threshold
+        grades = np.zeros(n * n_subjects, dtype=np.int8)
+        grades[cells] = values
+        return grades.reshape(n, n_subjects)
+
+
+def write_parquet(catalog, chunks, path):
+    """Write Cohort chunks to Parquet (one row group per chunk) without building profiles"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if isinstance(chunks, Cohort):
+        chunks = [chunks]
+    metadata = {b'admission_cohort': json.dumps({
+        'jamb_vocab': catalog.jamb_vocab,
+        'olevel_vocab': catalog.olevel_vocab
+    }).encode('utf-8')}
+
+    def dictionary(codes, values):
+        return pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int16(), mask=codes < 0), pa.array(values))
+
+    writer = None
+    rows = 0
+    try:
+        for cohort in chunks:
+            columns = {
+                'jamb_score': pa.array(cohort.jamb_scores),
+                'jamb_mask': pa.array(cohort.jamb_masks),
+                'state': dictionary(cohort.states.astype(np.int16), catalog.states),
+                'preferred_course': dictionary(cohort.preferred_courses, catalog.course_names),
+                'learning_style': dictionary(cohort.styles.astype(np.int16), LEARNING_STYLES),
+                'study_niche': dictionary(cohort.niches.astype(np.int16), STUDY_NICHES),
+            }
+            for bit, subject in enumerate(catalog.olevel_vocab):
+                columns[f"olevel:{subject}"] = pa.array(cohort.grades[:, bit])
+            table = pa.table(columns).replace_schema_metadata(metadata)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(cohort)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def read_parquet(catalog, path):
+    """Cohort from a write_parquet file (subjects are remapped by name onto this catalog)"""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    vocab = json.loads(table.schema.metadata[b'admission_cohort'])
+    n = table.num_rows
+
+    stored_masks = table.column('jamb_mask').to_numpy()
+    jamb_masks = np.zeros(n, dtype=np.uint64)
+    for bit, subject in enumerate(vocab['jamb_vocab']):
+        target = catalog.jamb_bits.get(subject)
+        if target is not None:
+            present = (stored_masks >> np.uint64(bit)) & np.uint64(1)
+            jamb_masks |= present << np.uint64(target)
+
+    grades = np.zeros((n, len(catalog.olevel_vocab)), dtype=np.int8)
+    for subject in vocab['olevel_vocab']:
+        bit = catalog.olevel_bits.get(subject)
+        if bit is not None:
+            grades[:, bit] = table.column(f"olevel:{subject}").to_numpy()
+
+    def codes(column, values):
+        index = {value: i for i, value in enumerate(values)}
+        chunked = table.column(column).combine_chunks()
+        lookup = np.array([index.get(value, -1) for value in chunked.dictionary.to_pylist()] + [-1])
+        indices = chunked.indices.fill_null(-1).to_numpy()
+        return lookup[indices]
+
+    credit = grades >= GRADE_VALUES['C6']
+    return Cohort(
+        catalog, table.column('jamb_score').to_numpy(), jamb_masks,
+        credit_masks=_pack(credit), credits=credit.sum(axis=1), grades=grades,
+        olevel_counts=(grades > 0).sum(axis=1), olevel_totals=grades.sum(axis=1, dtype=np.int32),
+        styles=codes('learning_style', LEARNING_STYLES), niches=codes('study_niche', STUDY_NICHES),
+        states=codes('state', catalog.states), preferred_courses=codes('preferred_course', catalog.course_names)
+    )
+
+
+def to_arrays(cohort):
+    """Cohort columns as a dict of NumPy arrays (e.g. for np.savez)"""
+    return {
+        'jamb_scores': cohort.jamb_scores, 'jamb_masks': cohort.jamb_masks,
+        'credit_masks': cohort.credit_masks, 'credits': cohort.credits, 'grades': cohort.grades,
+        'olevel_counts': cohort.olevel_counts, 'olevel_totals': cohort.olevel_totals,
+        'styles': cohort.styles, 'niches': cohort.niches, 'states': cohort.states,
+        'preferred_courses': cohort.preferred_courses
+    }
+
+
+def main():
+    import argparse
+    import time
+    from ultimate_admission_system import UltimateAdmissionSystem
+
+    parser = argparse.ArgumentParser(description='Generate a synthetic applicant cohort')
+    parser.add_argument('n', type=int)
+    parser.add_argument('output', help='.parquet or .npz file')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--score-mean', type=float, default=230)
+    parser.add_argument('--score-std', type=float, default=40)
+    args = parser.parse_args()
+
+    catalog = UltimateAdmissionSystem().get_compiled_catalog()
+    generator = CohortGenerator(catalog, seed=args.seed, score_mean=args.score_mean, score_std=args.score_std)
+    started = time.perf_counter()
+    if args.output.endswith('.parquet'):
+        write_parquet(catalog, generator.iter_chunks(args.n, args.workers), args.output)
+    else:
+        np.savez(args.output, **to_arrays(generator.generate(args.n, args.workers)))
+    elapsed = time.perf_counter() - started
+    print(f"{args.n} applicants in {elapsed:.2f}s ({args.n / elapsed:,.0f}/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Compiled Catalog
+- Subject bitmasks for JAMB combination rules and O'Level requirements
+- Per-course / per-university cutoff arrays
+- Vectorized rule-based success prediction over students x courses
+- Shared by cohort indexing, cutoff simulation and batched scoring
+"""
+
+import numpy as np
+
+GRADE_VALUES = {'A1': 9, 'B2': 8, 'B3': 7, 'C4': 6, 'C5': 5, 'C6': 4, 'D7': 3, 'E8': 2, 'F9': 1}
+GRADE_NAMES = {value: grade for grade, value in GRADE_VALUES.items()}
+CREDIT_GRADES = ['A1', 'B2', 'B3', 'C4', 'C5', 'C6']
+
+LEARNING_STYLES = ['Visual', 'Auditory', 'Kinesthetic', 'Reading/Writing']
+STUDY_NICHES = ['Theoretical', 'Practical', 'Research', 'Applied']
+
+# Short names accepted for ANY_THREE_FROM options (see validate_jamb_subjects)
+THREE_FROM_ALIASES = {
+    'Literature': 'Literature in English',
+    'CRS': 'Christian Religious Studies',
+    'IRS': 'Islamic Religious Studies'
+}
+
+DIFFICULTY_LEVELS = {'Very High': 4, 'High': 3, 'Medium': 2, 'Low': 1}
+DIFFICULTY_PENALTIES = {'Very High': 0.8, 'High': 0.9, 'Medium': 1.0, 'Low': 1.1}
+
+MAX_SUBJECT_BITS = 64
+
+# Study-plan resources (see EnhancedFeatures.generate_study_plan)
+JAMB_PREP_RESOURCES = [
+    'JAMB Past Questions (2010-2024)',
+    'JAMB CBT Practice Software',
+    'Online JAMB Tutorials (YouTube/Educational platforms)',
+    'JAMB Study Groups and Forums'
+]
+
+# (keywords matched in the lower-cased course name, resources); first match wins
+COURSE_RESOURCE_RULES = [
+    (('medicine', 'nursing'), [
+        'Biology and Chemistry intensive courses',
+        'Medical terminology resources',
+        'Healthcare career guidance materials'
+    ]),
+    (('engineering', 'computer'), [
+        'Mathematics and Physics advanced courses',
+        'Programming tutorials (if Computer Engineering)',
+        'Engineering career pathway guides'
+    ]),
+    (('law',), [
+        'Government and Literature intensive study',
+        'Legal terminology and concepts',
+        'Law school preparation materials'
+    ])
+]
+
+
+def course_resources(course):
+    """Course-specific study resources for a course name"""
+    course_lower = course.lower()
+    for keywords, resources in COURSE_RESOURCE_RULES:
+        if any(keyword in course_lower for keyword in keywords):
+            return list(resources)
+    return []
+
+
+def olevel_resources(subject):
+    return [f'{subject} WAEC Past Questions', f'{subject} Textbooks and Study Guides']
+
+
+class CompiledCatalog:
+    def __init__(self, system):
+        self.system = system
+
+        self.course_names = list(system.courses.keys())
+        self.course_index = {name: i for i, name in enumerate(self.course_names)}
+        self.university_codes = list(system.universities.keys())
+        self.university_index = {code: i for i, code in enumerate(self.university_codes)}
+
+        # State vocabulary (app state list plus any catchment-only states)
+        self.states = list(getattr(system, 'states', []))
+        for uni_data in system.universities.values():
+            for state in uni_data.get('catchment', []):
+                if state not in self.states:
+                    self.states.append(state)
+        self.state_index = {state: i for i, state in enumerate(self.states)}
+
+        # Subject vocabularies -> bit positions
+        self.jamb_vocab = []
+        self.jamb_bits = {}
+        self.olevel_vocab = []
+        self.olevel_bits = {}
+        for subject in system.jamb_subjects:
+            self._jamb_bit(subject)
+        for subject in system.waec_subjects:
+            self._olevel_bit(subject)
+
+        n_courses = len(self.course_names)
+        n_unis = len(self.university_codes)
+
+        self.jamb_rules = []
+        self.olevel_required = np.zeros(n_courses, dtype=np.uint64)
+        self.olevel_required_subjects = []
+        self.cutoffs = np.full((n_courses, n_unis), np.nan)
+        self.min_cutoff = np.zeros(n_courses)
+        self.success_cutoff = np.zeros(n_courses)
+        self.difficulty_level = np.zeros(n_courses)
+        self.difficulty_factor = np.zeros(n_courses)
+        self.categories = []
+        self.course_category = np.zeros(n_courses, dtype=np.int16)
+
+        for course_id, course in enumerate(self.course_names):
+            course_data = system.courses[course]
+            self.jamb_rules.append(self._compile_jamb_rule(course_data['jamb']))
+
+            required = list(dict.fromkeys(course_data['olevel']))
+            self.olevel_required_subjects.append(required)
+            mask = 0
+            for subject in required:
+                mask |= 1 << self._olevel_bit(subject)
+            self.olevel_required[course_id] = mask
+
+            universities = course_data.get('universities', {})
+            for uni_code, uni_data in universities.items():
+                self.cutoffs[course_id, self.university_index[uni_code]] = uni_data['cutoff']
+            # recommend_intelligent_alternatives falls back to 180, the rule-based predictor to 200
+            cutoffs = [uni['cutoff'] for uni in universities.values()]
+            self.min_cutoff[course_id] = min(cutoffs) if cutoffs else 180
+            self.success_cutoff[course_id] = min(cutoffs) if cutoffs else 200
+
+            difficulty = course_data.get('difficulty', 'Medium')
+            self.difficulty_level[course_id] = DIFFICULTY_LEVELS.get(difficulty, 2)
+            self.difficulty_factor[course_id] = DIFFICULTY_PENALTIES.get(difficulty, 1.0)
+
+            category = course_data['category']
+            if category not in self.categories:
+                self.categories.append(category)
+            self.course_category[course_id] = self.categories.index(category)
+
+        self.offered = ~np.isnan(self.cutoffs)
+
+        # Courses x O'Level vocab: times each subject appears in a course's requirement list
+        # (the scalar success predictor averages over the list as written, repeats included)
+        self.olevel_required_counts = np.zeros((n_courses, len(self.olevel_vocab)))
+        for course_id, course in enumerate(self.course_names):
+            for subject in system.courses[course]['olevel']:
+                self.olevel_required_counts[course_id, self.olevel_bits[subject]] += 1
+
+        # Study-plan resource tables, shared by every plan that uses them
+        self.course_resources = [course_resources(course) for course in self.course_names]
+        self.olevel_resources = {subject: olevel_resources(subject) for subject in self.olevel_vocab}
+
+        # Catchment lookup: universities x states
+        self.catchment = np.zeros((n_unis, len(self.states)), dtype=bool)
+        for uni_code, uni_data in system.universities.items():
+            for state in uni_data.get('catchment', []):
+                self.catchment[self.university_index[uni_code], self.state_index[state]] = True
+
+    def _jamb_bit(self, subject):
+        if subject not in self.jamb_bits:
+            if len(self.jamb_vocab) >= MAX_SUBJECT_BITS:
+                raise ValueError(f"JAMB subject vocabulary exceeds {MAX_SUBJECT_BITS} subjects")
+            self.jamb_bits[subject] = len(self.jamb_vocab)
+            self.jamb_vocab.append(subject)
+        return self.jamb_bits[subject]
+
+    def _olevel_bit(self, subject):
+        if subject not in self.olevel_bits:
+            if len(self.olevel_vocab) >= MAX_SUBJECT_BITS:
+                raise ValueError(f"O'Level subject vocabulary exceeds {MAX_SUBJECT_BITS} subjects")
+            self.olevel_bits[subject] = len(self.olevel_vocab)
+            self.olevel_vocab.append(subject)
+        return self.olevel_bits[subject]
+
+    def _compile_jamb_rule(self, requirements):
+        """Compile a JAMB requirement list into (option masks, needed) groups"""
+        groups = []
+        for req in requirements:
+            for prefix, needed in (('ANY_ONE_OF:', 1), ('ANY_TWO_FROM:', 2), ('ANY_THREE_FROM:', 3)):
+                if req.startswith(prefix):
+                    options_str = req.replace(prefix, '').strip('[]')
+                    options = [opt.strip() for opt in options_str.split(',')]
+                    masks = []
+                    for opt in options:
+                        mask = 1 << self._jamb_bit(opt)
+                        if prefix == 'ANY_THREE_FROM:' and opt in THREE_FROM_ALIASES:
+                            mask |= 1 << self._jamb_bit(THREE_FROM_ALIASES[opt])
+                        masks.append(mask)
+                    groups.append((tuple(masks), needed))
+                    break
+            else:
+                # Regular required subject (unknown prefixes are matched literally)
+                groups.append(((1 << self._jamb_bit(req),), 1))
+        return groups
+
+    def encode_jamb_subjects(self, subjects):
+        """Bitmask of the JAMB subjects known to the catalog"""
+        mask = 0
+        for subject in subjects:
+            bit = self.jamb_bits.get(subject)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def decode_jamb_subjects(self, mask):
+        return [subject for bit, subject in enumerate(self.jamb_vocab) if int(mask) >> bit & 1]
+
+    def jamb_valid(self, course_id, jamb_masks):
+        """Vectorized validate_jamb_subjects over an array of subject masks"""
+        jamb_masks = np.asarray(jamb_masks, dtype=np.uint64)
+        valid = np.ones(jamb_masks.shape, dtype=bool)
+        for options, needed in self.jamb_rules[course_id]:
+            matched = np.zeros(jamb_masks.shape, dtype=np.int8)
+            for option in options:
+                matched += (jamb_masks & np.uint64(option)) != 0
+            valid &= matched >= needed
+        return valid
+
+    def olevel_valid(self, course_id, credit_masks, credits):
+        """Vectorized validate_olevel_requirements over credit masks / counts"""
+        required = self.olevel_required[course_id]
+        credit_masks = np.asarray(credit_masks, dtype=np.uint64)
+        return (np.asarray(credits) >= 5) & ((credit_masks & required) == required)
+
+    def subject_valid(self, course_id, cohort):
+        """JAMB combination and O'Level requirements both satisfied"""
+        return (self.jamb_valid(course_id, cohort.jamb_masks) &
+                self.olevel_valid(course_id, cohort.credit_masks, cohort.credits))
+
+    def required_subject_grades(self, grades, course_ids):
+        """(totals, counts) of students' grade values over each course's required O'Level subjects"""
+        required = self.olevel_required_counts[np.asarray(course_ids, dtype=np.int64)]
+        totals = grades.astype(np.float64) @ required.T
+        counts = (grades > 0).astype(np.float64) @ required.T
+        return totals, counts
+
+    def success_factors(self, jamb_scores, subject_totals, subject_counts, course_ids):
+        """(jamb_factor, olevel_factor) students x courses, as in _rule_based_success_prediction"""
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        jamb_factor = np.minimum(1.0, np.asarray(jamb_scores)[:, None] / self.success_cutoff[course_ids][None, :])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            olevel_factor = np.where(subject_counts > 0, subject_totals / subject_counts / 9.0, 0.1)
+        return jamb_factor, olevel_factor
+
+    def rule_based_success(self, cohort, course_ids=None, rows=None):
+        """Vectorized _rule_based_success_prediction over cohort rows x courses (default: all of each)"""
+        if course_ids is None:
+            course_ids = np.arange(len(self.course_names))
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        jamb_scores, grades = cohort.jamb_scores, cohort.grades
+        if rows is not None:
+            jamb_scores, grades = jamb_scores[rows], grades[rows]
+        totals, counts = self.required_subject_grades(grades, course_ids)
+        jamb_factor, olevel_factor = self.success_factors(jamb_scores, totals, counts, course_ids)
+        probability = (jamb_factor * 0.4 + olevel_factor * 0.6) * self.difficulty_factor[course_ids][None, :]
+        return np.clip(probability, 0.05, 0.95)
+
+    def offering(self, course, uni_code):
+        """(course_id, uni_id) for a course x university offering, or None"""
+        course_id = self.course_index.get(course)
+        uni_id = self.university_index.get(uni_code)
+        if course_id is None or uni_id is None or not self.offered[course_id, uni_id]:
+            return None
+        return course_id, uni_id
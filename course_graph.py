@@ -0,0 +1,147 @@
+"""
+Course Graph
+Precomputed course-similarity graph (CSR adjacency) built from:
+- Overlap of JAMB and O'Level requirement subjects
+- Shared category
+- Shared career-prospect vocabulary
+- Overlapping cutoff ranges
+Related-course suggestions are a neighbor slice plus eligibility checks on those neighbors only.
+
+NOT_ADMITTED results from process_comprehensive_admission (and its batch and stream
+variants) carry these suggestions under an added 'related_courses' key: a list of
+{'course', 'category', 'similarity', 'eligible_universities'} dicts, possibly empty.
+ADMITTED results do not have the key; all other result keys are as before.
+"""
+
+import re
+import numpy as np
+from cohort import Cohort
+
+DEFAULT_WEIGHTS = {'jamb': 0.3, 'olevel': 0.2, 'category': 0.2, 'careers': 0.15, 'cutoffs': 0.15}
+
+
+def _mask_matrix(masks, bits=64):
+    """uint64 masks -> (n, bits) bool matrix"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    return ((masks[:, None] >> np.arange(bits, dtype=np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _jaccard(matrix):
+    """Pairwise Jaccard similarity between the rows of a bool matrix"""
+    matrix = matrix.astype(np.float64)
+    intersection = matrix @ matrix.T
+    sizes = matrix.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(union > 0, intersection / union, 0.0)
+
+
+class CourseGraph:
+    def __init__(self, catalog, neighbors=8, weights=None, min_similarity=0.2):
+        self.catalog = catalog
+        weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        n = len(catalog.course_names)
+        courses = catalog.system.courses
+
+        # Every subject a course's JAMB rule mentions (any option of any group)
+        jamb_masks = np.zeros(n, dtype=np.uint64)
+        for course_id, groups in enumerate(catalog.jamb_rules):
+            mask = 0
+            for options, _ in groups:
+                for option in options:
+                    mask |= option
+            jamb_masks[course_id] = mask
+
+        career_words = [self._career_words(courses[course].get('career_prospects', []))
+                        for course in catalog.course_names]
+        vocab = {word: i for i, word in enumerate(sorted(set().union(*career_words)))}
+        careers = np.zeros((n, len(vocab)), dtype=bool)
+        for course_id, words in enumerate(career_words):
+            careers[course_id, [vocab[word] for word in words]] = True
+
+        # Cutoff range overlap (intersection over union of [min, max] intervals)
+        with np.errstate(invalid='ignore'):
+            low = np.nanmin(np.where(catalog.offered, catalog.cutoffs, np.inf), axis=1)
+            high = np.nanmax(np.where(catalog.offered, catalog.cutoffs, -np.inf), axis=1)
+        overlap = np.clip(np.minimum(high[:, None], high[None, :]) - np.maximum(low[:, None], low[None, :]), 0, None)
+        span = np.maximum(high[:, None], high[None, :]) - np.minimum(low[:, None], low[None, :])
+        offered = np.isfinite(low)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cutoff_similarity = np.where(span > 0, overlap / span, 1.0)
+        cutoff_similarity = np.where(offered[:, None] & offered[None, :], cutoff_similarity, 0.0)
+
+        similarity = (
+            weights['jamb'] * _jaccard(_mask_matrix(jamb_masks)) +
+            weights['olevel'] * _jaccard(_mask_matrix(catalog.olevel_required)) +
+            weights['category'] * (catalog.course_category[:, None] == catalog.course_category[None, :]) +
+            weights['careers'] * _jaccard(careers) +
+            weights['cutoffs'] * cutoff_similarity
+        ) / sum(weights.values())
+        np.fill_diagonal(similarity, 0.0)
+        self.similarity_matrix = similarity
+
+        # Keep each course's top neighbors above the threshold, strongest first
+        indptr = [0]
+        indices = []
+        values = []
+        for course_id in range(n):
+            order = np.argsort(-similarity[course_id], kind='stable')[:neighbors]
+            order = order[similarity[course_id, order] >= min_similarity]
+            indices.extend(order.tolist())
+            values.extend(similarity[course_id, order].tolist())
+            indptr.append(len(indices))
+        self.indptr = np.array(indptr, dtype=np.int32)
+        self.indices = np.array(indices, dtype=np.int32)
+        self.weights = np.array(values, dtype=np.float32)
+
+    @staticmethod
+    def _career_words(prospects):
+        return {word for prospect in prospects for word in re.findall(r'[a-z]+', prospect.lower()) if len(word) > 2}
+
+    def neighbors(self, course):
+        """[(course, similarity)] strongest first"""
+        course_id = self.catalog.course_index.get(course)
+        if course_id is None:
+            return []
+        start, end = self.indptr[course_id], self.indptr[course_id + 1]
+        return [(self.catalog.course_names[i], float(w)) for i, w in zip(self.indices[start:end], self.weights[start:end])]
+
+    def related_courses(self, student_data, course=None, limit=5, candidates=None):
+        """Neighbors of a course the student meets subject requirements and some cutoff for.
+
+        candidates is an optional precomputed per-course eligibility row (as in the batch path);
+        otherwise only the neighbors are checked.
+        """
+        catalog = self.catalog
+        course_id = catalog.course_index.get(course or student_data.get('preferred_course'))
+        if course_id is None:
+            return []
+
+        start, end = self.indptr[course_id], self.indptr[course_id + 1]
+        neighbor_ids = self.indices[start:end]
+        if len(neighbor_ids) == 0:
+            return []
+
+        if candidates is None:
+            cohort = Cohort.from_profiles(catalog, [student_data])
+            jamb_score = cohort.jamb_scores[0]
+        else:
+            jamb_score = student_data['jamb_score']
+        related = []
+        for neighbor_id, similarity in zip(neighbor_ids, self.weights[start:end]):
+            if candidates is not None:
+                if not candidates[neighbor_id]:
+                    continue
+            elif jamb_score < catalog.min_cutoff[neighbor_id] or not catalog.subject_valid(neighbor_id, cohort)[0]:
+                continue
+            with np.errstate(invalid='ignore'):
+                eligible = int((catalog.cutoffs[neighbor_id] <= jamb_score).sum())
+            related.append({
+                'course': catalog.course_names[neighbor_id],
+                'category': catalog.system.courses[catalog.course_names[neighbor_id]]['category'],
+                'similarity': round(float(similarity), 3),
+                'eligible_universities': eligible
+            })
+            if len(related) >= limit:
+                break
+        return related
@@ -0,0 +1,86 @@
+"""
+Cutoff Simulator
+Sweep a range of cutoffs for a course x university offering over a cohort:
+eligible counts, catchment share and predicted-success distribution per cutoff
+"""
+
+import numpy as np
+from applicant_index import ApplicantIndex
+
+
+class CutoffSimulator:
+    def __init__(self, applicant_index):
+        self.index = applicant_index
+        self.catalog = applicant_index.catalog
+
+    @classmethod
+    def from_profiles(cls, advanced_system, profiles):
+        return cls(ApplicantIndex.from_profiles(advanced_system, profiles))
+
+    def simulate(self, course, uni_code, cutoffs=None, capacity=None, bins=10):
+        """Evaluate every cutoff in one pass over the score-sorted posting"""
+        offering = self.catalog.offering(course, uni_code)
+        if offering is None:
+            return {}
+        course_id, uni_id = offering
+
+        current_cutoff = self.catalog.system.courses[course]['universities'][uni_code]['cutoff']
+        if cutoffs is None:
+            # Default sweep: 40 points either side of this cycle's cutoff
+            cutoffs = np.arange(max(current_cutoff - 40, 0), min(current_cutoff + 40, 400) + 1)
+        cutoffs = np.asarray(cutoffs)
+
+        # Posting rows are in descending score order -> eligible set is a prefix
+        rows = self.index.postings(course_id)
+        success = self.index.success(course_id)
+        scores = self.index.cohort.jamb_scores[rows].astype(np.float64)
+        counts = np.searchsorted(-scores, -cutoffs.astype(np.float64), side='right')
+
+        states = self.index.cohort.states[rows]
+        in_catchment = (states >= 0) & self.catalog.catchment[uni_id][np.maximum(states, 0)]
+
+        # Cumulative sums with a leading zero so prefix k sums rows[:k]
+        catchment_cum = np.concatenate(([0], np.cumsum(in_catchment, dtype=np.int64)))
+        success_cum = np.concatenate(([0.0], np.cumsum(success)))
+        # Success histogram per prefix: positions of each bin are sorted, so the
+        # count of bin b among rows[:k] is a binary search for k
+        bin_ids = np.minimum((success * bins).astype(np.int64), bins - 1)
+        histogram = np.stack([np.searchsorted(np.flatnonzero(bin_ids == b), counts)
+                              for b in range(bins)], axis=1)
+
+        eligible = counts
+        catchment = catchment_cum[counts]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            catchment_share = np.where(eligible > 0, catchment / np.maximum(eligible, 1), 0.0)
+            mean_success = np.where(eligible > 0, success_cum[counts] / np.maximum(eligible, 1), 0.0)
+
+        result = {
+            'course': course,
+            'university_code': uni_code,
+            'university': self.catalog.system.universities[uni_code]['name'],
+            'current_cutoff': current_cutoff,
+            'subject_eligible': len(rows),
+            'cutoffs': cutoffs.tolist(),
+            'eligible': eligible.tolist(),
+            'catchment': catchment.tolist(),
+            'catchment_share': catchment_share.tolist(),
+            'mean_success': mean_success.tolist(),
+            'success_bins': np.linspace(0, 1, bins + 1).tolist(),
+            'success_histogram': histogram.tolist(),
+            'capacity': capacity,
+            'capacity_cutoff': None
+        }
+
+        # Lowest simulated cutoff that keeps eligible applicants within capacity
+        if capacity is not None:
+            within = np.flatnonzero(eligible <= capacity)
+            if len(within):
+                result['capacity_cutoff'] = cutoffs[within].min().item()
+
+        return result
+
+    def simulate_course(self, course, cutoffs=None, capacity=None, bins=10):
+        """Run the sweep for every university offering a course"""
+        universities = self.catalog.system.courses.get(course, {}).get('universities', {})
+        return {uni_code: self.simulate(course, uni_code, cutoffs, capacity, bins)
+                for uni_code in universities}
@@ -0,0 +1,288 @@
+"""
+Differential Harness
+Golden-output comparison of the optimized engine paths against the legacy Part2 code:
+- The reference engine is UltimateAdmissionSystemPart2 as it was at a git revision
+  (default: the repository's first commit) or in a given .py file, run one profile at a time
+- Candidate paths (scalar, batch, stream, or any registered callable) score the same
+  generated or recorded cohort
+- Diffs admission_status, message, eligible universities, recommendation order and
+  probabilities (within a tolerance), over the keys the legacy result has
+- Unmet O'Level subjects in messages are compared in sorted order, since the legacy code
+  lists them in set (str hash) order
+- The first divergent profiles are shrunk to small reproducers
+
+    python differential_harness.py --profiles 5000 --seed 7 --paths batch,stream
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+from collections import Counter
+from result_records import json_default, to_plain
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+CANONICAL_GRADES = ('A1', 'C6', 'F9')
+UNMET_PREFIX = 'Requirements not met: '
+FIELDS = ('admission_status', 'message', 'eligible_universities', 'recommendation_order', 'probabilities', 'details')
+
+
+def _stream_results(engine, profiles):
+    results = []
+    for student_data in profiles:
+        for event, payload in engine.stream_comprehensive_admission(student_data):
+            if event == 'complete':
+                results.append(payload)
+    return results
+
+
+# name -> callable(engine, profiles) returning one result per profile
+PATHS = {
+    'scalar': lambda engine, profiles: [engine.process_comprehensive_admission(p) for p in profiles],
+    'batch': lambda engine, profiles: engine.process_comprehensive_admission_batch(profiles),
+    'stream': _stream_results
+}
+
+
+def load_reference(part1, source=None):
+    """Legacy Part2 engine from a git revision (default: the first commit) or a .py file"""
+    if source and os.path.isfile(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            code = f.read()
+    else:
+        if not source:
+            roots = subprocess.check_output(['git', 'rev-list', '--max-parents=0', 'HEAD'], cwd=REPO_DIR, text=True)
+            source = roots.split()[-1]
+        code = subprocess.check_output(['git', 'show', f"{source}:ultimate_admission_system_part2.py"],
+                                       cwd=REPO_DIR, text=True)
+    # A private module, so the live ultimate_admission_system_part2 import is untouched
+    module = types.ModuleType('reference_part2')
+    module.__file__ = f"<reference {source}>"
+    exec(compile(code, module.__file__, 'exec'), module.__dict__)
+    return module.UltimateAdmissionSystemPart2(part1)
+
+
+def _eligible(university_options):
+    return [code for code, option in (university_options or {}).items() if option.get('eligible')]
+
+
+def _deep_diff(reference, candidate, tolerance, path, out):
+    if isinstance(reference, dict):
+        if not isinstance(candidate, dict):
+            out.append(('details', path, reference, candidate))
+            return
+        # Only keys the legacy result has; newer keys (e.g. related_courses) are additions
+        for key, value in reference.items():
+            if key not in candidate:
+                out.append(('details', f"{path}.{key}", value, '<missing>'))
+            else:
+                _deep_diff(value, candidate[key], tolerance, f"{path}.{key}", out)
+    elif isinstance(reference, list):
+        if not isinstance(candidate, list) or len(reference) != len(candidate):
+            out.append(('details', path, reference, candidate))
+            return
+        for i, (ref_item, cand_item) in enumerate(zip(reference, candidate)):
+            _deep_diff(ref_item, cand_item, tolerance, f"{path}[{i}]", out)
+    elif isinstance(reference, float) and isinstance(candidate, (int, float)) and not isinstance(candidate, bool):
+        if abs(reference - candidate) > tolerance:
+            out.append(('probabilities', path, reference, candidate))
+    elif reference != candidate:
+        out.append(('details', path, reference, candidate))
+
+
+def _canonical(value):
+    # The legacy code lists unmet O'Level subjects in set (str hash) order; the engine sorts them
+    if isinstance(value, str):
+        head, prefix, tail = value.partition(UNMET_PREFIX)
+        if not prefix:
+            return value
+        unmet, newline, rest = tail.partition('\n')
+        return head + prefix + '; '.join(sorted(unmet.split('; '))) + newline + rest
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def diff_results(reference, candidate, tolerance=1e-9):
+    """[(field, path, reference value, candidate value)] in FIELDS order"""
+    reference = _canonical(to_plain(reference))
+    candidate = _canonical(to_plain(candidate))
+    diffs = []
+    for key in ('admission_status', 'message'):
+        if reference.get(key) != candidate.get(key):
+            diffs.append((key, key, reference.get(key), candidate.get(key)))
+
+    ref_eligible = _eligible(reference.get('university_options'))
+    cand_eligible = _eligible(candidate.get('university_options'))
+    if ref_eligible != cand_eligible:
+        diffs.append(('eligible_universities', 'university_options', ref_eligible, cand_eligible))
+
+    ref_order = [rec['course'] for rec in reference.get('recommendations') or []]
+    cand_order = [rec['course'] for rec in candidate.get('recommendations') or []]
+    if ref_order != cand_order:
+        diffs.append(('recommendation_order', 'recommendations', ref_order, cand_order))
+        # Per-position details are meaningless once the order differs
+        reference = {key: value for key, value in reference.items() if key != 'recommendations'}
+
+    rest = []
+    _deep_diff({key: value for key, value in reference.items() if key not in ('admission_status', 'message')},
+               candidate, tolerance, 'result', rest)
+    # university_options are already reported as a whole when eligibility differs
+    if ref_eligible != cand_eligible:
+        rest = [diff for diff in rest if not diff[1].startswith('result.university_options')]
+    diffs.extend(rest)
+    return sorted(diffs, key=lambda diff: FIELDS.index(diff[0]))
+
+
+class DifferentialHarness:
+    def __init__(self, reference, candidate, paths=None, tolerance=1e-9):
+        self.reference = reference
+        self.candidate = candidate
+        self.paths = dict(PATHS if paths is None else paths)
+        self.tolerance = tolerance
+
+    def _first_field(self, name, profile):
+        """First diverging field for one profile run on its own, or None"""
+        reference = self.reference.process_comprehensive_admission(profile)
+        candidate = self.paths[name](self.candidate, [profile])[0]
+        diffs = diff_results(reference, candidate, self.tolerance)
+        return diffs[0][0] if diffs else None
+
+    def run(self, profiles, first=5, chunk=1000):
+        """Compare every path over profiles; returns a report with minimized reproducers"""
+        started = time.perf_counter()
+        references = [self.reference.process_comprehensive_admission(profile) for profile in profiles]
+        report = {'profiles': len(profiles), 'tolerance': self.tolerance, 'paths': {}}
+        for name, path in self.paths.items():
+            path_started = time.perf_counter()
+            by_field = Counter()
+            divergent = 0
+            entries = []
+            for start in range(0, len(profiles), chunk):
+                results = path(self.candidate, profiles[start:start + chunk])
+                for offset, result in enumerate(results):
+                    index = start + offset
+                    diffs = diff_results(references[index], result, self.tolerance)
+                    if not diffs:
+                        continue
+                    divergent += 1
+                    by_field.update({diff[0] for diff in diffs})
+                    if len(entries) < first:
+                        field, where, expected, actual = diffs[0]
+                        entries.append({
+                            'index': index, 'field': field, 'path': where,
+                            'reference': expected, 'candidate': actual,
+                            'diffs': len(diffs), 'profile': profiles[index]
+                        })
+
+            for entry in entries:
+                entry.update(self.minimize(name, entry['profile'], entry['field']))
+            report['paths'][name] = {
+                'divergent': divergent,
+                'by_field': dict(by_field),
+                'seconds': round(time.perf_counter() - path_started, 2),
+                'first': entries
+            }
+        report['seconds'] = round(time.perf_counter() - started, 2)
+        return report
+
+    def minimize(self, name, profile, field, max_trials=400):
+        """Greedily simplify a divergent profile while the same field still diverges"""
+        if self._first_field(name, profile) != field:
+            # Divergence depends on the rest of the batch; keep the original
+            return {'reproduces_alone': False, 'reproducer': None}
+
+        trials = 0
+        changed = True
+        while changed and trials < max_trials:
+            changed = False
+            for candidate in self._reductions(profile):
+                trials += 1
+                if self._first_field(name, candidate) == field:
+                    profile = candidate
+                    changed = True
+                    break
+                if trials >= max_trials:
+                    break
+        return {'reproduces_alone': True, 'reproducer': profile, 'trials': trials}
+
+    @staticmethod
+    def _reductions(profile):
+        """Smaller or more canonical variants of a profile, most aggressive first"""
+        keep = ('name', 'preferred_course', 'jamb_score', 'jamb_subjects', 'olevel_grades',
+                'learning_style', 'study_niche', 'state')
+        if set(profile) - set(keep):
+            yield {key: value for key, value in profile.items() if key in keep}
+
+        grades = profile.get('olevel_grades', {})
+        for subject in grades:
+            yield dict(profile, olevel_grades={s: g for s, g in grades.items() if s != subject})
+        subjects = profile.get('jamb_subjects', [])
+        for subject in subjects:
+            yield dict(profile, jamb_subjects=[s for s in subjects if s != subject])
+
+        for key, value in (('name', 'Applicant'), ('learning_style', 'Visual'), ('study_niche', 'Practical'),
+                           ('state', 'Lagos')):
+            if profile.get(key) != value:
+                yield dict(profile, **{key: value})
+        score = profile.get('jamb_score', 0)
+        for rounded in (round(score, -2), round(score / 50) * 50, round(score, -1)):
+            if rounded != score:
+                yield dict(profile, jamb_score=rounded)
+        # One-way moves onto a few canonical grades, so shrinking always terminates
+        for subject, grade in grades.items():
+            if grade not in CANONICAL_GRADES:
+                for simpler in CANONICAL_GRADES:
+                    yield dict(profile, olevel_grades=dict(grades, **{subject: simpler}))
+
+
+def main():
+    from ultimate_admission_system import UltimateAdmissionSystem
+    from ultimate_admission_system_part2 import UltimateAdmissionSystemPart2
+    from cohort_generator import CohortGenerator
+
+    parser = argparse.ArgumentParser(description='Diff optimized engine paths against the legacy Part2 code')
+    parser.add_argument('--profiles', type=int, default=2000, help='Generated profiles (ignored with --input)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--input', help='JSONL file of student_data profiles')
+    parser.add_argument('--paths', default=','.join(PATHS), help=f"Comma-separated subset of {', '.join(PATHS)}")
+    parser.add_argument('--reference', help='Git revision or .py file for the legacy Part2 (default: first commit)')
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    parser.add_argument('--first', type=int, default=5, help='Divergent profiles to report and minimize per path')
+    parser.add_argument('--output', help='Write the full report as JSON')
+    args = parser.parse_args()
+
+    part1 = UltimateAdmissionSystem()
+    if args.input:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            profiles = [json.loads(line) for line in f if line.strip()]
+    else:
+        cohort = CohortGenerator(part1.get_compiled_catalog(), seed=args.seed).generate(args.profiles)
+        profiles = [cohort.profile(row) for row in range(len(cohort))]
+
+    paths = {name: PATHS[name] for name in args.paths.split(',')}
+    harness = DifferentialHarness(load_reference(part1, args.reference), UltimateAdmissionSystemPart2(part1),
+                                  paths, args.tolerance)
+    report = harness.run(profiles, args.first)
+
+    print(f"{report['profiles']} profiles in {report['seconds']}s")
+    for name, summary in report['paths'].items():
+        print(f"  {name:<8} {summary['divergent']} divergent {summary['by_field'] or ''} ({summary['seconds']}s)")
+        for entry in summary['first']:
+            print(f"    #{entry['index']} {entry['field']} at {entry['path']}: "
+                  f"{str(entry['reference'])[:80]!r} != {str(entry['candidate'])[:80]!r}")
+            if entry['reproducer'] is not None:
+                print(f"      reproducer: {json.dumps(entry['reproducer'], default=json_default)}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=json_default)
+    return 1 if any(summary['divergent'] for summary in report['paths'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,11 +9,53 @@ import json
 import os
 from fpdf import FPDF
 import streamlit as st
+from result_records import json_default
+from interaction_store import InteractionStore
+from compiled_catalog import GRADE_VALUES, JAMB_PREP_RESOURCES, course_resources, olevel_resources
+
+JAMB_IMPROVEMENT_ACTION = {
+    'priority': 'HIGH',
+    'area': 'JAMB Score Improvement',
+    'action': 'Focus on intensive JAMB preparation',
+    'target': 'Increase score by 50+ points',
+    'timeline': '3-6 months'
+}
+
+LEARNING_ADVICE = {
+    'Visual': 'Use diagrams, charts, and visual aids. Create mind maps for complex topics.',
+    'Auditory': 'Join study groups, use audio materials, and explain concepts aloud.',
+    'Kinesthetic': 'Use hands-on practice, experiments, and physical activities while studying.',
+    'Reading/Writing': 'Take detailed notes, create summaries, and practice writing exercises.'
+}
+
+def _study_method_action(advice):
+    return {
+        'priority': 'MEDIUM',
+        'area': 'Study Method Optimization',
+        'action': advice,
+        'target': 'Improve learning efficiency',
+        'timeline': 'Ongoing'
+    }
+
+STUDY_METHOD_ACTIONS = {style: _study_method_action(advice) for style, advice in LEARNING_ADVICE.items()}
+DEFAULT_STUDY_METHOD_ACTION = _study_method_action('Use varied study methods')
+
+JAMB_TIMELINE = [
+    {'period': 'Month 1-2', 'focus': 'JAMB fundamentals and practice tests'},
+    {'period': 'Month 3-4', 'focus': 'Intensive JAMB preparation and mock exams'},
+    {'period': 'Month 5-6', 'focus': 'Final JAMB preparation and registration'}
+]
+OLEVEL_TIMELINE = [
+    {'period': 'Month 4-6', 'focus': 'O\'Level examinations and results'},
+    {'period': 'Month 7-8', 'focus': 'University applications with improved grades'}
+]
 
 class EnhancedFeatures:
     def __init__(self):
         self.data_storage_path = "data/student_interactions.csv"
         self.session_storage_path = "data/saved_sessions.json"
+        self.interaction_store_path = "data/interactions"
+        self._interaction_store = None
         
     def save_student_interaction(self, student_data, result, recommendations):
         """Save student interaction for continuous model improvement"""
@@ -39,21 +81,33 @@ class EnhancedFeatures:
             'special_needs': student_data.get('special_needs', 'None')
         }
         
-        # Save to CSV for model retraining
-        df_new = pd.DataFrame([interaction])
+        # Open (and if needed migrate) the columnar store before the CSV gains this row
+        store = self._get_interaction_store()
         
-        if os.path.exists(self.data_storage_path):
-            df_existing = pd.read_csv(self.data_storage_path)
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-        else:
-            df_combined = df_new
+        # CSV and columnar copy are written under one lock, so every process sees them in step
+        with store.locked():
+            # Append to CSV for model retraining (header only on a new file)
+            os.makedirs(os.path.dirname(self.data_storage_path), exist_ok=True)
+            write_header = not os.path.exists(self.data_storage_path)
+            pd.DataFrame([interaction]).to_csv(self.data_storage_path, mode='a', header=write_header, index=False)
             
-        os.makedirs(os.path.dirname(self.data_storage_path), exist_ok=True)
-        df_combined.to_csv(self.data_storage_path, index=False)
+            # Columnar copy for analytics
+            store.append([interaction])
         
         return interaction['student_id']
     
-    def generate_pdf_report(self, student_data, result, recommendations):
+    def _get_interaction_store(self):
+        """Columnar interaction store, migrated from the CSV on first use"""
+        if self._interaction_store is None:
+            store = InteractionStore(self.interaction_store_path)
+            # Checked under the lock: processes starting together must import the CSV only once
+            with store.locked():
+                if len(store) == 0 and os.path.exists(self.data_storage_path):
+                    store.import_csv(self.data_storage_path)
+            self._interaction_store = store
+        return self._interaction_store
+    
+    def generate_pdf_report(self, student_data, result, recommendations, generated_at=None):
         """Generate comprehensive PDF report"""
         pdf = FPDF()
         pdf.add_page()
@@ -135,53 +189,90 @@ class EnhancedFeatures:
         # Footer
         pdf.ln(10)
         pdf.set_font('Arial', 'I', 8)
-        pdf.cell(0, 6, f"Report generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", 0, 1, 'C')
+        generated_at = generated_at or datetime.now()
+        pdf.cell(0, 6, f"Report generated on {generated_at.strftime('%B %d, %Y at %I:%M %p')}", 0, 1, 'C')
         pdf.cell(0, 6, "Nigerian University Admission Prediction System", 0, 1, 'C')
         
         return pdf
     
-    def generate_study_plan(self, student_data, result, recommendations):
+    def generate_study_plan(self, student_data, result, recommendations, catalog=None):
         """Generate personalized study improvement plan"""
-        jamb_score = student_data['jamb_score']
-        olevel_grades = student_data['olevel_grades']
-        preferred_course = student_data['preferred_course']
-        
-        # Analyze weaknesses
-        grade_values = {'A1': 9, 'B2': 8, 'B3': 7, 'C4': 6, 'C5': 5, 'C6': 4, 'D7': 3, 'E8': 2, 'F9': 1}
-        
         weak_subjects = []
         strong_subjects = []
+        credits = 0
         
-        for subject, grade in olevel_grades.items():
-            score = grade_values.get(grade, 1)
+        for subject, grade in student_data['olevel_grades'].items():
+            score = GRADE_VALUES.get(grade, 1)
             if score <= 4:  # Below C6
                 weak_subjects.append((subject, grade, score))
             elif score >= 7:  # B3 and above
                 strong_subjects.append((subject, grade, score))
+            if grade in GRADE_VALUES and score >= 4:
+                credits += 1
+        
+        return self._study_plan(student_data, result, recommendations, weak_subjects, strong_subjects,
+                                credits, catalog)
+    
+    def generate_study_plans(self, students, results, recommendations, catalog=None):
+        """Study plans for a whole cohort in one call.
+        
+        Weak/strong subjects are classified over one flattened array of every student's
+        grades. With a compiled catalog, course and O'Level resource lists come from its
+        precomputed tables; constant lists and advice entries are shared between plans.
+        """
+        n = len(students)
+        if n == 0:
+            return []
+        
+        # Flatten all (subject, grade) entries, keeping each student's dict order
+        counts = np.fromiter((len(s['olevel_grades']) for s in students), dtype=np.int64, count=n)
+        subjects = [subject for s in students for subject in s['olevel_grades']]
+        grades = [grade for s in students for grade in s['olevel_grades'].values()]
+        codes, uniques = pd.factorize(pd.Series(grades, dtype=object))
+        # Unknown grades count as F9 for weakness but never as a credit
+        values = np.array([GRADE_VALUES.get(grade, 1) for grade in uniques], dtype=np.int64)[codes]
+        credit_values = np.array([GRADE_VALUES.get(grade, 0) for grade in uniques], dtype=np.int64)[codes]
+        
+        owner = np.repeat(np.arange(n), counts)
+        credits = np.bincount(owner, weights=credit_values >= 4, minlength=n).astype(int)
+        weak_entries = np.flatnonzero(values <= 4)  # Below C6
+        strong_entries = np.flatnonzero(values >= 7)  # B3 and above
+        weak_bounds = np.searchsorted(owner[weak_entries], np.arange(n + 1)).tolist()
+        strong_bounds = np.searchsorted(owner[strong_entries], np.arange(n + 1)).tolist()
+        
+        # Tuples for the whole cohort at once; each student gets a slice
+        values = values.tolist()
+        weak = [(subjects[k], grades[k], values[k]) for k in weak_entries.tolist()]
+        strong = [(subjects[k], grades[k], values[k]) for k in strong_entries.tolist()]
+        credits = credits.tolist()
+        
+        return [
+            self._study_plan(student_data, result, recs,
+                             weak[weak_bounds[i]:weak_bounds[i + 1]],
+                             strong[strong_bounds[i]:strong_bounds[i + 1]],
+                             credits[i], catalog)
+            for i, (student_data, result, recs) in enumerate(zip(students, results, recommendations))
+        ]
+    
+    def _study_plan(self, student_data, result, recommendations, weak_subjects, strong_subjects, credits, catalog):
+        jamb_score = student_data['jamb_score']
         
-        # Generate plan
         plan = {
             'assessment': {
                 'jamb_score': jamb_score,
                 'jamb_status': 'Excellent' if jamb_score >= 300 else 'Good' if jamb_score >= 250 else 'Needs Improvement',
-                'olevel_credits': len([g for g in olevel_grades.values() if grade_values.get(g, 0) >= 4]),
+                'olevel_credits': credits,
                 'weak_subjects': weak_subjects,
                 'strong_subjects': strong_subjects
             },
             'recommendations': [],
             'timeline': self._generate_timeline(jamb_score, weak_subjects),
-            'resources': self._get_study_resources(preferred_course, weak_subjects)
+            'resources': self._get_study_resources(student_data['preferred_course'], weak_subjects, catalog)
         }
         
         # Generate specific recommendations
         if jamb_score < 200:
-            plan['recommendations'].append({
-                'priority': 'HIGH',
-                'area': 'JAMB Score Improvement',
-                'action': 'Focus on intensive JAMB preparation',
-                'target': 'Increase score by 50+ points',
-                'timeline': '3-6 months'
-            })
+            plan['recommendations'].append(JAMB_IMPROVEMENT_ACTION)
         
         if len(weak_subjects) > 2:
             plan['recommendations'].append({
@@ -202,20 +293,7 @@ class EnhancedFeatures:
             })
         
         # Learning style specific advice
-        learning_advice = {
-            'Visual': 'Use diagrams, charts, and visual aids. Create mind maps for complex topics.',
-            'Auditory': 'Join study groups, use audio materials, and explain concepts aloud.',
-            'Kinesthetic': 'Use hands-on practice, experiments, and physical activities while studying.',
-            'Reading/Writing': 'Take detailed notes, create summaries, and practice writing exercises.'
-        }
-        
-        plan['recommendations'].append({
-            'priority': 'MEDIUM',
-            'area': 'Study Method Optimization',
-            'action': learning_advice.get(student_data['learning_style'], 'Use varied study methods'),
-            'target': 'Improve learning efficiency',
-            'timeline': 'Ongoing'
-        })
+        plan['recommendations'].append(STUDY_METHOD_ACTIONS.get(student_data['learning_style'], DEFAULT_STUDY_METHOD_ACTION))
         
         return plan
     
@@ -224,61 +302,30 @@ class EnhancedFeatures:
         timeline = []
         
         if jamb_score < 250:
-            timeline.extend([
-                {'period': 'Month 1-2', 'focus': 'JAMB fundamentals and practice tests'},
-                {'period': 'Month 3-4', 'focus': 'Intensive JAMB preparation and mock exams'},
-                {'period': 'Month 5-6', 'focus': 'Final JAMB preparation and registration'}
-            ])
+            timeline.extend(JAMB_TIMELINE)
         
         if weak_subjects:
             timeline.extend([
                 {'period': 'Month 1-3', 'focus': f'O\'Level preparation for {len(weak_subjects)} subjects'},
-                {'period': 'Month 4-6', 'focus': 'O\'Level examinations and results'},
-                {'period': 'Month 7-8', 'focus': 'University applications with improved grades'}
+                OLEVEL_TIMELINE[0],
+                OLEVEL_TIMELINE[1]
             ])
         
         return timeline
     
-    def _get_study_resources(self, course, weak_subjects):
+    def _get_study_resources(self, course, weak_subjects, catalog=None):
         """Get study resources based on course and weaknesses"""
-        resources = {
-            'jamb_prep': [
-                'JAMB Past Questions (2010-2024)',
-                'JAMB CBT Practice Software',
-                'Online JAMB Tutorials (YouTube/Educational platforms)',
-                'JAMB Study Groups and Forums'
-            ],
-            'olevel_prep': [],
-            'course_specific': []
-        }
-        
-        # Add O'Level resources for weak subjects
+        olevel_prep = []
         for subject, _, _ in weak_subjects:
-            resources['olevel_prep'].append(f'{subject} WAEC Past Questions')
-            resources['olevel_prep'].append(f'{subject} Textbooks and Study Guides')
-        
-        # Add course-specific resources
-        course_lower = course.lower()
-        if 'medicine' in course_lower or 'nursing' in course_lower:
-            resources['course_specific'].extend([
-                'Biology and Chemistry intensive courses',
-                'Medical terminology resources',
-                'Healthcare career guidance materials'
-            ])
-        elif 'engineering' in course_lower or 'computer' in course_lower:
-            resources['course_specific'].extend([
-                'Mathematics and Physics advanced courses',
-                'Programming tutorials (if Computer Engineering)',
-                'Engineering career pathway guides'
-            ])
-        elif 'law' in course_lower:
-            resources['course_specific'].extend([
-                'Government and Literature intensive study',
-                'Legal terminology and concepts',
-                'Law school preparation materials'
-            ])
-        
-        return resources
+            cached = catalog.olevel_resources.get(subject) if catalog is not None else None
+            olevel_prep.extend(cached or olevel_resources(subject))
+        
+        course_id = catalog.course_index.get(course) if catalog is not None else None
+        return {
+            'jamb_prep': JAMB_PREP_RESOURCES,
+            'olevel_prep': olevel_prep,
+            'course_specific': catalog.course_resources[course_id] if course_id is not None else course_resources(course)
+        }
     
     def save_session(self, session_id, student_data):
         """Save user session for resume functionality"""
@@ -304,7 +351,7 @@ class EnhancedFeatures:
         # Save updated sessions
         os.makedirs(os.path.dirname(self.session_storage_path), exist_ok=True)
         with open(self.session_storage_path, 'w') as f:
-            json.dump(sessions, f, indent=2)
+            json.dump(sessions, f, indent=2, default=json_default)
     
     def load_session(self, session_id):
         """Load saved session"""
@@ -494,17 +541,7 @@ class EnhancedFeatures:
     
     def get_training_data_stats(self):
         """Get statistics about collected training data"""
-        if not os.path.exists(self.data_storage_path):
-            return {"total_interactions": 0, "latest_interaction": None}
-        
         try:
-            df = pd.read_csv(self.data_storage_path)
-            return {
-                "total_interactions": len(df),
-                "latest_interaction": df['timestamp'].max() if len(df) > 0 else None,
-                "admission_rate": df['admission_status'].value_counts().get('ADMITTED', 0) / len(df) if len(df) > 0 else 0,
-                "top_courses": df['preferred_course'].value_counts().head(5).to_dict() if len(df) > 0 else {},
-                "avg_jamb_score": df['jamb_score'].mean() if len(df) > 0 else 0
-            }
+            return self._get_interaction_store().stats()
         except:
-            return {"total_interactions": 0, "latest_interaction": None}
\ No newline at end of file
+            return {"total_interactions": 0, "latest_interaction": None}
@@ -0,0 +1,281 @@
+"""
+Success Explanations
+Per-feature contributions behind predict_success_probability, for many courses at once:
+- Category tree models (decision trees / random forests): path-based contributions,
+  walked over compiled node arrays for every (student, course) row together
+- Rule-based fallback: exact decomposition of (jamb * 0.4 + olevel * 0.6) * difficulty
+base + contributions + clip_adjustment equals the predicted probability.
+"""
+
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+from cohort import Cohort
+
+FEATURE_NAMES = ['jamb_score', 'olevel_average', 'course_subject_average', 'subjects_taken',
+                 'course_difficulty', 'learning_style', 'study_niche']
+
+
+class CompiledForest:
+    """All trees of a tree classifier concatenated into flat node arrays"""
+
+    def __init__(self, estimators, class_index=1):
+        left, right, feature, threshold, value, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            leaf = tree.children_left < 0
+            left.append(np.where(leaf, -1, tree.children_left + offset))
+            right.append(np.where(leaf, -1, tree.children_right + offset))
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            counts = tree.value[:, 0, :]
+            value.append(counts[:, class_index] / counts.sum(axis=1))
+            roots.append(offset)
+            offset += tree.node_count
+
+        self.left = np.concatenate(left)
+        self.right = np.concatenate(right)
+        self.feature = np.concatenate(feature)
+        self.threshold = np.concatenate(threshold)
+        self.value = np.concatenate(value)
+        self.is_leaf = self.left < 0
+        self.roots = np.array(roots, dtype=np.int64)
+        self.bias = float(self.value[self.roots].mean())
+
+    @classmethod
+    def compile(cls, model):
+        """CompiledForest for a fitted tree classifier or forest of them, else None"""
+        estimators = getattr(model, 'estimators_', None)
+        if estimators is None:
+            estimators = [model]
+        if not all(hasattr(estimator, 'tree_') for estimator in estimators):
+            return None
+        if len(getattr(model, 'classes_', ())) != 2:
+            return None
+        return cls(estimators)
+
+    def contributions(self, X):
+        """(n, n_features) path contributions for the rows of X, averaged over trees"""
+        # Trees compare float32 inputs against float64 thresholds, as sklearn does
+        X = np.asarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        n_trees = len(self.roots)
+        nodes = np.tile(self.roots, n)
+        rows = np.repeat(np.arange(n), n_trees)
+        totals = np.zeros(n * n_features)
+
+        # Every (row, tree) path advances one level per pass; each step credits its split feature
+        while len(nodes):
+            active = ~self.is_leaf[nodes]
+            nodes, rows = nodes[active], rows[active]
+            if not len(nodes):
+                break
+            feature = self.feature[nodes]
+            go_left = X[rows, feature] <= self.threshold[nodes]
+            children = np.where(go_left, self.left[nodes], self.right[nodes])
+            totals += np.bincount(rows * n_features + feature, weights=self.value[children] - self.value[nodes],
+                                  minlength=n * n_features)
+            nodes = children
+        return totals.reshape(n, n_features) / n_trees
+
+
+class SuccessExplainer:
+    def __init__(self, advanced_system, max_entries=100000):
+        self.advanced_system = advanced_system
+        self.catalog = advanced_system.system.get_compiled_catalog()
+        self.max_entries = max_entries
+        self._forests = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def explain(self, student_profile, courses=None):
+        """{course: explanation} for one student over the given (default: all) courses"""
+        cohort = Cohort.from_profiles(self.catalog, [student_profile])
+        course_ids = self._course_ids(courses)
+        probability, base, contributions, adjustment, methods = self.explain_cohort(cohort, course_ids)
+        catalog = self.catalog
+        explanations = {}
+        for j, course_id in enumerate(course_ids):
+            course = catalog.course_names[course_id]
+            explanations[course] = {
+                'course': course,
+                'category': catalog.categories[catalog.course_category[course_id]],
+                'method': methods[j],
+                'probability': float(probability[0, j]),
+                'base': float(base[0, j]),
+                'contributions': dict(zip(FEATURE_NAMES, contributions[0, j].tolist())),
+                'clip_adjustment': float(adjustment[0, j])
+            }
+        return explanations
+
+    def _course_ids(self, courses):
+        if courses is None:
+            return list(range(len(self.catalog.course_names)))
+        # Unknown courses have no features to explain (predict_success_probability returns 0.5)
+        return [self.catalog.course_index[course] for course in courses if course in self.catalog.course_index]
+
+    def features(self, cohort, course_ids):
+        """(students, courses, 7) matrix of _extract_ml_features values"""
+        catalog = self.catalog
+        if (cohort.styles < 0).any() or (cohort.niches < 0).any():
+            raise ValueError("unknown learning_style or study_niche")
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        n, k = len(cohort), len(course_ids)
+
+        subject_totals, subject_counts = catalog.required_subject_grades(cohort.grades, course_ids)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            subject_average = np.where(subject_counts > 0, subject_totals / subject_counts, 1)
+
+        features = np.empty((n, k, len(FEATURE_NAMES)))
+        features[:, :, 0] = (cohort.jamb_scores / 400.0)[:, None]
+        features[:, :, 1] = (cohort.olevel_totals / np.maximum(cohort.olevel_counts, 1) / 9.0)[:, None]
+        features[:, :, 2] = subject_average / 9.0
+        features[:, :, 3] = (cohort.olevel_counts / 10.0)[:, None]
+        features[:, :, 4] = (catalog.difficulty_level[course_ids] / 4.0)[None, :]
+        features[:, :, 5] = (cohort.styles / 3.0)[:, None]
+        features[:, :, 6] = (cohort.niches / 3.0)[:, None]
+        return features, subject_totals, subject_counts
+
+    def explain_cohort(self, cohort, course_ids):
+        """(probability, base, contributions, clip_adjustment, methods) over students x courses"""
+        catalog = self.catalog
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        features, subject_totals, subject_counts = self.features(cohort, course_ids)
+        n, k = len(cohort), len(course_ids)
+
+        probability = np.empty((n, k))
+        base = np.zeros((n, k))
+        contributions = np.zeros((n, k, len(FEATURE_NAMES)))
+        raw = np.empty((n, k))
+        methods = ['rules'] * k
+
+        ml_models = self.advanced_system.ml_models
+        rule_columns = np.ones(k, dtype=bool)
+        categories = catalog.course_category[course_ids]
+        for category_id in np.unique(categories):
+            category = catalog.categories[category_id]
+            if category not in ml_models:
+                continue
+            columns = np.flatnonzero(categories == category_id)
+            explained = self._explain_model(category, ml_models[category], features[:, columns].reshape(-1, len(FEATURE_NAMES)))
+            if explained is None:
+                continue
+            model_probability, model_base, model_contributions = explained
+            raw[:, columns] = model_probability.reshape(n, len(columns))
+            base[:, columns] = model_base.reshape(n, len(columns))
+            contributions[:, columns] = model_contributions.reshape(n, len(columns), len(FEATURE_NAMES))
+            rule_columns[columns] = False
+            for column in columns:
+                methods[column] = 'model'
+
+        if rule_columns.any():
+            self._explain_rules(cohort, course_ids, rule_columns, subject_totals, subject_counts, raw, contributions)
+
+        probability[:] = np.clip(raw, 0.05, 0.95)
+        adjustment = probability - base - contributions.sum(axis=2)
+        return probability, base, contributions, adjustment, methods
+
+    def _explain_rules(self, cohort, course_ids, columns, subject_totals, subject_counts, raw, contributions):
+        """Exact split of _rule_based_success_prediction: jamb term, O'Level term, difficulty change"""
+        catalog = self.catalog
+        ids = course_ids[columns]
+        jamb_factor, olevel_factor = catalog.success_factors(
+            cohort.jamb_scores, subject_totals[:, columns], subject_counts[:, columns], ids
+        )
+        jamb_term = jamb_factor * 0.4
+        olevel_term = olevel_factor * 0.6
+        scaled = (jamb_term + olevel_term) * catalog.difficulty_factor[ids][None, :]
+
+        raw[:, columns] = scaled
+        contributions[:, columns, 0] = jamb_term
+        contributions[:, columns, 2] = olevel_term
+        contributions[:, columns, 4] = scaled - (jamb_term + olevel_term)
+
+    def _explain_model(self, category, model, X):
+        """(raw probability, base, contributions) for the rows of X, or None to fall back to rules"""
+        forest = self._forest(category, model)
+        try:
+            model_probability = model.predict_proba(X)[:, 1]
+        except Exception:
+            return None
+        if forest is None:
+            # Not a tree model: the whole probability is reported as its base
+            return model_probability, model_probability, np.zeros(X.shape)
+
+        base = np.full(len(X), forest.bias)
+        contributions = np.empty(X.shape)
+        keys = [(category, tuple(row)) for row in X.tolist()]
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    contributions[i] = cached
+            self.hits += len(keys) - sum(len(rows) for rows in missing.values())
+            self.misses += len(missing)
+
+        if missing:
+            first_rows = [rows[0] for rows in missing.values()]
+            computed = forest.contributions(X[first_rows])
+            with self._lock:
+                for (key, rows), values in zip(missing.items(), computed):
+                    contributions[rows] = values
+                    # A copy, so an entry does not keep the whole batch array alive
+                    self._cache[key] = values.copy()
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return model_probability, base, contributions
+
+    def _forest(self, category, model):
+        entry = self._forests.get(category)
+        if entry is None or entry[0]() is not model:
+            # A replaced model invalidates the explanations cached for its category; the model is
+            # referenced weakly so the compiled forest does not keep an evicted model alive
+            entry = (weakref.ref(model), CompiledForest.compile(model))
+            self._forests[category] = entry
+            self._drop_cached(category)
+        return entry[1]
+
+    def _drop_cached(self, category):
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == category]:
+                del self._cache[key]
+
+    def forget(self, category):
+        """Drop the compiled forest and cached explanations of a model that is no longer resident"""
+        self._forests.pop(category, None)
+        self._drop_cached(category)
+
+    def _entry_bytes(self):
+        key, values = next(iter(self._cache.items()))
+        # Key tuple, its feature floats, the contribution array and the dict slot
+        return (sys.getsizeof(key) + sys.getsizeof(key[1]) + sum(sys.getsizeof(value) for value in key[1]) +
+                sys.getsizeof(values) + 100)
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held by cached explanations"""
+        with self._lock:
+            return self._entry_bytes() * len(self._cache) if self._cache else 0
+
+    def evict(self, nbytes):
+        """Drop least recently used explanations until at least nbytes are freed; returns bytes freed"""
+        with self._lock:
+            if not self._cache:
+                return 0
+            entry_bytes = self._entry_bytes()
+            count = min(len(self._cache), -(-nbytes // entry_bytes))
+            for _ in range(count):
+                self._cache.popitem(last=False)
+        return count * entry_bytes
+
+    def cache_info(self):
+        return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,285 @@
+"""
+Interaction Store
+Columnar on-disk history of student interactions:
+- One raw NumPy file per column, memory-mapped for reads
+- Course, state, status and other low-cardinality columns dictionary-encoded
+- Free-text columns stored as offsets + UTF-8 bytes
+- Aggregates read only the columns they need, in fixed-size chunks
+- Writers in other threads and processes are serialized by a lock file; each append
+  re-reads the committed metadata first, and locked() holds the lock across several
+  steps (e.g. a check-then-import, or an append mirrored to another file)
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+
+# column -> (kind, dtype); dict columns hold codes into a per-column dictionary
+SCHEMA = {
+    'timestamp': ('time', '<i8'),
+    'student_id': ('text', None),
+    'name': ('text', None),
+    'state': ('dict', '<u2'),
+    'jamb_score': ('number', '<f8'),
+    'jamb_subjects': ('dict', '<u4'),
+    'preferred_course': ('dict', '<u2'),
+    'admission_status': ('dict', '<u2'),
+    'success_probability': ('number', '<f8'),
+    'top_recommendation': ('dict', '<u2'),
+    'recommendation_match_score': ('number', '<f8'),
+    'learning_style': ('dict', '<u2'),
+    'study_niche': ('dict', '<u2'),
+    'olevel_credits': ('number', '<u1'),
+    'career_interest': ('dict', '<u2'),
+    'extracurricular_count': ('number', '<u2'),
+    'financial_status': ('dict', '<u2'),
+    'special_needs': ('dict', '<u2')
+}
+
+CHUNK_ROWS = 1 << 22
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _to_micros(timestamp):
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros):
+    return (EPOCH + timedelta(microseconds=int(micros))).isoformat()
+
+
+class InteractionStore:
+    def __init__(self, directory='data/interactions'):
+        self.directory = directory
+        # Re-entrant: stats() refreshes and aggregates under one hold
+        self._lock = threading.RLock()
+        self._file_lock_depth = 0
+        self._meta_path = os.path.join(directory, 'meta.json')
+        self.refresh()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared with writers in other processes (re-entrant while _lock is held)"""
+        if self._file_lock_depth:
+            # flock is per open file, so a nested acquire would wait on itself
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'lock'), 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            self._file_lock_depth = 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth = 0
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @contextmanager
+    def locked(self):
+        """Hold the writer lock with the committed metadata re-read; appends inside it nest"""
+        with self._lock, self._file_lock():
+            self._read_meta()
+            yield self
+
+    def refresh(self):
+        """Pick up rows committed by other writers"""
+        with self._lock:
+            self._read_meta()
+
+    def _read_meta(self):
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.rows = meta['rows']
+            self.dictionaries = meta['dictionaries']
+            self._text_bytes = meta['text_bytes']
+        else:
+            self.rows = 0
+            self.dictionaries = {column: [] for column, (kind, _) in SCHEMA.items() if kind == 'dict'}
+            self._text_bytes = {column: 0 for column, (kind, _) in SCHEMA.items() if kind == 'text'}
+        self._codes = {column: {value: i for i, value in enumerate(values)}
+                       for column, values in self.dictionaries.items()}
+
+    def __len__(self):
+        return self.rows
+
+    def _path(self, column, suffix='bin'):
+        return os.path.join(self.directory, f"{column}.{suffix}")
+
+    # Writing
+
+    def append(self, interactions):
+        """Append interaction dicts (as built by save_student_interaction)"""
+        interactions = list(interactions)
+        if not interactions:
+            return self.rows
+
+        with self._lock, self._file_lock():
+            # Another writer may have committed since this instance last looked
+            self._read_meta()
+            self._truncate_uncommitted()
+
+            for column, (kind, dtype) in SCHEMA.items():
+                values = [interaction.get(column) for interaction in interactions]
+                if kind == 'text':
+                    self._append_text(column, values)
+                    continue
+                if kind == 'dict':
+                    array = np.array([self._code(column, value) for value in values], dtype=dtype)
+                elif kind == 'time':
+                    array = np.array([_to_micros(value) for value in values], dtype=dtype)
+                else:
+                    array = np.array([np.nan if value is None else value for value in values], dtype=dtype)
+                with open(self._path(column), 'ab') as f:
+                    f.write(array.tobytes())
+
+            # Metadata is the commit point: readers never look past the committed row count
+            self.rows += len(interactions)
+            self._write_meta()
+        return self.rows
+
+    def _code(self, column, value):
+        value = '' if value is None else str(value)
+        code = self._codes[column].get(value)
+        if code is None:
+            code = len(self.dictionaries[column])
+            if code > np.iinfo(np.dtype(SCHEMA[column][1])).max:
+                raise ValueError(f"Dictionary for {column} is full")
+            self.dictionaries[column].append(value)
+            self._codes[column][value] = code
+        return code
+
+    def _append_text(self, column, values):
+        data = [('' if value is None else str(value)).encode('utf-8') for value in values]
+        ends = self._text_bytes[column] + np.cumsum([len(item) for item in data], dtype=np.int64)
+        with open(self._path(column, 'txt'), 'ab') as f:
+            f.write(b''.join(data))
+        with open(self._path(column, 'end'), 'ab') as f:
+            f.write(ends.astype('<i8').tobytes())
+        self._text_bytes[column] = int(ends[-1]) if len(ends) else self._text_bytes[column]
+
+    def _truncate_uncommitted(self):
+        """Drop bytes left by an append that failed before its metadata was written"""
+        for column, (kind, dtype) in SCHEMA.items():
+            if kind == 'text':
+                sizes = {self._path(column, 'end'): self.rows * 8, self._path(column, 'txt'): self._text_bytes[column]}
+            else:
+                sizes = {self._path(column): self.rows * np.dtype(dtype).itemsize}
+            for path, size in sizes.items():
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    with open(path, 'r+b') as f:
+                        f.truncate(size)
+
+    def _write_meta(self):
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'rows': self.rows, 'dictionaries': self.dictionaries, 'text_bytes': self._text_bytes}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def import_csv(self, path, chunksize=100000):
+        """Bulk-load an existing student_interactions.csv"""
+        import pandas as pd
+        for chunk in pd.read_csv(path, chunksize=chunksize, keep_default_na=False):
+            self.append(chunk.to_dict('records'))
+        return self.rows
+
+    # Reading
+
+    def column(self, column):
+        """Memory-mapped column (codes for dictionary columns); nothing is read until sliced"""
+        kind, dtype = SCHEMA[column]
+        if kind == 'text':
+            raise ValueError(f"{column} is a text column; use text()")
+        if self.rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(column), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def text(self, column, row):
+        ends = np.memmap(self._path(column, 'end'), dtype='<i8', mode='r', shape=(self.rows,))
+        start = int(ends[row - 1]) if row > 0 else 0
+        with open(self._path(column, 'txt'), 'rb') as f:
+            f.seek(start)
+            return f.read(int(ends[row]) - start).decode('utf-8')
+
+    def dictionary(self, column):
+        return self.dictionaries[column]
+
+    def _chunks(self, column):
+        data = self.column(column)
+        for start in range(0, self.rows, CHUNK_ROWS):
+            yield np.asarray(data[start:start + CHUNK_ROWS])
+
+    def value_counts(self, column):
+        """{value: count} for a dictionary column, most frequent first"""
+        counts = np.zeros(len(self.dictionaries[column]), dtype=np.int64)
+        for codes in self._chunks(column):
+            counts += np.bincount(codes, minlength=len(counts))
+        order = np.argsort(-counts, kind='stable')
+        return {self.dictionaries[column][i]: int(counts[i]) for i in order if counts[i] > 0}
+
+    def admission_rate(self):
+        code = self._codes['admission_status'].get('ADMITTED')
+        if self.rows == 0 or code is None:
+            return 0.0
+        admitted = sum(int(np.count_nonzero(codes == code)) for codes in self._chunks('admission_status'))
+        return admitted / self.rows
+
+    def mean(self, column):
+        total = 0.0
+        count = 0
+        for values in self._chunks(column):
+            values = values.astype(np.float64)
+            present = ~np.isnan(values)
+            total += float(values[present].sum())
+            count += int(present.sum())
+        return total / count if count else 0.0
+
+    def histogram(self, column, bins=20, value_range=(0, 400)):
+        edges = np.linspace(value_range[0], value_range[1], bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+        for values in self._chunks(column):
+            counts += np.histogram(values, bins=edges)[0]
+        return counts, edges
+
+    def latest_timestamp(self):
+        if self.rows == 0:
+            return None
+        return _from_micros(max(int(values.max()) for values in self._chunks('timestamp')))
+
+    def stats(self):
+        """Same shape as EnhancedFeatures.get_training_data_stats"""
+        with self._lock:
+            self._read_meta()
+            if self.rows == 0:
+                return {"total_interactions": 0, "latest_interaction": None}
+            return {
+                "total_interactions": self.rows,
+                "latest_interaction": self.latest_timestamp(),
+                "admission_rate": self.admission_rate(),
+                "top_courses": dict(list(self.value_counts('preferred_course').items())[:5]),
+                "avg_jamb_score": self.mean('jamb_score')
+            }
@@ -0,0 +1,357 @@
+"""
+Load Test
+Local load generator for results-day traffic:
+- Replays synthetic or recorded student profiles
+- Targets scoring, interaction saving, session saving (the app's SessionStore, and the
+  legacy saved_sessions.json rewrite) and PDF generation through the app's ReportRenderer,
+  called directly or through the HTTP service on a local socket
+- Closed loop (fixed concurrency) or open loop (Poisson arrivals at a given rate)
+- Reports latency histograms, percentiles and error rates, and sweeps arrival
+  rates to find the saturation point
+"""
+
+import argparse
+import asyncio
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import numpy as np
+from cohort_generator import CohortGenerator
+from report_renderer import ReportRenderer
+from session_codec import SessionCodec, SessionStore
+
+# Histogram bucket upper bounds (ms)
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf')]
+
+TARGETS = ('score', 'save_interaction', 'session_store', 'save_session', 'pdf', 'journey')
+HTTP_TARGETS = ('score', 'pdf')
+
+
+def synthetic_profiles(system, n, seed=0):
+    """Seeded synthetic applicants (see cohort_generator) as student_data dicts"""
+    cohort = CohortGenerator(system.get_compiled_catalog(), seed=seed).generate(n)
+    return [cohort.profile(row) for row in range(n)]
+
+
+def load_profiles(path):
+    """Recorded profiles from a JSONL cohort file or a saved_sessions.json file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [session['student_data'] for session in data.values()]
+    return data
+
+
+def summarize(latencies_ms, errors, elapsed, offered_rps=None):
+    """Latency percentiles, histogram, throughput and error rate for one run"""
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    total = len(latencies) + sum(errors.values())
+    counts = np.histogram(latencies, bins=[0] + BUCKETS_MS)[0] if len(latencies) else np.zeros(len(BUCKETS_MS), dtype=int)
+    summary = {
+        'requests': total,
+        'succeeded': len(latencies),
+        'errors': sum(errors.values()),
+        'error_rate': sum(errors.values()) / total if total else 0.0,
+        'errors_by_type': dict(errors),
+        'duration_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'offered_rps': offered_rps,
+        'latency_ms': {},
+        'histogram': [(upper, int(count)) for upper, count in zip(BUCKETS_MS, counts)]
+    }
+    if len(latencies):
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        summary['latency_ms'] = {'mean': float(latencies.mean()), 'p50': float(p50), 'p90': float(p90),
+                                 'p99': float(p99), 'max': float(latencies.max())}
+    return summary
+
+
+class LoadHarness:
+    def __init__(self, advanced_system, enhanced_features, profiles, data_dir=None, url=None, report_renderer=None):
+        self.engine = advanced_system
+        self.features = enhanced_features
+        self.profiles = profiles
+        self.url = url
+        self._results = {}
+        self._local = threading.local()
+        # The app's PDF and persistence paths (the HTTP service renders through its own ReportRenderer)
+        self.reports = report_renderer or ReportRenderer()
+
+        # Keep load-test writes away from real interaction and session files
+        if data_dir is None:
+            data_dir = tempfile.mkdtemp(prefix='admission-load-')
+        os.makedirs(data_dir, exist_ok=True)
+        self.features.data_storage_path = os.path.join(data_dir, 'student_interactions.csv')
+        self.features.session_storage_path = os.path.join(data_dir, 'saved_sessions.json')
+        self.features.interaction_store_path = os.path.join(data_dir, 'interactions')
+        self.features._interaction_store = None
+        self.sessions = SessionStore(SessionCodec(advanced_system), os.path.join(data_dir, 'sessions'))
+
+    # Direct entry points
+
+    def _scored(self, index):
+        """Result for a profile, computed once so save/PDF targets measure only themselves"""
+        result = self._results.get(index)
+        if result is None:
+            result = self.engine.process_comprehensive_admission(self.profiles[index])
+            self._results[index] = result
+        return result
+
+    def call(self, target, index):
+        profile = self.profiles[index]
+        if self.url:
+            return self._call_http(target, profile)
+        if target == 'score':
+            return self.engine.process_comprehensive_admission(profile)
+        if target == 'save_interaction':
+            result = self._scored(index)
+            return self.features.save_student_interaction(profile, result, result['recommendations'])
+        if target == 'session_store':
+            return self._save_session(profile, self._scored(index))
+        if target == 'save_session':
+            return self.features.save_session(str(uuid.uuid4()), profile)
+        if target == 'pdf':
+            result = self._scored(index)
+            return self.reports.render(profile, result, result['recommendations'])
+        if target == 'journey':
+            # What one applicant does in the app: score, save, save the analysis, download the PDF
+            result = self.engine.process_comprehensive_admission(profile)
+            interaction_id = self.features.save_student_interaction(profile, result, result['recommendations'])
+            self._save_session(profile, result, f"analysis_{interaction_id}")
+            return self.reports.render(profile, result, result['recommendations'])
+        raise ValueError(f"Unknown target {target!r}; choose from {TARGETS}")
+
+    def _save_session(self, profile, result, session_id=None):
+        # As the app's Save Analysis button does
+        return self.sessions.save(session_id or str(uuid.uuid4()), {
+            'student_data': profile,
+            'result': result,
+            'recommendations': result['recommendations']
+        })
+
+    # HTTP entry points
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            parsed = urlparse(self.url)
+            connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+            self._local.connection = connection
+        return connection
+
+    def _request(self, method, path, payload=None):
+        connection = self._connection()
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        try:
+            connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            data = response.read()
+        except (ConnectionError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            raise
+        if response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status}")
+        return response.status, data
+
+    def _call_http(self, target, profile):
+        if target == 'score':
+            return json.loads(self._request('POST', '/score', profile)[1])
+        if target == 'pdf':
+            report = json.loads(self._request('POST', '/reports', {'student_data': profile})[1])
+            while True:
+                status, data = self._request('GET', report['url'])
+                if status == 200:
+                    return data
+                time.sleep(0.01)
+        raise ValueError(f"Target {target!r} has no HTTP endpoint; choose from {HTTP_TARGETS}")
+
+    # Load generation
+
+    def _timed(self, target, index, scheduled):
+        try:
+            self.call(target, index)
+            return (time.perf_counter() - scheduled) * 1000, None
+        except Exception as exc:
+            return None, type(exc).__name__
+
+    def run(self, target, requests=200, concurrency=8, rate=None, seed=0):
+        """One load run.
+
+        Without rate, concurrency workers issue requests back to back (closed loop).
+        With rate (requests/s), arrivals are Poisson and latency is measured from the
+        scheduled arrival, so queueing behind a saturated system is counted.
+        """
+        indices = [i % len(self.profiles) for i in range(requests)]
+        latencies = []
+        errors = Counter()
+        lock = threading.Lock()
+
+        def record(outcome):
+            latency, error = outcome
+            with lock:
+                if error is None:
+                    latencies.append(latency)
+                else:
+                    errors[error] += 1
+
+        started = time.perf_counter()
+        if rate is None:
+            counter = itertools.count()
+
+            def worker():
+                while True:
+                    position = next(counter)
+                    if position >= requests:
+                        return
+                    record(self._timed(target, indices[position], time.perf_counter()))
+
+            threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            rng = random.Random(seed)
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load') as pool:
+                arrival = started
+                for index in indices:
+                    arrival += rng.expovariate(rate)
+                    delay = arrival - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    pool.submit(self._timed, target, index, arrival).add_done_callback(
+                        lambda future: record(future.result()))
+        elapsed = time.perf_counter() - started
+        return summarize(latencies, errors, elapsed, rate)
+
+    def sweep(self, target, rates, requests_per_step=200, concurrency=8, slo_p99_ms=1000, max_error_rate=0.01):
+        """Increase the arrival rate until throughput, p99 latency or errors break down"""
+        steps = []
+        saturation = None
+        for rate in rates:
+            step = self.run(target, requests_per_step, concurrency, rate)
+            steps.append(step)
+            p99 = step['latency_ms'].get('p99', float('inf'))
+            if (step['throughput_rps'] < 0.9 * rate or p99 > slo_p99_ms or
+                    step['error_rate'] > max_error_rate):
+                saturation = rate
+                break
+        sustained = [step['offered_rps'] for step in steps if step['offered_rps'] != saturation]
+        return {
+            'target': target,
+            'steps': steps,
+            'saturation_rps': saturation,
+            'max_sustained_rps': max(sustained) if sustained else None
+        }
+
+
+def start_local_service(advanced_system, enhanced_features, host='127.0.0.1'):
+    """Run AdmissionService on a free local port in a background thread; returns its URL"""
+    from admission_service import AdmissionService
+
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+    service = AdmissionService(advanced_system, enhanced_features)
+    threading.Thread(target=lambda: asyncio.run(service.serve(host, port)),
+                     name='load-test-service', daemon=True).start()
+
+    # Wait until the server accepts connections
+    deadline = time.time() + 10
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            break
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+    return f"http://{host}:{port}"
+
+
+def format_report(summary, title=''):
+    lines = [title] if title else []
+    latency = summary['latency_ms']
+    lines.append(f"  requests {summary['requests']}  errors {summary['errors']} "
+                 f"({summary['error_rate']:.1%})  throughput {summary['throughput_rps']:.1f}/s"
+                 + (f"  offered {summary['offered_rps']:.1f}/s" if summary['offered_rps'] else ''))
+    if latency:
+        lines.append(f"  latency ms  mean {latency['mean']:.1f}  p50 {latency['p50']:.1f}  "
+                     f"p90 {latency['p90']:.1f}  p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    peak = max((count for _, count in summary['histogram']), default=0)
+    for upper, count in summary['histogram']:
+        if count:
+            bar = '#' * max(1, round(40 * count / peak))
+            label = f"<= {upper:g} ms" if upper != float('inf') else '> 10000 ms'
+            lines.append(f"  {label:>12} {count:>7} {bar}")
+    if summary['errors_by_type']:
+        lines.append(f"  errors: {summary['errors_by_type']}")
+    return '\n'.join(lines)
+
+
+def main():
+    from ultimate_admission_system import UltimateAdmissionSystem
+    from ultimate_admission_system_part2 import UltimateAdmissionSystemPart2
+    from enhanced_features import EnhancedFeatures
+
+    parser = argparse.ArgumentParser(description='Load-test the admission entry points')
+    parser.add_argument('--target', choices=TARGETS, default='score')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, help='Open-loop arrival rate (requests/s); closed loop if omitted')
+    parser.add_argument('--sweep', help='Comma-separated arrival rates to step through, e.g. 10,20,50,100')
+    parser.add_argument('--slo-p99-ms', type=float, default=1000)
+    parser.add_argument('--profiles', help='Recorded profiles (.jsonl cohort or saved_sessions.json)')
+    parser.add_argument('--synthetic', type=int, default=1000, help='Number of synthetic profiles')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--http', action='store_true', help='Go through the HTTP service on a local port')
+    parser.add_argument('--url', help='Existing service to target instead of a local one')
+    parser.add_argument('--data-dir', help='Where saves are written (default: a temporary directory)')
+    parser.add_argument('--json', action='store_true', help='Print the raw summary as JSON')
+    args = parser.parse_args()
+
+    system = UltimateAdmissionSystem()
+    engine = UltimateAdmissionSystemPart2(system)
+    features = EnhancedFeatures()
+    profiles = load_profiles(args.profiles) if args.profiles else synthetic_profiles(system, args.synthetic, args.seed)
+
+    url = args.url
+    if args.http and not url:
+        url = start_local_service(engine, features)
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='admission-load-')
+    harness = LoadHarness(engine, features, profiles, data_dir=data_dir, url=url)
+
+    if args.sweep:
+        rates = [float(rate) for rate in args.sweep.split(',')]
+        report = harness.sweep(args.target, rates, args.requests, args.concurrency, args.slo_p99_ms)
+        if args.json:
+            print(json.dumps(report, indent=2))
+            return
+        for step in report['steps']:
+            print(format_report(step, f"{args.target} @ {step['offered_rps']:g}/s"))
+        print(f"Saturation at {report['saturation_rps']}/s; max sustained {report['max_sustained_rps']}/s")
+    else:
+        summary = harness.run(args.target, args.requests, args.concurrency, args.rate, args.seed)
+        if args.json:
+            print(json.dumps(summary, indent=2))
+            return
+        mode = f"{args.rate:g}/s open loop" if args.rate else f"{args.concurrency} concurrent"
+        print(format_report(summary, f"{args.target} ({mode}{', HTTP' if url else ''})"))
+    print(f"Writes went to {data_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+"""
+Memory Budget
+Byte accounting for what an engine process keeps resident:
+- catalog: the live snapshot's compiled catalog (and the catalog data behind it)
+- models: category models held in ml_models
+- pdf_cache: rendered reports in the report cache
+- result_cache: cached success explanations
+- sessions: interaction-store dictionaries kept for encoding saved interactions
+Over the global budget, entries are evicted in order: PDF cache, result cache, cold models.
+Evicted models are spilled to disk and reloaded on their next use, so scoring is unchanged.
+
+Run as a script to score a synthetic cohort with a fitted tree model under a budget it overfills,
+check that eviction follows that order and that the RSS ceiling holds:
+    python memory_budget.py --students 1000 --budget-mb 0.5 --rss-ceiling-mb 600
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import types
+import joblib
+import numpy as np
+
+EVICTION_ORDER = ('pdf_cache', 'result_cache', 'models')
+
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+           threading.Thread)
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes reachable from obj (containers, instance dicts, NumPy buffers)"""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _OPAQUE):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, np.ndarray):
+            # Views report only their header; the buffer is counted once via the base
+            if item.base is not None:
+                stack.append(item.base)
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__'):
+            stack.append(item.__dict__)
+    return total
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ModelStore(dict):
+    """ml_models mapping that records use and can drop cold models, reloading them from disk when next used"""
+
+    def __init__(self, models=None, spill_directory=None):
+        super().__init__(models or {})
+        self.paths = {}
+        self.last_used = {}
+        self.spill_directory = spill_directory
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def add_path(self, category, path):
+        """Serve category from a model file, loaded on first use"""
+        self.paths[category] = path
+
+    def __contains__(self, category):
+        return dict.__contains__(self, category) or category in self.paths
+
+    def __getitem__(self, category):
+        self.last_used[category] = time.monotonic()
+        try:
+            return dict.__getitem__(self, category)
+        except KeyError:
+            pass
+        with self._lock:
+            if not dict.__contains__(self, category):
+                # Unknown categories raise KeyError, as a plain dict would
+                dict.__setitem__(self, category, joblib.load(self.paths[category]))
+                self.loads += 1
+            return dict.__getitem__(self, category)
+
+    def __setitem__(self, category, model):
+        with self._lock:
+            self.paths.pop(category, None)
+            dict.__setitem__(self, category, model)
+
+    def __delitem__(self, category):
+        with self._lock:
+            self.paths.pop(category, None)
+            dict.__delitem__(self, category)
+
+    def get(self, category, default=None):
+        return self[category] if category in self else default
+
+    def model_bytes(self, category, model):
+        # Pickled size, measured once per model object
+        key = (category, id(model))
+        size = self._sizes.get(key)
+        if size is None:
+            size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+            self._sizes[key] = size
+        return size
+
+    @property
+    def nbytes(self):
+        return sum(self.model_bytes(category, model) for category, model in list(dict.items(self)))
+
+    def cold(self, cold_after=300):
+        """Resident categories unused for cold_after seconds, least recently used first"""
+        now = time.monotonic()
+        resident = [category for category in list(dict.keys(self))
+                    if now - self.last_used.get(category, 0) >= cold_after]
+        return sorted(resident, key=lambda category: self.last_used.get(category, 0))
+
+    def evict(self, category):
+        """Drop a resident model (spilling it to disk first if it has no file); returns bytes freed"""
+        with self._lock:
+            model = dict.get(self, category)
+            if model is None:
+                return 0
+            if category not in self.paths:
+                if self.spill_directory is None:
+                    self.spill_directory = tempfile.mkdtemp(prefix='admission-models-')
+                safe_name = ''.join(c if c.isalnum() else '_' for c in category)
+                path = os.path.join(self.spill_directory, f"{safe_name}.pkl")
+                joblib.dump(model, path)
+                self.paths[category] = path
+            size = self.model_bytes(category, model)
+            dict.__delitem__(self, category)
+            self._sizes.pop((category, id(model)), None)
+            self.evictions += 1
+            return size
+
+    def info(self):
+        return {
+            'resident': sorted(dict.keys(self)),
+            'on_disk': sorted(category for category in self.paths if not dict.__contains__(self, category)),
+            'loads': self.loads,
+            'evictions': self.evictions
+        }
+
+
+class MemoryBudget:
+    def __init__(self, max_bytes, registry, report_renderer=None, enhanced_features=None, cold_after=300):
+        self.max_bytes = max_bytes
+        self.registry = registry
+        self.report_renderer = report_renderer
+        self.enhanced_features = enhanced_features
+        self.cold_after = cold_after
+        self._catalog_sizes = {}
+        self._session_size = (None, 0)
+        self._lock = threading.Lock()
+        self.freed = {name: 0 for name in EVICTION_ORDER}
+        self.over_budget = 0
+
+        # Snapshots built later carry this store over (CatalogRegistry.build reuses ml_models)
+        part2 = registry.current().part2
+        if not isinstance(part2.ml_models, ModelStore):
+            part2.ml_models = ModelStore(part2.ml_models)
+
+    @property
+    def models(self):
+        return self.registry.current().part2.ml_models
+
+    def _explainer(self):
+        return getattr(self.registry.current().part2, '_explainer', None)
+
+    def _catalog_bytes(self, snapshot):
+        # A snapshot's catalog never changes, so it is measured once
+        size = self._catalog_sizes.get(snapshot.version)
+        if size is None:
+            size = deep_sizeof(snapshot.catalog)
+            self._catalog_sizes = {snapshot.version: size}
+        return size
+
+    def _session_bytes(self):
+        store = getattr(self.enhanced_features, '_interaction_store', None)
+        if store is None:
+            return 0
+        key = (id(store), store.rows)
+        if self._session_size[0] != key:
+            self._session_size = (key, deep_sizeof([store.dictionaries, store._codes]))
+        return self._session_size[1]
+
+    def usage(self):
+        """Bytes held per component"""
+        models = self.models
+        explainer = self._explainer()
+        return {
+            'catalog': self._catalog_bytes(self.registry.current()),
+            'models': models.nbytes if isinstance(models, ModelStore) else deep_sizeof(models),
+            'pdf_cache': self.report_renderer.cache.nbytes if self.report_renderer is not None else 0,
+            'result_cache': explainer.nbytes if explainer is not None else 0,
+            'sessions': self._session_bytes()
+        }
+
+    def enforce(self):
+        """Evict until the accounted total is within budget; returns bytes freed per component"""
+        with self._lock:
+            excess = sum(self.usage().values()) - self.max_bytes
+            freed = {}
+            for name in EVICTION_ORDER:
+                if excess <= 0:
+                    break
+                released = self._evict(name, excess)
+                if released:
+                    freed[name] = released
+                    self.freed[name] += released
+                    excess -= released
+            if excess > 0:
+                self.over_budget += 1
+            return freed
+
+    def _evict(self, name, nbytes):
+        if name == 'pdf_cache':
+            return self.report_renderer.cache.evict(nbytes) if self.report_renderer is not None else 0
+        if name == 'result_cache':
+            explainer = self._explainer()
+            return explainer.evict(nbytes) if explainer is not None else 0
+
+        models = self.models
+        if not isinstance(models, ModelStore):
+            return 0
+        explainer = self._explainer()
+        released = 0
+        for category in models.cold(self.cold_after):
+            released += models.evict(category)
+            if explainer is not None:
+                explainer.forget(category)
+            if released >= nbytes:
+                break
+        return released
+
+    def report(self):
+        usage = self.usage()
+        models = self.models
+        return {
+            'max_bytes': self.max_bytes,
+            'accounted_bytes': sum(usage.values()),
+            'components': usage,
+            'rss_bytes': current_rss(),
+            'freed_bytes': dict(self.freed),
+            'over_budget': self.over_budget,
+            'models': models.info() if isinstance(models, ModelStore) else None
+        }
+
+
+def _fit_model(snapshot, profiles, trees, seed):
+    """(category, tree model) for the catalog's largest category, fitted to rule-based outcomes"""
+    from sklearn.ensemble import RandomForestClassifier
+    from cohort import Cohort
+    from explanations import SuccessExplainer
+
+    catalog = snapshot.catalog
+    category_id = int(np.bincount(catalog.course_category).argmax())
+    course_ids = np.flatnonzero(catalog.course_category == category_id)
+    sample = Cohort.from_profiles(catalog, profiles)
+    features = SuccessExplainer(snapshot.part2).features(sample, course_ids)[0]
+    outcomes = catalog.rule_based_success(sample, course_ids) >= 0.5
+    model = RandomForestClassifier(n_estimators=trees, random_state=seed)
+    model.fit(features.reshape(-1, features.shape[2]), outcomes.ravel())
+    return catalog.categories[category_id], model
+
+
+def check_eviction_order(budget):
+    """Shrink the budget in steps and check each step evicts in EVICTION_ORDER; returns failures"""
+    usage = budget.usage()
+    failures = [f"{name} is empty before the eviction check" for name in EVICTION_ORDER if not usage[name]]
+    if failures:
+        return failures
+
+    max_bytes = budget.max_bytes
+    try:
+        for position, name in enumerate(EVICTION_ORDER):
+            before = budget.usage()
+            earlier, later = EVICTION_ORDER[:position], EVICTION_ORDER[position + 1:]
+            # Over budget by whatever earlier components still hold plus half of this one
+            budget.max_bytes = (sum(before.values()) - sum(before[other] for other in earlier) -
+                                max(before[name] // 2, 1))
+            freed = budget.enforce()
+            after = budget.usage()
+            print(f"  evict {name:<12} freed {', '.join(freed) or 'nothing'}")
+            if name not in freed or after[name] >= before[name]:
+                failures.append(f"{name} was not evicted in its turn")
+            failures.extend(f"{other} still holds memory after {name} was evicted"
+                            for other in earlier if after[other])
+            failures.extend(f"{other} was evicted before {name}"
+                            for other in later if other in freed or after[other] != before[other])
+    finally:
+        budget.max_bytes = max_bytes
+    return failures
+
+
+def main():
+    import gc
+    import weakref
+    from catalog_registry import CatalogRegistry
+    from cohort_generator import CohortGenerator
+    from enhanced_features import EnhancedFeatures
+    from report_renderer import ReportRenderer
+    from result_records import to_plain
+
+    parser = argparse.ArgumentParser(description='Score a synthetic cohort under a memory budget and RSS ceiling')
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--chunk', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget-mb', type=float, default=0.5)
+    parser.add_argument('--rss-ceiling-mb', type=float, default=600)
+    parser.add_argument('--pdf-every', type=int, default=20, help='Render a PDF report for 1 in N students')
+    parser.add_argument('--models', help='Directory of admission_model_<category>.pkl files to serve')
+    parser.add_argument('--trees', type=int, default=10, help='Trees in the model fitted when --models is not given')
+    parser.add_argument('--cold-after', type=float, default=0, help='Seconds unused before a model may be evicted')
+    args = parser.parse_args()
+
+    registry = CatalogRegistry()
+    snapshot = registry.current()
+    renderer = ReportRenderer(max_workers=1)
+    features = EnhancedFeatures()
+    budget = MemoryBudget(int(args.budget_mb * 1024 * 1024), registry, renderer, features, args.cold_after)
+    cohort = CohortGenerator(snapshot.catalog, seed=args.seed).generate(args.students)
+    if args.models:
+        for category in snapshot.catalog.categories:
+            path = os.path.join(args.models, f"admission_model_{category.lower()}.pkl")
+            if os.path.exists(path):
+                budget.models.add_path(category, path)
+    else:
+        # A fitted tree model, so explanations are cached and there is a model to evict
+        category, model = _fit_model(snapshot, [cohort.profile(row) for row in range(min(args.chunk, args.students))],
+                                     args.trees, args.seed)
+        budget.models[category] = model
+        del model
+
+    def score(start):
+        profiles = [cohort.profile(row) for row in range(start, min(start + args.chunk, args.students))]
+        results = snapshot.part2.process_comprehensive_admission_batch(profiles)
+        for i, (student_data, result) in enumerate(zip(profiles, results)):
+            snapshot.part2.explain_success_predictions(student_data)
+            if args.pdf_every and (start + i) % args.pdf_every == 0:
+                renderer.render(student_data, result, result.get('recommendations', []))
+        return results
+
+    ceiling = args.rss_ceiling_mb * 1024 * 1024
+    peak = current_rss()
+    started = time.perf_counter()
+    for start in range(0, args.students, args.chunk):
+        score(start)
+        budget.enforce()
+        peak = max(peak, current_rss())
+
+    # Refill every evictable component past the budget, then check the order they are evicted in
+    unlimited = budget.max_bytes
+    budget.max_bytes = float('inf')
+    expected = [to_plain(result) for result in score(0)]
+    budget.max_bytes = unlimited
+    resident = {category: weakref.ref(dict.__getitem__(budget.models, category))
+                for category in dict.keys(budget.models)}
+    failures = check_eviction_order(budget)
+    gc.collect()
+    failures.extend(f"evicted model {category} is still referenced"
+                    for category, ref in resident.items() if ref() is not None)
+    # Evicted models are reloaded from disk on their next use
+    if [to_plain(result) for result in score(0)] != expected:
+        failures.append('results changed after models were evicted')
+    budget.enforce()
+    peak = max(peak, current_rss())
+    renderer.executor.shutdown()
+
+    report = budget.report()
+    print(f"Scored {args.students} students in {time.perf_counter() - started:.1f}s")
+    for name, size in report['components'].items():
+        print(f"  {name:<13} {size / 1024 / 1024:8.2f} MB")
+    print(f"  accounted     {report['accounted_bytes'] / 1024 / 1024:8.2f} MB of {args.budget_mb:.2f} MB budget")
+    print(f"  freed         {', '.join(f'{k} {v / 1024 / 1024:.2f} MB' for k, v in report['freed_bytes'].items())}")
+    print(f"  models        {report['models']}")
+    print(f"  peak RSS      {peak / 1024 / 1024:8.2f} MB (ceiling {args.rss_ceiling_mb:.0f} MB)")
+
+    if report['accounted_bytes'] > budget.max_bytes:
+        failures.append('accounted memory is over budget')
+    if peak > ceiling:
+        failures.append('peak RSS is over the ceiling')
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
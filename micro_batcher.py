@@ -0,0 +1,147 @@
+"""
+Micro Batcher
+Coalesces concurrent single-item calls into batched calls:
+- Collects items for up to max_wait_ms or max_batch_size, whichever comes first
+- Fans results (or per-item errors) back to the waiting callers' futures
+- Tracks batch fill rate and the queueing latency added to each call
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, process_batch, max_batch_size=32, max_wait_ms=5, fallback=None, name='micro-batcher'):
+        self.process_batch = process_batch
+        self.fallback = fallback
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.full_batches = 0
+        self.failed_batches = 0
+        self.total_added_latency = 0.0
+        self.max_added_latency = 0.0
+        self.total_batch_time = 0.0
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queue one item; returns a concurrent.futures.Future for its result"""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('MicroBatcher is closed')
+            self._queue.append((item, future, time.perf_counter()))
+            self._condition.notify()
+        return future
+
+    def __call__(self, item, timeout=None):
+        """Blocking single-item call"""
+        return self.submit(item).result(timeout=timeout)
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            if not self._queue:
+                return None
+
+            # Hold the batch open until it is full or the oldest item has waited max_wait
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.process_batch(items)
+            except Exception as exc:
+                self.failed_batches += 1
+                results = self._isolate(items, exc)
+            elapsed = time.perf_counter() - started
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+            with self._condition:
+                self.batches += 1
+                self.items += len(batch)
+                self.full_batches += len(batch) == self.max_batch_size
+                self.total_batch_time += elapsed
+                for _, _, submitted in batch:
+                    added = started - submitted
+                    self.total_added_latency += added
+                    self.max_added_latency = max(self.max_added_latency, added)
+
+    def _isolate(self, items, exc):
+        """Per-item results after a batch failure, so errors reach only their caller"""
+        if self.fallback is None:
+            return [exc] * len(items)
+        results = []
+        for item in items:
+            try:
+                results.append(self.fallback(item))
+            except Exception as item_exc:
+                results.append(item_exc)
+        return results
+
+    def metrics(self):
+        with self._condition:
+            batches = max(self.batches, 1)
+            items = max(self.items, 1)
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'pending': len(self._queue),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'mean_batch_size': self.items / batches,
+                'fill_rate': self.items / (batches * self.max_batch_size),
+                'full_batches': self.full_batches,
+                'failed_batches': self.failed_batches,
+                'mean_added_latency_ms': 1000 * self.total_added_latency / items,
+                'max_added_latency_ms': 1000 * self.max_added_latency,
+                'mean_batch_time_ms': 1000 * self.total_batch_time / batches
+            }
+
+    def close(self, wait=True):
+        """Stop accepting items; queued items are still processed"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            self._worker.join()
+
+
+def admission_batcher(advanced_system, max_batch_size=32, max_wait_ms=5):
+    """MicroBatcher in front of process_comprehensive_admission"""
+    return MicroBatcher(advanced_system.process_comprehensive_admission_batch,
+                        max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                        fallback=advanced_system.process_comprehensive_admission,
+                        name='admission-batcher')
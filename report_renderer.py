@@ -0,0 +1,201 @@
+"""
+Report Renderer
+- Bounded worker pool for PDF report rendering
+- Byte-budgeted LRU cache keyed by result hash
+- Bulk rendering of cohort reports to a directory or zip stream
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from report_template import ReportTemplate
+from result_records import to_plain
+
+
+class ReportQueueFull(RuntimeError):
+    """Raised when the render queue is at its pending limit"""
+
+
+def _key_default(value):
+    # Result records hash the same as the plain dicts they stand for
+    return to_plain(value) if isinstance(value, Mapping) else str(value)
+
+
+def report_key(student_data, result, recommendations):
+    """Stable hash of the inputs that determine a report"""
+    payload = json.dumps([student_data, result, recommendations], sort_keys=True, default=_key_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+_template = None
+
+
+def render_report_bytes(student_data, result, recommendations):
+    """Render one report to PDF bytes (module level so process pools can pickle it)"""
+    global _template
+    if _template is None:
+        _template = ReportTemplate()
+    return _template.render(student_data, result, recommendations)
+
+
+def _render_item(item):
+    index, (student_data, result, recommendations) = item
+    return index, student_data.get('name', ''), render_report_bytes(student_data, result, recommendations)
+
+
+def _report_filename(index, name):
+    safe_name = re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_') or 'student'
+    return f"{index:06d}_{safe_name}.pdf"
+
+
+class ReportCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=1000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pdf_bytes
+
+    def put(self, key, pdf_bytes):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = pdf_bytes
+            self._bytes += len(pdf_bytes)
+            # Evict least recently used reports until within budget
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                self._evict_oldest()
+
+    def evict(self, nbytes):
+        """Drop least recently used reports until at least nbytes are freed; returns bytes freed"""
+        freed = 0
+        with self._lock:
+            while self._entries and freed < nbytes:
+                freed += self._evict_oldest()
+        return freed
+
+    def _evict_oldest(self):
+        _, evicted = self._entries.popitem(last=False)
+        self._bytes -= len(evicted)
+        self.evictions += 1
+        return len(evicted)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class ReportRenderer:
+    def __init__(self, max_workers=2, max_pending=32, cache_bytes=64 * 1024 * 1024, render=render_report_bytes):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+        self.max_pending = max_pending
+        self.cache = ReportCache(max_bytes=cache_bytes)
+        self._render = render
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, student_data, result, recommendations):
+        """Queue a report; returns (key, future). Cached and in-flight reports are shared."""
+        key = report_key(student_data, result, recommendations)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return key, future
+
+        with self._lock:
+            if key in self._pending:
+                return key, self._pending[key]
+            if len(self._pending) >= self.max_pending:
+                raise ReportQueueFull(f"{len(self._pending)} reports already pending")
+            future = self.executor.submit(self._render_and_cache, key, student_data, result, recommendations)
+            self._pending[key] = future
+        return key, future
+
+    def _render_and_cache(self, key, student_data, result, recommendations):
+        try:
+            pdf_bytes = self._render(student_data, result, recommendations)
+            self.cache.put(key, pdf_bytes)
+            return pdf_bytes
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def render(self, student_data, result, recommendations, timeout=None):
+        """Blocking convenience wrapper around submit"""
+        _, future = self.submit(student_data, result, recommendations)
+        return future.result(timeout=timeout)
+
+    def get(self, key):
+        """Cached PDF bytes for a report key, or None"""
+        return self.cache.get(key)
+
+    def is_pending(self, key):
+        with self._lock:
+            return key in self._pending
+
+    def render_bulk(self, items, output, max_workers=None, chunksize=16):
+        """Render (student_data, result, recommendations) triples in parallel.
+
+        output is a directory path, a '.zip' path or a writable binary stream
+        (written as a zip archive). Returns the number of reports written.
+        """
+        to_zip = not isinstance(output, str) or output.endswith('.zip')
+        if not to_zip:
+            os.makedirs(output, exist_ok=True)
+
+        archive = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) if to_zip else None
+        written = 0
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                for index, name, pdf_bytes in pool.map(_render_item, enumerate(items), chunksize=chunksize):
+                    filename = _report_filename(index, name)
+                    if archive is not None:
+                        archive.writestr(filename, pdf_bytes)
+                    else:
+                        with open(os.path.join(output, filename), 'wb') as f:
+                            f.write(pdf_bytes)
+                    written += 1
+        finally:
+            if archive is not None:
+                archive.close()
+        return written
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
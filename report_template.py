@@ -0,0 +1,322 @@
+"""
+Report Template
+Precompiled layout for the admission analysis PDF: page skeleton, fonts,
+section headings and text metrics are prepared once and each report only
+fills in the per-student fields. Produces the same text, in the same
+order and positions, as EnhancedFeatures.generate_pdf_report.
+"""
+
+import re
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from fpdf import FPDF
+
+K = 72 / 25.4  # points per mm
+PAGE_WIDTH = 595.28 / K  # A4 as FPDF defines it, in points
+PAGE_HEIGHT = 841.89 / K
+MARGIN = 10.0
+CELL_MARGIN = MARGIN / 10
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+PAGE_BREAK_TRIGGER = PAGE_HEIGHT - 2 * MARGIN
+
+# style -> (resource name, base font)
+FONTS = {
+    'B': ('F1', 'Helvetica-Bold'),
+    '': ('F2', 'Helvetica'),
+    'I': ('F3', 'Helvetica-Oblique')
+}
+
+TITLE = 'Nigerian University Admission Analysis Report'
+FOOTER = 'Nigerian University Admission Prediction System'
+
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            .replace('\r', '\\r').encode('latin-1'))
+
+
+def _pdf_object(number, body):
+    return b'%d 0 obj\n' % number + body + b'\nendobj\n'
+
+
+def _stream_object(number, data, compress):
+    if compress:
+        data = zlib.compress(data)
+        header = b'<<\n/Filter /FlateDecode\n/Length %d\n>>' % len(data)
+    else:
+        header = b'<<\n/Length %d\n>>' % len(data)
+    return _pdf_object(number, header + b'\nstream\n' + data + b'\nendstream')
+
+
+class _Layout:
+    """Cursor and content streams for one report being filled in"""
+
+    def __init__(self, template):
+        self.template = template
+        self.pages = [[b'2 J\n0.57 w\n']]
+        self.y = MARGIN
+        self.font = None
+        self.last_h = 0
+
+    def set_font(self, style, size):
+        if self.font != (style, size):
+            self.font = (style, size)
+            self.pages[-1].append(b'BT /%s %.2f Tf ET\n' % (FONTS[style][0].encode(), size))
+
+    def _break_page(self, h):
+        if self.y + h > PAGE_BREAK_TRIGGER:
+            self.pages.append([b'2 J\n0.57 w\n'])
+            self.y = MARGIN
+            style, size = self.font
+            self.pages[-1].append(b'BT /%s %.2f Tf ET\n' % (FONTS[style][0].encode(), size))
+
+    def cell(self, h, text, align='', color=None):
+        self._break_page(h)
+        if text:
+            style, size = self.font
+            font_size = size / K
+            if align == 'C':
+                x = MARGIN + (CONTENT_WIDTH - self.template.string_width(text, style, size)) / 2
+            else:
+                x = MARGIN + CELL_MARGIN
+            baseline = self.y + 0.5 * h + 0.3 * font_size
+            position = b'%.2f %.2f Td' % (x * K, (PAGE_HEIGHT - baseline) * K)
+            if color is None:
+                self.pages[-1].append(b'BT ' + position + b' (' + _escape(text) + b') Tj ET\n')
+            else:
+                self.pages[-1].append(b'q BT ' + position + b' ' + color + b' (' + _escape(text) + b') Tj ET Q\n')
+        self.y += h
+        self.last_h = h
+
+    def multi_cell(self, h, text):
+        style, size = self.font
+        for line in self.template.wrap(text, style, size):
+            self.cell(h, line)
+
+    def ln(self, h=None):
+        self.y += self.last_h if h is None else h
+
+
+class ReportTemplate:
+    def __init__(self, compress=True):
+        self.compress = compress
+        # Wrapped lines per (text, style, size), cached per template: messages repeat across students
+        self.wrap = lru_cache(maxsize=4096)(self._wrap)
+
+        # Character widths (1/1000 em) measured once per font style
+        measure = FPDF()
+        self.char_widths = {}
+        for style in FONTS:
+            # At 1000pt, width in points equals the font's 1/1000 em units
+            measure.set_font('helvetica', style, 1000)
+            widths = {}
+            for code in range(32, 256):
+                ch = chr(code)
+                try:
+                    widths[ch] = measure.get_string_width(ch) * K
+                except Exception:
+                    widths[ch] = 0.0
+            self.char_widths[style] = widths
+
+        # Static objects: catalog, shared resources and fonts
+        self.header = b'%PDF-1.3\n%\xe9\xeb\xf1\xbf\n'
+        # Objects 1-6 never change; pages start at object 7
+        self.first_page_object = 7
+        font_refs = b''.join(b'/%s %d 0 R\n' % (FONTS[style][0].encode(), 4 + i) for i, style in enumerate(FONTS))
+        static = [
+            (1, b'<<\n/Type /Catalog\n/Pages 2 0 R\n/OpenAction [%d 0 R /FitH null]\n/PageLayout /OneColumn\n>>'
+             % self.first_page_object),
+            (3, b'<<\n/Font <<' + font_refs + b'>>\n/ProcSet [/PDF /Text]\n>>')
+        ]
+        for i, style in enumerate(FONTS):
+            static.append((4 + i, b'<<\n/Type /Font\n/BaseFont /%s\n/Subtype /Type1\n/Encoding /WinAnsiEncoding\n>>'
+                           % FONTS[style][1].encode()))
+
+        self.static_offsets = {}
+        body = self.header
+        for number, content in static:
+            self.static_offsets[number] = len(body)
+            body += _pdf_object(number, content)
+        self.static_bytes = body
+
+        # Title line is at a fixed position on page one
+        layout = _Layout(self)
+        layout.set_font('B', 16)
+        layout.cell(10, TITLE, align='C')
+        self.title_ops = layout.pages[0][1:]
+
+    def string_width(self, text, style, size):
+        widths = self.char_widths[style]
+        return sum(widths.get(ch, 0.0) for ch in text) * size / 1000 / K
+
+    def _wrap(self, text, style, size):
+        """Split text into multi_cell lines (use the cached self.wrap)"""
+        widths = self.char_widths[style]
+        max_width = (CONTENT_WIDTH - 2 * CELL_MARGIN) * 1000 * K / size
+        lines = []
+        for paragraph in text.split('\n'):
+            paragraph = paragraph.rstrip('\r')
+            start = 0
+            width = 0.0
+            last_space = -1
+            i = 0
+            while i < len(paragraph):
+                ch = paragraph[i]
+                if ch == ' ':
+                    last_space = i
+                width += widths.get(ch, 0.0)
+                if width > max_width:
+                    if last_space >= start:
+                        lines.append(paragraph[start:last_space])
+                        start = last_space + 1
+                    else:
+                        if i == start:
+                            i += 1
+                        lines.append(paragraph[start:i])
+                        start = i
+                    width = sum(widths.get(c, 0.0) for c in paragraph[start:i + 1]) if start <= i else 0.0
+                    last_space = -1
+                i += 1
+            lines.append(paragraph[start:])
+        return tuple(lines)
+
+    def render(self, student_data, result, recommendations, generated_at=None):
+        """Fill the template for one student and return PDF bytes"""
+        layout = _Layout(self)
+        layout.font = ('B', 16)
+        layout.pages[0].extend(self.title_ops)
+        layout.y = MARGIN + 10
+        layout.last_h = 10
+        layout.ln(5)
+
+        # Student Information
+        layout.set_font('B', 12)
+        layout.cell(8, 'STUDENT INFORMATION')
+        layout.set_font('', 10)
+        for line in (
+            f"Name: {student_data['name']}",
+            f"State: {student_data['state']}",
+            f"JAMB Score: {student_data['jamb_score']}/400",
+            f"JAMB Subjects: {', '.join(student_data['jamb_subjects'])}",
+            f"Preferred Course: {student_data['preferred_course']}",
+            f"Learning Style: {student_data['learning_style']}",
+            f"Study Preference: {student_data['study_niche']}"
+        ):
+            layout.cell(6, line)
+        layout.ln(5)
+
+        # Admission Status
+        layout.set_font('B', 12)
+        color = b'0.000 0.502 0.000 rg' if result['admission_status'] == 'ADMITTED' else b'1.000 0.000 0.000 rg'
+        layout.cell(8, f"ADMISSION STATUS: {result['admission_status']}", color=color)
+        layout.set_font('', 10)
+        layout.multi_cell(6, result['message'])
+        layout.ln(5)
+
+        # Success Prediction
+        pred = result.get('success_prediction')
+        if pred:
+            layout.set_font('B', 12)
+            layout.cell(8, 'SUCCESS PREDICTION')
+            layout.set_font('', 10)
+            layout.cell(6, f"Success Probability: {pred['probability']:.1%}")
+            layout.cell(6, f"Success Level: {pred['level']}")
+            layout.multi_cell(6, f"Advice: {pred['advice']}")
+            layout.ln(3)
+
+        # University Options
+        university_options = result.get('university_options')
+        if university_options:
+            layout.set_font('B', 12)
+            layout.cell(8, 'UNIVERSITY OPTIONS')
+            layout.set_font('', 10)
+            for uni_data in university_options.values():
+                status = "ELIGIBLE" if uni_data['eligible'] else "NOT ELIGIBLE"
+                catchment = " (Catchment Advantage)" if uni_data.get('catchment_advantage') else ""
+                layout.cell(6, f"{uni_data['university']}: {status}{catchment}")
+                layout.cell(6, f"  Cutoff: {uni_data['cutoff']}, Your Score: {student_data['jamb_score']}")
+        layout.ln(5)
+
+        # Top Recommendations
+        if recommendations:
+            layout.set_font('B', 12)
+            layout.cell(8, 'TOP COURSE RECOMMENDATIONS')
+            layout.set_font('', 10)
+            for i, rec in enumerate(recommendations[:5], 1):
+                layout.cell(6, f"{i}. {rec['course']} ({rec['category']})")
+                layout.cell(6, f"   Match Score: {rec['match_score']:.1f}, Success Rate: {rec['success_probability']:.1%}")
+                layout.cell(6, f"   Salary Range: {rec['salary_range']}, Job Demand: {rec['job_demand']}")
+                layout.ln(2)
+
+        # Footer
+        layout.ln(10)
+        layout.set_font('I', 8)
+        generated_at = generated_at or datetime.now()
+        layout.cell(6, f"Report generated on {generated_at.strftime('%B %d, %Y at %I:%M %p')}", align='C')
+        layout.cell(6, FOOTER, align='C')
+
+        return self._assemble(layout.pages)
+
+    def _assemble(self, pages):
+        out = bytearray(self.static_bytes)
+        offsets = dict(self.static_offsets)
+        n_pages = len(pages)
+        page_numbers = [self.first_page_object + 2 * i for i in range(n_pages)]
+
+        kids = b' '.join(b'%d 0 R' % number for number in page_numbers)
+        offsets[2] = len(out)
+        out += _pdf_object(2, b'<<\n/Type /Pages\n/Kids [%s]\n/Count %d\n/MediaBox [0 0 %.2f %.2f]\n>>'
+                           % (kids, n_pages, PAGE_WIDTH * K, PAGE_HEIGHT * K))
+        for number, ops in zip(page_numbers, pages):
+            offsets[number] = len(out)
+            out += _pdf_object(number, b'<<\n/Type /Page\n/Parent 2 0 R\n/Resources 3 0 R\n/Contents %d 0 R\n>>'
+                               % (number + 1))
+            offsets[number + 1] = len(out)
+            out += _stream_object(number + 1, b''.join(ops), self.compress)
+
+        size = max(offsets) + 1
+        xref_offset = len(out)
+        out += b'xref\n0 %d\n0000000000 65535 f \n' % size
+        for number in range(1, size):
+            out += b'%010d 00000 n \n' % offsets.get(number, 0)
+        out += b'trailer\n<<\n/Size %d\n/Root 1 0 R\n>>\nstartxref\n%d\n%%%%EOF\n' % (size, xref_offset)
+        return bytes(out)
+
+
+_STREAM_RE = re.compile(rb'<<((?:[^<>]|<<[^<>]*>>)*)>>\s*stream\r?\n', re.S)
+_LENGTH_RE = re.compile(rb'/Length (\d+)')
+_TEXT_RE = re.compile(rb'\(((?:\\.|[^\\)])*)\)\s*Tj', re.S)
+_UNESCAPE_RE = re.compile(rb'\\(.)', re.S)
+
+
+def extract_text(pdf_bytes):
+    """Text drawn by Tj operators, in content-stream order"""
+    lines = []
+    for match in _STREAM_RE.finditer(pdf_bytes):
+        stream_dict = match.group(1)
+        length = _LENGTH_RE.search(stream_dict)
+        if length is None:
+            continue
+        data = pdf_bytes[match.end():match.end() + int(length.group(1))]
+        if b'/FlateDecode' in stream_dict:
+            try:
+                data = zlib.decompress(data)
+            except zlib.error:
+                continue
+        for raw in _TEXT_RE.findall(data):
+            text = _UNESCAPE_RE.sub(lambda m: b'\r' if m.group(1) == b'r' else m.group(1), raw)
+            lines.append(text.decode('latin-1'))
+    return lines
+
+
+def compare_with_legacy(template, features, student_data, result, recommendations):
+    """(equal, legacy_lines, template_lines) for one report, via text extraction"""
+    generated_at = datetime.now()
+    legacy = features.generate_pdf_report(student_data, result, recommendations, generated_at=generated_at)
+    legacy_bytes = legacy.output()
+    if isinstance(legacy_bytes, str):
+        legacy_bytes = legacy_bytes.encode('latin1')
+    legacy_lines = extract_text(bytes(legacy_bytes))
+    template_lines = extract_text(template.render(student_data, result, recommendations, generated_at=generated_at))
+    return legacy_lines == template_lines, legacy_lines, template_lines
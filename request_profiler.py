@@ -0,0 +1,294 @@
+"""
+Request Profiler
+Always-on sampling profiler for slow requests:
+- 1-in-N requests run under cProfile and are written as .prof (pstats) files
+- A watchdog thread samples the stacks of requests running past a latency
+  threshold and writes them as .collapsed (flame graph) files
+- Unsampled, fast requests pay for a counter and a dict insert only
+- Streamed requests are timed and profiled only while the producer runs, not while the
+  consumer handles each item (e.g. UI rendering between engine steps)
+- Output goes to a directory that keeps only the newest files
+"""
+
+import cProfile
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _collapse(frame, root):
+    """Stack from the request's entry frame down to frame, as 'a;b;c'"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        if frame.f_code is root:
+            break
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class RequestProfiler:
+    def __init__(self, directory='data/profiles', sample_every=0, slow_ms=None,
+                 max_files=200, interval_ms=5):
+        self.directory = directory
+        self.sample_every = sample_every
+        self.slow_ms = slow_ms
+        self.max_files = max_files
+        self.interval = interval_ms / 1000.0
+        self._counter = itertools.count(1)
+        self._local = threading.local()
+        self._active = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._watchdog = None
+        self.requests = 0
+        self.profiled = 0
+        self.slow = 0
+        self.files_written = 0
+
+        if slow_ms is not None:
+            self._watchdog = threading.Thread(target=self._watch, name='request-profiler', daemon=True)
+            self._watchdog.start()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Profiler configured by ADMISSION_PROFILE_EVERY / _SLOW_MS / _DIR, or None when both are off"""
+        environ = os.environ if environ is None else environ
+        sample_every = int(environ.get('ADMISSION_PROFILE_EVERY', 0) or 0)
+        slow_ms = environ.get('ADMISSION_PROFILE_SLOW_MS')
+        slow_ms = float(slow_ms) if slow_ms else None
+        if not sample_every and slow_ms is None:
+            return None
+        return cls(environ.get('ADMISSION_PROFILE_DIR', 'data/profiles'), sample_every, slow_ms)
+
+    # Instrumentation
+
+    def wrap(self, func, name=None):
+        """func profiled as one request named name"""
+        name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Nested instrumented calls belong to the outer request
+            if getattr(self._local, 'depth', 0):
+                return func(*args, **kwargs)
+            return self.call(name, func, *args, **kwargs)
+        return wrapper
+
+    def instrument(self, obj, method_name, name=None):
+        """Replace obj.method_name with its profiled version (on this instance only)"""
+        method = getattr(obj, method_name)
+        setattr(obj, method_name, self.wrap(method, name or method_name))
+        return obj
+
+    def call(self, name, func, *args, **kwargs):
+        with self.request(name):
+            return func(*args, **kwargs)
+
+    def request(self, name):
+        return _Request(self, name)
+
+    def stream(self, name, iterable):
+        """Iterate iterable as one request named name, paused while the caller handles each item"""
+        iterator = iter(iterable)
+        request = _Request(self, name)
+        self._begin(request)
+        # Sampled stacks start at this frame, which drives the producer
+        request.root = sys._getframe(0).f_code
+        try:
+            while True:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                self._pause(request)
+                try:
+                    yield item
+                finally:
+                    self._resume(request)
+        finally:
+            self._end(request)
+
+    # Request lifecycle (called by _Request)
+
+    def _begin(self, request):
+        self._local.depth = getattr(self._local, 'depth', 0) + 1
+        number = next(self._counter)
+        self.requests += 1
+        request.started = time.perf_counter()
+
+        if self.sample_every and number % self.sample_every == 0:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                request.profile = profile
+            except ValueError:
+                pass  # another profiler is active on this thread
+
+        if self._watchdog is not None:
+            request.thread_id = threading.get_ident()
+            request.root = sys._getframe(2).f_code
+            # Plain dict insert: the watchdog polls, so the hot path takes no lock
+            self._active[request] = request.started + self.slow_ms / 1000.0
+            if not self._wake.is_set():
+                self._wake.set()
+
+    def _pause(self, request):
+        request.paused_at = time.perf_counter()
+        self._local.depth -= 1
+        if request.profile is not None:
+            request.profile.disable()
+        if self._watchdog is not None:
+            self._active.pop(request, None)
+
+    def _resume(self, request):
+        # Time spent paused is not part of the request: shift its start forward
+        request.started += time.perf_counter() - request.paused_at
+        self._local.depth += 1
+        if request.profile is not None:
+            try:
+                request.profile.enable()
+            except ValueError:
+                pass  # another profiler became active on this thread
+        if self._watchdog is not None:
+            self._active[request] = request.started + self.slow_ms / 1000.0
+            if not self._wake.is_set():
+                self._wake.set()
+
+    def _end(self, request):
+        elapsed_ms = (time.perf_counter() - request.started) * 1000
+        self._local.depth -= 1
+
+        if request.profile is not None:
+            request.profile.disable()
+            self.profiled += 1
+            self._write(request.name, elapsed_ms, 'prof', request.profile.dump_stats)
+
+        if self._watchdog is not None:
+            self._active.pop(request, None)
+            with self._lock:
+                samples = self._samples.pop(request, None)
+            if samples:
+                self.slow += 1
+                self._write(request.name, elapsed_ms, 'collapsed',
+                            lambda path: self._write_collapsed(path, samples))
+
+    # Watchdog
+
+    def _watch(self):
+        idle_since = time.perf_counter()
+        while not self._closed:
+            if not self._active:
+                now = time.perf_counter()
+                if now - idle_since < 1.0:
+                    # Busy process: keep polling rather than being woken by every request
+                    time.sleep(max(self.slow_ms / 2000.0, self.interval))
+                    continue
+                self._wake.clear()
+                # Re-check after clearing so a request registered in between is not missed
+                if not self._active:
+                    self._wake.wait()
+                continue
+            idle_since = time.perf_counter()
+
+            now = time.perf_counter()
+            deadlines = list(self._active.items())
+            overdue = [request for request, deadline in deadlines if now >= deadline]
+            if not overdue:
+                # Nothing slow yet: sleep until the earliest request could become slow
+                time.sleep(max(min(deadline for _, deadline in deadlines) - now, self.interval))
+                continue
+
+            frames = sys._current_frames()
+            with self._lock:
+                for request in overdue:
+                    frame = frames.get(request.thread_id)
+                    if frame is not None and request in self._active:
+                        self._samples.setdefault(request, Counter())[_collapse(frame, request.root)] += 1
+            del frames
+            time.sleep(self.interval)
+
+    # Output
+
+    def _write(self, name, elapsed_ms, suffix, dump):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        path = os.path.join(self.directory, f"{stamp}_{name}_{elapsed_ms:.0f}ms.{suffix}")
+        tmp_path = f"{path}.tmp"
+        dump(tmp_path)
+        os.replace(tmp_path, path)
+        self.files_written += 1
+        self._rotate()
+
+    @staticmethod
+    def _write_collapsed(path, samples):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _rotate(self):
+        files = sorted(name for name in os.listdir(self.directory) if name.endswith(('.prof', '.collapsed')))
+        for name in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def metrics(self):
+        return {
+            'requests': self.requests,
+            'profiled': self.profiled,
+            'slow': self.slow,
+            'files_written': self.files_written,
+            'sample_every': self.sample_every,
+            'slow_ms': self.slow_ms
+        }
+
+    def close(self, wait=True):
+        self._closed = True
+        self._wake.set()
+        if wait and self._watchdog is not None:
+            self._watchdog.join()
+
+
+class _Request:
+    __slots__ = ('profiler', 'name', 'started', 'paused_at', 'profile', 'thread_id', 'root')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.profile = None
+
+    def __enter__(self):
+        self.profiler._begin(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._end(self)
+        return False
+
+
+def instrument_engine(profiler, advanced_system=None, enhanced_features=None, report_renderer=None):
+    """Profile the admission, interaction-save and PDF entry points of these instances"""
+    if profiler is None:
+        return
+    if advanced_system is not None:
+        for method in ('process_comprehensive_admission', 'process_comprehensive_admission_batch'):
+            profiler.instrument(advanced_system, method)
+    if enhanced_features is not None:
+        for method in ('save_student_interaction', 'generate_pdf_report'):
+            profiler.instrument(enhanced_features, method)
+    if report_renderer is not None:
+        profiler.instrument(report_renderer, '_render', 'generate_pdf_report')
@@ -0,0 +1,187 @@
+"""
+Result Records
+Lightweight, read-only views over catalog entries for admission results:
+- UniversityOptions expands per-university eligibility dicts on access
+- RecommendationRecord stores only IDs and scores; static course fields are read from the catalog
+- Both behave as Mappings equal to the legacy dicts, and pickle as plain dicts
+- compact/expand convert records to small JSON-safe dicts for saved sessions
+"""
+
+from collections.abc import Mapping
+
+RECOMMENDATION_KEYS = (
+    'course', 'category', 'match_score', 'success_probability', 'strength_level',
+    'career_prospects', 'salary_range', 'job_demand', 'eligible_universities',
+    'university_options', 'duration', 'difficulty', 'recommendation_reason'
+)
+
+
+class UniversityOptions(Mapping):
+    """university_code -> eligibility dict for a course whose subject requirements are met"""
+    __slots__ = ('catalog', 'course_id', 'jamb_score', 'state')
+
+    def __init__(self, catalog, course_id, jamb_score, state):
+        self.catalog = catalog
+        self.course_id = course_id
+        self.jamb_score = jamb_score
+        self.state = state
+
+    def _universities(self):
+        return self.catalog.system.courses[self.catalog.course_names[self.course_id]].get('universities', {})
+
+    def __getitem__(self, uni_code):
+        uni_data = self._universities()[uni_code]
+        university = self.catalog.system.universities[uni_code]
+        result = {
+            'university': university['name'],
+            'cutoff': uni_data['cutoff'],
+            'special_requirements': uni_data.get('special', 'None'),
+            'eligible': False,
+            'catchment_advantage': False,
+            'reason': ''
+        }
+
+        if self.jamb_score < uni_data['cutoff']:
+            result['reason'] = f"Score too low ({self.jamb_score}/{uni_data['cutoff']})"
+        else:
+            result['eligible'] = True
+            result['reason'] = "Eligible"
+
+            if self.state in university.get('catchment', []):
+                result['catchment_advantage'] = True
+                result['reason'] += " + Catchment advantage"
+
+        return result
+
+    def __iter__(self):
+        return iter(self._universities())
+
+    def __len__(self):
+        return len(self._universities())
+
+    def eligible_codes(self):
+        """University codes whose cutoff the score meets, without building the dicts"""
+        return [uni_code for uni_code, uni_data in self._universities().items()
+                if self.jamb_score >= uni_data['cutoff']]
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+    def __repr__(self):
+        return f"UniversityOptions({self.catalog.course_names[self.course_id]!r}, {self.jamb_score}, {self.state!r})"
+
+
+class RecommendationRecord(Mapping):
+    """Recommendation that references its course by catalog ID"""
+    __slots__ = ('catalog', 'course_id', 'match_score', 'success_probability', 'strength_level',
+                 'eligible_universities', 'recommendation_reason', 'jamb_score', 'state')
+
+    def __init__(self, catalog, course_id, match_score, success_probability, strength_level,
+                 eligible_universities, recommendation_reason, jamb_score, state):
+        self.catalog = catalog
+        self.course_id = course_id
+        self.match_score = match_score
+        self.success_probability = success_probability
+        self.strength_level = strength_level
+        self.eligible_universities = eligible_universities
+        self.recommendation_reason = recommendation_reason
+        self.jamb_score = jamb_score
+        self.state = state
+
+    @property
+    def course(self):
+        return self.catalog.course_names[self.course_id]
+
+    def __getitem__(self, key):
+        if key in ('match_score', 'success_probability', 'strength_level',
+                   'eligible_universities', 'recommendation_reason'):
+            return getattr(self, key)
+        if key == 'course':
+            return self.course
+        if key == 'university_options':
+            return UniversityOptions(self.catalog, self.course_id, self.jamb_score, self.state)
+
+        course_data = self.catalog.system.courses[self.course]
+        if key == 'category':
+            return course_data['category']
+        if key == 'career_prospects':
+            return course_data.get('career_prospects', [])
+        if key == 'salary_range':
+            return course_data.get('salary_range', 'Not specified')
+        if key == 'job_demand':
+            return course_data.get('job_demand', 'Medium')
+        if key == 'duration':
+            return course_data.get('duration', 4)
+        if key == 'difficulty':
+            return course_data.get('difficulty', 'Medium')
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(RECOMMENDATION_KEYS)
+
+    def __len__(self):
+        return len(RECOMMENDATION_KEYS)
+
+    def compact(self):
+        return {
+            '_record': 'recommendation',
+            'course': self.course,
+            'match_score': self.match_score,
+            'success_probability': self.success_probability,
+            'strength_level': self.strength_level,
+            'eligible_universities': self.eligible_universities,
+            'recommendation_reason': self.recommendation_reason,
+            'jamb_score': self.jamb_score,
+            'state': self.state
+        }
+
+    def __reduce__(self):
+        return dict, (to_plain(self),)
+
+    def __repr__(self):
+        return f"RecommendationRecord({self.course!r}, match_score={self.match_score:.3f})"
+
+
+def to_plain(value):
+    """Expand records (recursively) into the legacy plain dict/list structure"""
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def compact(value):
+    """JSON-safe structure with records reduced to their IDs and scores"""
+    if isinstance(value, RecommendationRecord):
+        return value.compact()
+    if isinstance(value, UniversityOptions):
+        return {'_record': 'university_options', 'course': value.catalog.course_names[value.course_id],
+                'jamb_score': value.jamb_score, 'state': value.state}
+    if isinstance(value, Mapping):
+        return {key: compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact(item) for item in value]
+    return value
+
+
+def expand(value, catalog):
+    """Inverse of compact(): rebuild records against a catalog"""
+    if isinstance(value, dict):
+        kind = value.get('_record')
+        if kind == 'recommendation':
+            fields = {key: item for key, item in value.items() if key not in ('_record', 'course')}
+            return RecommendationRecord(catalog, catalog.course_index[value['course']], **fields)
+        if kind == 'university_options':
+            return UniversityOptions(catalog, catalog.course_index[value['course']], value['jamb_score'], value['state'])
+        return {key: expand(item, catalog) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item, catalog) for item in value]
+    return value
+
+
+def json_default(value):
+    """json.dump default= hook: records are written in compact form"""
+    if isinstance(value, (RecommendationRecord, UniversityOptions)):
+        return compact(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
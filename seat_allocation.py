@@ -0,0 +1,209 @@
+"""
+Seat Allocation
+Capacity-aware assignment of a whole cohort to course x university slots
+using student-proposing deferred acceptance
+"""
+
+import numpy as np
+from cohort import Cohort
+
+
+class SeatAllocator:
+    def __init__(self, advanced_system, default_capacity=100, capacities=None,
+                 catchment_bonus=10.0, success_weight=20.0):
+        self.engine = advanced_system
+        self.catalog = advanced_system.system.get_compiled_catalog()
+        self.catchment_bonus = catchment_bonus
+        self.success_weight = success_weight
+
+        # One slot per course x university offering
+        courses = self.catalog.system.courses
+        capacities = capacities or {}
+        self.slot_course = []
+        self.slot_uni = []
+        self.slot_capacity = []
+        self.slot_index = {}
+        for course_id, course in enumerate(self.catalog.course_names):
+            for uni_code, uni_data in courses[course].get('universities', {}).items():
+                self.slot_index[(course, uni_code)] = len(self.slot_course)
+                self.slot_course.append(course_id)
+                self.slot_uni.append(self.catalog.university_index[uni_code])
+                self.slot_capacity.append(capacities.get((course, uni_code), uni_data.get('capacity', default_capacity)))
+        self.slot_course = np.array(self.slot_course, dtype=np.int32)
+        self.slot_uni = np.array(self.slot_uni, dtype=np.int32)
+        self.slot_capacity = np.array(self.slot_capacity, dtype=np.int64)
+        self.slot_cutoff = self.catalog.cutoffs[self.slot_course, self.slot_uni]
+
+    def _expand_choice(self, choice, state):
+        """Slots for one preference entry (course name or (course, university) pair)"""
+        if isinstance(choice, dict):
+            choice = (choice.get('course'), choice.get('university'))
+        if isinstance(choice, (tuple, list)):
+            slot = self.slot_index.get(tuple(choice))
+            return [] if slot is None else [slot]
+
+        # Bare course: catchment universities first, then by cutoff (highest first)
+        universities = self.catalog.system.courses.get(choice, {}).get('universities', {})
+        state_id = self.catalog.state_index.get(state, -1)
+        def rank(uni_code):
+            uni_id = self.catalog.university_index[uni_code]
+            in_catchment = state_id >= 0 and self.catalog.catchment[uni_id, state_id]
+            return (not in_catchment, -universities[uni_code]['cutoff'])
+        return [self.slot_index[(choice, uni_code)] for uni_code in sorted(universities, key=rank)]
+
+    def build_preferences(self, cohort):
+        """Padded (students x choices) slot matrix, -1 where unused"""
+        preferences = []
+        for row in range(len(cohort)):
+            if cohort.profiles is not None:
+                profile = cohort.profiles[row]
+                choices = profile.get('preferences') or [profile.get('preferred_course')]
+                state = profile.get('state', '')
+            else:
+                course_id = int(cohort.preferred_courses[row])
+                choices = [self.catalog.course_names[course_id]] if course_id >= 0 else []
+                state_id = int(cohort.states[row])
+                state = self.catalog.states[state_id] if state_id >= 0 else ''
+            slots = []
+            for choice in choices:
+                if choice is not None:
+                    slots.extend(slot for slot in self._expand_choice(choice, state) if slot not in slots)
+            preferences.append(slots)
+
+        width = max((len(slots) for slots in preferences), default=0)
+        matrix = np.full((len(cohort), max(width, 1)), -1, dtype=np.int32)
+        for row, slots in enumerate(preferences):
+            matrix[row, :len(slots)] = slots
+        return matrix
+
+    def _priorities(self, cohort, preferences):
+        """Eligibility and programme-side priority for every listed choice"""
+        n, width = preferences.shape
+        eligible = np.zeros((n, width), dtype=bool)
+        priority = np.full((n, width), -np.inf)
+        scores = cohort.jamb_scores.astype(np.float64)
+        states = cohort.states
+
+        listed = preferences >= 0
+        slot_course = np.where(listed, self.slot_course[np.maximum(preferences, 0)], -1)
+        for course_id in np.unique(slot_course[listed]):
+            rows, cols = np.nonzero(slot_course == course_id)
+            students = np.unique(rows)
+            valid = np.zeros(n, dtype=bool)
+            valid[students] = self.catalog.subject_valid(course_id, _Subset(cohort, students))
+            success = np.zeros(n)
+            valid_students = students[valid[students]]
+            course = self.catalog.course_names[course_id]
+            success[valid_students] = self.engine.predict_success_for_rows(course, cohort, valid_students)
+
+            slots = preferences[rows, cols]
+            meets_cutoff = scores[rows] >= self.slot_cutoff[slots]
+            in_catchment = (states[rows] >= 0) & self.catalog.catchment[self.slot_uni[slots], np.maximum(states[rows], 0)]
+            ok = valid[rows] & meets_cutoff
+            eligible[rows, cols] = ok
+            priority[rows, cols] = np.where(
+                ok, scores[rows] + self.catchment_bonus * in_catchment + self.success_weight * success[rows], -np.inf)
+        return eligible, priority
+
+    def allocate(self, cohort):
+        """Assign a cohort (Cohort or list of student_data dicts) to slots"""
+        if not isinstance(cohort, Cohort):
+            cohort = Cohort.from_profiles(self.catalog, cohort)
+        n = len(cohort)
+        preferences = self.build_preferences(cohort)
+        eligible, priority = self._priorities(cohort, preferences)
+
+        # Compact each student's list to eligible choices only, keeping order
+        order = np.argsort(~eligible, axis=1, kind='stable')
+        choices = np.take_along_axis(np.where(eligible, preferences, -1), order, axis=1)
+        choice_priority = np.take_along_axis(priority, order, axis=1)
+        n_choices = eligible.sum(axis=1)
+
+        assigned = np.full(n, -1, dtype=np.int32)
+        assigned_priority = np.full(n, -np.inf)
+        next_choice = np.zeros(n, dtype=np.int64)
+        rounds = 0
+
+        while True:
+            proposers = np.flatnonzero((assigned < 0) & (next_choice < n_choices))
+            if len(proposers) == 0:
+                break
+            rounds += 1
+            proposed = choices[proposers, next_choice[proposers]]
+            proposed_priority = choice_priority[proposers, next_choice[proposers]]
+            next_choice[proposers] += 1
+
+            # Current holders of the proposed slots compete with the new proposers
+            touched = np.zeros(len(self.slot_course), dtype=bool)
+            touched[proposed] = True
+            holders = np.flatnonzero((assigned >= 0) & touched[np.maximum(assigned, 0)])
+            students = np.concatenate((holders, proposers))
+            slots = np.concatenate((assigned[holders], proposed))
+            prios = np.concatenate((assigned_priority[holders], proposed_priority))
+
+            # Sort by slot, then priority (desc), then student id for deterministic ties
+            ranking = np.lexsort((students, -prios, slots))
+            sorted_slots = slots[ranking]
+            first = np.searchsorted(sorted_slots, sorted_slots, side='left')
+            keep = (np.arange(len(ranking)) - first) < self.slot_capacity[sorted_slots]
+
+            accepted = ranking[keep]
+            rejected = ranking[~keep]
+            assigned[students[rejected]] = -1
+            assigned_priority[students[rejected]] = -np.inf
+            assigned[students[accepted]] = slots[accepted]
+            assigned_priority[students[accepted]] = prios[accepted]
+
+        return self._summarize(cohort, assigned, n_choices, rounds)
+
+    def _summarize(self, cohort, assigned, n_choices, rounds):
+        n_slots = len(self.slot_course)
+        placed = assigned >= 0
+        filled = np.bincount(assigned[placed], minlength=n_slots)
+
+        # Marginal cutoff: lowest admitted JAMB score in programmes that filled up
+        scores = cohort.jamb_scores.astype(np.float64)
+        lowest = np.full(n_slots, np.inf)
+        np.minimum.at(lowest, assigned[placed], scores[placed])
+
+        courses = self.catalog.system.courses
+        programmes = []
+        for slot in range(n_slots):
+            course = self.catalog.course_names[self.slot_course[slot]]
+            uni_code = self.catalog.university_codes[self.slot_uni[slot]]
+            full = filled[slot] >= self.slot_capacity[slot]
+            programmes.append({
+                'course': course,
+                'university_code': uni_code,
+                'capacity': int(self.slot_capacity[slot]),
+                'filled': int(filled[slot]),
+                'official_cutoff': courses[course]['universities'][uni_code]['cutoff'],
+                'marginal_cutoff': float(lowest[slot]) if full and filled[slot] > 0 else None
+            })
+
+        unplaced = np.flatnonzero(~placed)
+        return {
+            'assigned_slot': assigned,
+            'placed': int(placed.sum()),
+            'unplaced': unplaced.tolist(),
+            'unplaced_no_eligible_choice': int((n_choices[unplaced] == 0).sum()),
+            'unplaced_choices_full': int((n_choices[unplaced] > 0).sum()),
+            'programmes': programmes,
+            'rounds': rounds
+        }
+
+    def assignment(self, allocation, row):
+        """(course, university_code) for a student, or None if unplaced"""
+        slot = int(allocation['assigned_slot'][row])
+        if slot < 0:
+            return None
+        return (self.catalog.course_names[self.slot_course[slot]],
+                self.catalog.university_codes[self.slot_uni[slot]])
+
+
+class _Subset:
+    """Row subset of a cohort exposing the columns used by subject_valid"""
+    def __init__(self, cohort, rows):
+        self.jamb_masks = cohort.jamb_masks[rows]
+        self.credit_masks = cohort.credit_masks[rows]
+        self.credits = cohort.credits[rows]
@@ -0,0 +1,566 @@
+"""
+Session Codec
+Compact binary encoding for saved sessions and admission results:
+- Catalog strings (courses, states, subjects) stored as catalog IDs, grades as small integers
+- Text the engine can regenerate (reasons, advice, career analysis) is not stored
+  unless it differs from what the current catalog would produce
+- Records carry a fingerprint of the catalog content (cutoffs included); a record is only
+  regenerated from that same catalog version, which SessionStore archives on first save
+- Fixed-offset header and a recommendation array readable without decoding the record
+- One file per session, written atomically
+"""
+
+import hashlib
+import json
+import os
+import struct
+import time
+import numpy as np
+from catalog_registry import OVERRIDABLE, catalog_fingerprint
+from compiled_catalog import GRADE_VALUES, GRADE_NAMES, LEARNING_STYLES, STUDY_NICHES
+from result_records import RecommendationRecord, UniversityOptions, to_plain
+
+MAGIC = b'ADMS'
+FORMAT_VERSION = 1
+
+# magic, version, flags, catalog layout fingerprint, catalog content fingerprint, saved_at, expires_at
+HEADER = struct.Struct('<4sBxHQQdd')
+# jamb_score, success_probability, preferred_course, status, state,
+# result recommendations, separate recommendations, recommendations offset, tail offset
+FIXED = struct.Struct('<ddHBBHHII')
+FIXED_OFFSET = HEADER.size
+
+RECOMMENDATION_DTYPE = np.dtype([
+    ('course', '<u2'), ('strength', 'u1'), ('eligible', 'u1'), ('flags', '<u4'),
+    ('match_score', '<f8'), ('success_probability', '<f8')
+])
+
+# Header flags
+HAS_RESULT = 1 << 0
+INT_SCORE = 1 << 1
+HAS_UNIVERSITY_OPTIONS = 1 << 2
+HAS_SUCCESS_PREDICTION = 1 << 3
+HAS_CAREER_ANALYSIS = 1 << 4
+SEPARATE_RECOMMENDATIONS = 1 << 5
+
+# Recommendation flags
+REASON_STORED = 1 << 0
+RECORD_STORED = 1 << 1
+
+STATUSES = [None, 'ADMITTED', 'NOT_ADMITTED']
+STRENGTH_LEVELS = ['Excellent', 'Very Good', 'Good', 'Average', 'Below Average', 'Weak', 'Very Weak']
+GENDERS = ['Male', 'Female']
+
+# Known student_data fields in encoding order; anything else goes to the extras blob
+STUDENT_FIELDS = [
+    ('name', 'str'), ('gender', 'enum'), ('jamb_subjects', 'jamb'),
+    ('olevel_grades', 'grades'), ('learning_style', 'enum'), ('study_niche', 'enum'),
+    ('career_interest', 'str'), ('financial_status', 'str'), ('extracurricular', 'strs'),
+    ('work_experience', 'str'), ('special_needs', 'str')
+]
+ENUMS = {'gender': GENDERS, 'learning_style': LEARNING_STYLES, 'study_niche': STUDY_NICHES}
+
+ESCAPE_U8 = 0xFF
+ESCAPE_U16 = 0xFFFF
+
+
+def layout_fingerprint(catalog):
+    """Hash of the catalog ID spaces; cutoff changes keep it stable"""
+    payload = json.dumps([catalog.course_names, catalog.university_codes, catalog.states,
+                          catalog.jamb_vocab, catalog.olevel_vocab])
+    return int.from_bytes(hashlib.sha256(payload.encode('utf-8')).digest()[:8], 'little')
+
+
+def content_fingerprint(catalog):
+    """catalog_fingerprint of the data behind a compiled catalog (changes with any cutoff)"""
+    return int(catalog_fingerprint(catalog.system), 16)
+
+
+class _Writer:
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def pack(self, fmt, *values):
+        self.buffer += struct.pack(fmt, *values)
+
+    def str(self, value):
+        data = value.encode('utf-8')
+        if len(data) >= ESCAPE_U16:
+            raise ValueError('String field longer than 65534 bytes')
+        self.pack('<H', len(data))
+        self.buffer += data
+
+    def symbol(self, value, index):
+        """Catalog ID (u8) with an inline-string escape"""
+        symbol_id = index.get(value)
+        if symbol_id is not None and symbol_id < ESCAPE_U8:
+            self.pack('B', symbol_id)
+        else:
+            self.pack('B', ESCAPE_U8)
+            self.str(str(value))
+
+    def json(self, value):
+        data = json.dumps(to_plain(value), default=str).encode('utf-8') if value else b''
+        self.pack('<I', len(data))
+        self.buffer += data
+
+
+class _Reader:
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.buffer, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values if len(values) > 1 else values[0]
+
+    def str(self):
+        length = self.unpack('<H')
+        value = bytes(self.buffer[self.offset:self.offset + length]).decode('utf-8')
+        self.offset += length
+        return value
+
+    def symbol(self, vocab):
+        symbol_id = self.unpack('B')
+        return self.str() if symbol_id == ESCAPE_U8 else vocab[symbol_id]
+
+    def json(self):
+        length = self.unpack('<I')
+        if not length:
+            return {}
+        value = json.loads(bytes(self.buffer[self.offset:self.offset + length]))
+        self.offset += length
+        return value
+
+
+class SessionCodec:
+    def __init__(self, advanced_system):
+        self.engine = advanced_system
+        self.catalog = advanced_system.system.get_compiled_catalog()
+        self.fingerprint = layout_fingerprint(self.catalog)
+        self.content_fingerprint = content_fingerprint(self.catalog)
+        self.state_index = {state: i for i, state in enumerate(self.catalog.states)}
+        self.enum_index = {field: {value: i for i, value in enumerate(values)} for field, values in ENUMS.items()}
+        self.strength_index = {level: i for i, level in enumerate(STRENGTH_LEVELS)}
+
+    # Encoding
+
+    def encode(self, student_data, result=None, recommendations=None, saved_at=None, expires_at=None):
+        """Encode one saved analysis to bytes"""
+        catalog = self.catalog
+        flags = 0
+        jamb_score = student_data.get('jamb_score', 0)
+        if isinstance(jamb_score, int):
+            flags |= INT_SCORE
+        # Courses and states outside the catalog (or absent) are kept in the student extras
+        course_id = catalog.course_index.get(student_data.get('preferred_course'), ESCAPE_U16)
+        state_id = self.state_index.get(student_data.get('state'), ESCAPE_U8)
+
+        tail = _Writer()
+        self._encode_student(tail, student_data, course_id, state_id)
+
+        status = 0
+        success_probability = float('nan')
+        result_recommendations = []
+        separate = []
+        if result is not None:
+            flags |= HAS_RESULT
+            status = STATUSES.index(result.get('admission_status'))
+            result_recommendations = list(result.get('recommendations', []))
+            if recommendations is not None and list(recommendations) != result_recommendations:
+                flags |= SEPARATE_RECOMMENDATIONS
+                separate = list(recommendations)
+            if result.get('university_options'):
+                flags |= HAS_UNIVERSITY_OPTIONS
+            if result.get('success_prediction'):
+                flags |= HAS_SUCCESS_PREDICTION
+                success_probability = result['success_prediction']['probability']
+            if result.get('career_analysis'):
+                flags |= HAS_CAREER_ANALYSIS
+            self._encode_result(tail, student_data, result)
+        elif recommendations:
+            flags |= SEPARATE_RECOMMENDATIONS
+            separate = list(recommendations)
+
+        all_recommendations = result_recommendations + separate
+        rows, stored = self._encode_recommendations(all_recommendations, student_data)
+        for kind, value in stored:
+            if kind == 'reason':
+                tail.str(value)
+            else:
+                tail.json(value)
+
+        # Recommendation array is 8-byte aligned so it can be viewed in place
+        recs_offset = FIXED_OFFSET + FIXED.size
+        recs_offset += -recs_offset % 8
+        tail_offset = recs_offset + rows.nbytes
+
+        buffer = bytearray(tail_offset)
+        HEADER.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, flags, self.fingerprint, self.content_fingerprint,
+                         saved_at or time.time(), expires_at or 0.0)
+        FIXED.pack_into(buffer, FIXED_OFFSET, float(jamb_score), float(success_probability), course_id, status,
+                        state_id, len(result_recommendations), len(separate), recs_offset, tail_offset)
+        buffer[recs_offset:tail_offset] = rows.tobytes()
+        buffer += tail.buffer
+        return bytes(buffer)
+
+    def _encode_student(self, tail, student_data, course_id, state_id):
+        present = 0
+        for bit, (field, _) in enumerate(STUDENT_FIELDS):
+            if field in student_data:
+                present |= 1 << bit
+        tail.pack('<H', present)
+
+        for field, kind in STUDENT_FIELDS:
+            if field not in student_data:
+                continue
+            value = student_data[field]
+            if kind == 'str':
+                tail.str(str(value))
+            elif kind == 'enum':
+                tail.symbol(value, self.enum_index[field])
+            elif kind == 'jamb':
+                tail.pack('B', len(value))
+                for subject in value:
+                    tail.symbol(subject, self.catalog.jamb_bits)
+            elif kind == 'grades':
+                tail.pack('B', len(value))
+                for subject, grade in value.items():
+                    tail.symbol(subject, self.catalog.olevel_bits)
+                    grade_value = GRADE_VALUES.get(grade, 0)
+                    tail.pack('B', grade_value)
+                    if not grade_value:
+                        tail.str(str(grade))
+            elif kind == 'strs':
+                tail.pack('B', len(value))
+                for item in value:
+                    tail.str(str(item))
+
+        known = {field for field, _ in STUDENT_FIELDS} | {'jamb_score'}
+        if course_id != ESCAPE_U16:
+            known.add('preferred_course')
+        if state_id != ESCAPE_U8:
+            known.add('state')
+        tail.json({key: value for key, value in student_data.items() if key not in known})
+
+    def _encode_result(self, tail, student_data, result):
+        tail.str(result.get('message') or '')
+
+        # Anything the decoder would not regenerate exactly is kept verbatim
+        expected = self._derived_result(student_data, result)
+        extras = {}
+        for key, value in result.items():
+            if key in ('admission_status', 'message', 'recommendations'):
+                continue
+            if key not in expected or expected[key] != value:
+                extras[key] = value
+        tail.json(extras)
+
+    def _encode_recommendations(self, recommendations, student_data):
+        """Recommendation rows, plus ('reason', text) / ('record', dict) tail entries for rows that need them"""
+        rows = np.zeros(len(recommendations), dtype=RECOMMENDATION_DTYPE)
+        stored = []
+        for i, rec in enumerate(recommendations):
+            course_id = self.catalog.course_index.get(rec.get('course'))
+            strength = self.strength_index.get(rec.get('strength_level'))
+            eligible = rec.get('eligible_universities')
+            if course_id is None or strength is None or not isinstance(eligible, int) or not 0 <= eligible < 256:
+                # Not expressible as a row at all (e.g. a course this catalog dropped)
+                rows[i] = (ESCAPE_U16, ESCAPE_U8, 0, RECORD_STORED, float('nan'), float('nan'))
+                stored.append(('record', rec))
+                continue
+            rows[i] = (course_id, strength, eligible, 0, rec['match_score'], rec['success_probability'])
+            if self._recommendation(rows[i], student_data, None) == rec:
+                continue
+            if self._recommendation(rows[i], student_data, rec['recommendation_reason']) == rec:
+                rows[i]['flags'] |= REASON_STORED
+                stored.append(('reason', rec['recommendation_reason']))
+            else:
+                # Computed on another catalog version (e.g. before a hot reload): keep it verbatim
+                rows[i]['flags'] |= RECORD_STORED
+                stored.append(('record', rec))
+        return rows, stored
+
+    # Decoding
+
+    def view(self, buffer):
+        return SessionView(buffer, self.catalog)
+
+    def decode(self, buffer):
+        """Decode to {'student_data', 'result', 'recommendations', 'saved_at', 'expires'}"""
+        view = self.view(buffer)
+        if view.fingerprint != self.fingerprint:
+            raise ValueError('Session was saved with a different catalog layout')
+        if view.content_fingerprint != self.content_fingerprint:
+            # Regenerating from this catalog would mix versions (e.g. new cutoffs on an old verdict)
+            raise ValueError('Session was saved with a different catalog version')
+
+        catalog = self.catalog
+        reader = _Reader(view.buffer, view.tail_offset)
+        student_data = {}
+        if view.course_id != ESCAPE_U16:
+            student_data['preferred_course'] = catalog.course_names[view.course_id]
+        if view.state_id != ESCAPE_U8:
+            student_data['state'] = catalog.states[view.state_id]
+        student_data['jamb_score'] = int(view.jamb_score) if view.flags & INT_SCORE else view.jamb_score
+        self._decode_student(reader, student_data)
+
+        if view.flags & HAS_RESULT:
+            message = reader.str()
+            extras = reader.json()
+
+        records = []
+        for row in view.recommendation_rows():
+            if row['flags'] & RECORD_STORED:
+                records.append(reader.json())
+                continue
+            reason = reader.str() if row['flags'] & REASON_STORED else None
+            records.append(self._recommendation(row, student_data, reason))
+        n_result = view.n_result_recommendations
+
+        result = None
+        if view.flags & HAS_RESULT:
+            result = self._derived_result(student_data, {
+                'admission_status': STATUSES[view.status],
+                'university_options': view.flags & HAS_UNIVERSITY_OPTIONS,
+                'success_prediction': view.success_probability if view.flags & HAS_SUCCESS_PREDICTION else None,
+                'career_analysis': view.flags & HAS_CAREER_ANALYSIS
+            })
+            result = {
+                'student_name': result['student_name'],
+                'preferred_course': result['preferred_course'],
+                'admission_status': result['admission_status'],
+                'message': message,
+                'university_options': result['university_options'],
+                'recommendations': records[:n_result],
+                'success_prediction': result['success_prediction'],
+                'career_analysis': result['career_analysis']
+            }
+            result.update(extras)
+
+        if view.flags & SEPARATE_RECOMMENDATIONS:
+            recommendations = records[n_result:]
+        else:
+            recommendations = result['recommendations'] if result is not None else []
+
+        return {
+            'student_data': student_data,
+            'result': result,
+            'recommendations': recommendations,
+            'saved_at': view.saved_at,
+            'expires': view.expires_at or None
+        }
+
+    def _decode_student(self, reader, student_data):
+        present = reader.unpack('<H')
+        for bit, (field, kind) in enumerate(STUDENT_FIELDS):
+            if not present >> bit & 1:
+                continue
+            if kind == 'str':
+                student_data[field] = reader.str()
+            elif kind == 'enum':
+                student_data[field] = reader.symbol(ENUMS[field])
+            elif kind == 'jamb':
+                student_data[field] = [reader.symbol(self.catalog.jamb_vocab) for _ in range(reader.unpack('B'))]
+            elif kind == 'grades':
+                grades = {}
+                for _ in range(reader.unpack('B')):
+                    subject = reader.symbol(self.catalog.olevel_vocab)
+                    grade_value = reader.unpack('B')
+                    grades[subject] = GRADE_NAMES[grade_value] if grade_value else reader.str()
+                student_data[field] = grades
+            elif kind == 'strs':
+                student_data[field] = [reader.str() for _ in range(reader.unpack('B'))]
+        student_data.update(reader.json())
+
+    # Regeneration from the catalog
+
+    def _derived_result(self, student_data, result):
+        """Result fields the engine would produce for this student and verdict"""
+        preferred_course = student_data.get('preferred_course')
+        derived = {
+            'student_name': student_data.get('name'),
+            'preferred_course': preferred_course,
+            'admission_status': result.get('admission_status'),
+            'university_options': {},
+            'success_prediction': None,
+            'career_analysis': None
+        }
+        course_id = self.catalog.course_index.get(preferred_course)
+        if course_id is None:
+            return derived
+
+        if result.get('university_options'):
+            derived['university_options'] = UniversityOptions(
+                self.catalog, course_id, student_data.get('jamb_score', 0), student_data.get('state', ''))
+
+        prediction = result.get('success_prediction')
+        if prediction is not None:
+            probability = prediction['probability'] if isinstance(prediction, dict) else prediction
+            derived['success_prediction'] = {
+                'probability': probability,
+                'level': 'High' if probability > 0.7 else 'Medium' if probability > 0.5 else 'Low',
+                'advice': self.engine._generate_success_advice(probability)
+            }
+
+        if result.get('career_analysis'):
+            course_data = self.catalog.system.courses[preferred_course]
+            career_data = self.catalog.system.career_paths.get(course_data['category'], {})
+            derived['career_analysis'] = {
+                'prospects': course_data.get('career_prospects', []),
+                'salary_range': course_data.get('salary_range', 'Not specified'),
+                'job_demand': course_data.get('job_demand', 'Medium'),
+                'growth_rate': career_data.get('growth_rate', 'Medium'),
+                'job_security': career_data.get('job_security', 'Medium'),
+                'international_mobility': career_data.get('international_mobility', 'Medium')
+            }
+        return derived
+
+    def _recommendation(self, row, student_data, reason):
+        course_id = int(row['course'])
+        strength_level = STRENGTH_LEVELS[row['strength']]
+        success_probability = float(row['success_probability'])
+        eligible = int(row['eligible'])
+        if reason is None:
+            category = self.catalog.system.courses[self.catalog.course_names[course_id]]['category']
+            reason = self.engine._generate_recommendation_reason(
+                {'strength_level': strength_level}, success_probability,
+                self.catalog.system.career_paths.get(category, {}), [None] * eligible)
+        return RecommendationRecord(
+            self.catalog, course_id, float(row['match_score']), success_probability, strength_level,
+            eligible, reason, student_data.get('jamb_score', 0), student_data.get('state', ''))
+
+
+class SessionView:
+    """Field access straight from an encoded buffer, without decoding the record"""
+
+    def __init__(self, buffer, catalog=None):
+        self.buffer = memoryview(buffer)
+        self.catalog = catalog
+        magic, version = struct.unpack_from('<4sB', self.buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('Not a session record')
+        (_, _, self.flags, self.fingerprint, self.content_fingerprint,
+         self.saved_at, self.expires_at) = HEADER.unpack_from(self.buffer, 0)
+        (self.jamb_score, self.success_probability, self.course_id, self.status, self.state_id,
+         self.n_result_recommendations, self.n_separate_recommendations,
+         self.recommendations_offset, self.tail_offset) = FIXED.unpack_from(self.buffer, FIXED_OFFSET)
+
+    @property
+    def admission_status(self):
+        return STATUSES[self.status]
+
+    @property
+    def preferred_course(self):
+        if self.course_id == ESCAPE_U16 or self.catalog is None:
+            return None
+        return self.catalog.course_names[self.course_id]
+
+    def recommendation_rows(self):
+        """Structured array over the encoded recommendations (no copy)"""
+        count = self.n_result_recommendations + self.n_separate_recommendations
+        return np.frombuffer(self.buffer, dtype=RECOMMENDATION_DTYPE, count=count,
+                             offset=self.recommendations_offset)
+
+    @property
+    def top_recommendation(self):
+        rows = self.recommendation_rows()
+        if len(rows) == 0 or self.catalog is None or rows[0]['course'] == ESCAPE_U16:
+            return None
+        return self.catalog.course_names[int(rows[0]['course'])]
+
+    def expired(self, now=None):
+        return bool(self.expires_at) and (now or time.time()) >= self.expires_at
+
+
+class SessionStore:
+    """One binary file per saved session, plus one archived copy of each catalog version saved with"""
+
+    def __init__(self, codec, directory='data/sessions', ttl_days=30):
+        self.codec = codec
+        self.directory = directory
+        self.ttl = ttl_days * 86400
+        self._codecs = {codec.content_fingerprint: codec}
+        self._archived = False
+
+    def _catalog_path(self, fingerprint):
+        return os.path.join(self.directory, 'catalogs', f"{fingerprint:016x}.json")
+
+    def _archive_catalog(self):
+        """Keep this codec's catalog data, so its sessions decode unchanged after a reload"""
+        if self._archived:
+            return
+        path = self._catalog_path(self.codec.content_fingerprint)
+        if not os.path.exists(path):
+            system = self.codec.catalog.system
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({name: getattr(system, name) for name in OVERRIDABLE}, f, default=str)
+            os.replace(tmp_path, path)
+        self._archived = True
+
+    def codec_for(self, view):
+        """Codec over the catalog version a record was saved with"""
+        fingerprint = view.content_fingerprint
+        codec = self._codecs.get(fingerprint)
+        if codec is None:
+            from ultimate_admission_system import UltimateAdmissionSystem
+            from ultimate_admission_system_part2 import UltimateAdmissionSystemPart2
+
+            path = self._catalog_path(fingerprint)
+            if not os.path.exists(path):
+                raise ValueError(f"Catalog version {fingerprint:016x} of this session is not archived")
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            part1 = UltimateAdmissionSystem()
+            for name, value in data.items():
+                setattr(part1, name, value)
+            codec = SessionCodec(UltimateAdmissionSystemPart2(part1))
+            self._codecs[fingerprint] = codec
+        return codec
+
+    def _path(self, session_id):
+        safe_id = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in session_id)
+        return os.path.join(self.directory, f"{safe_id}.adms")
+
+    def save(self, session_id, data):
+        """data: {'student_data', 'result', 'recommendations'} as passed to save_session"""
+        now = time.time()
+        self._archive_catalog()
+        payload = self.codec.encode(data['student_data'], data.get('result'), data.get('recommendations'),
+                                    saved_at=now, expires_at=now + self.ttl)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(session_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return len(payload)
+
+    def _read(self, session_id):
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def view(self, session_id):
+        payload = self._read(session_id)
+        return None if payload is None else self.codec.view(payload)
+
+    def load(self, session_id):
+        """Decoded session, or None if missing or expired"""
+        payload = self._read(session_id)
+        if payload is None:
+            return None
+        view = self.codec.view(payload)
+        if view.expired():
+            return None
+        return self.codec_for(view).decode(payload)
+
+    def delete(self, session_id):
+        path = self._path(session_id)
+        if os.path.exists(path):
+            os.remove(path)
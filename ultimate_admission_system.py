@@ -10,6 +10,8 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+from compiled_catalog import CompiledCatalog
+from course_graph import CourseGraph
 
 class UltimateAdmissionSystem:
     def __init__(self):
@@ -43,10 +45,32 @@ class UltimateAdmissionSystem:
             'FUTO': {'name': 'Federal University of Technology Owerri', 'catchment': ['Imo', 'Abia']},
             'OAU': {'name': 'Obafemi Awolowo University', 'catchment': ['Osun', 'Ondo']}
         }
-        
+
+        self.states = [
+            'Abia', 'Adamawa', 'Akwa Ibom', 'Anambra', 'Bauchi', 'Bayelsa', 'Benue',
+            'Borno', 'Cross River', 'Delta', 'Ebonyi', 'Edo', 'Ekiti', 'Enugu',
+            'Gombe', 'Imo', 'Jigawa', 'Kaduna', 'Kano', 'Katsina', 'Kebbi', 'Kogi',
+            'Kwara', 'Lagos', 'Nasarawa', 'Niger', 'Ogun', 'Ondo', 'Osun', 'Oyo',
+            'Plateau', 'Rivers', 'Sokoto', 'Taraba', 'Yobe', 'Zamfara', 'FCT'
+        ]
+
         self.courses = self._load_comprehensive_courses()
         self.career_paths = self._load_career_paths()
-        
+        self._compiled_catalog = None
+        self._course_graph = None
+
+    def get_compiled_catalog(self):
+        """Bitmask/array view of the course catalog (built once per system)"""
+        if self._compiled_catalog is None:
+            self._compiled_catalog = CompiledCatalog(self)
+        return self._compiled_catalog
+
+    def get_course_graph(self):
+        """Course-similarity graph over the compiled catalog (built once per system)"""
+        if self._course_graph is None:
+            self._course_graph = CourseGraph(self.get_compiled_catalog())
+        return self._course_graph
+
     def _load_comprehensive_courses(self):
         return {
             # MEDICAL SCIENCES (15 courses)
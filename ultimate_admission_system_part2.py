@@ -9,12 +9,17 @@ from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 import joblib
+from cohort import Cohort
+from result_records import RecommendationRecord, UniversityOptions
+from explanations import SuccessExplainer
 
 class UltimateAdmissionSystemPart2:
     def __init__(self, part1_system):
         self.system = part1_system
         self.ml_models = {}
         self.encoders = {}
+        self._explainer = None
+        self.recommendation_table = None
         
     def validate_olevel_requirements(self, course, student_olevel_grades):
         """Enhanced O'Level validation"""
@@ -37,7 +42,7 @@ class UltimateAdmissionSystemPart2:
         
         # Check course-specific requirements
         missing_requirements = []
-        for req_subject in required_subjects:
+        for req_subject in sorted(required_subjects):
             if req_subject not in student_olevel_grades:
                 missing_requirements.append(f"{req_subject} (not taken)")
             elif student_olevel_grades[req_subject] not in grade_values or grade_values[student_olevel_grades[req_subject]] < 4:
@@ -191,7 +196,36 @@ class UltimateAdmissionSystemPart2:
         
         # Fallback to rule-based prediction
         return self._rule_based_success_prediction(student_profile, course_data)
-    
+
+    def predict_success_for_rows(self, course, cohort, rows):
+        """Predict success probability for selected rows of a cohort"""
+        catalog = self.system.get_compiled_catalog()
+        course_id = catalog.course_index.get(course)
+        if course_id is not None and self.system.courses[course]['category'] not in self.ml_models:
+            # No category model: the rule-based kernel scores every row at once
+            return catalog.rule_based_success(cohort, [course_id], np.asarray(rows, dtype=np.int64))[:, 0]
+        return np.array([self.predict_success_probability(course, cohort.profile(int(row))) for row in rows],
+                        dtype=np.float64)
+
+    def predict_success_matrix(self, cohort, course_ids=None):
+        """Students x courses success probabilities (default: every catalog course)"""
+        catalog = self.system.get_compiled_catalog()
+        if course_ids is None:
+            course_ids = np.arange(len(catalog.course_names))
+        success = catalog.rule_based_success(cohort, course_ids)
+        rows = np.arange(len(cohort))
+        for j, course_id in enumerate(course_ids):
+            course = catalog.course_names[course_id]
+            if self.system.courses[course]['category'] in self.ml_models:
+                success[:, j] = self.predict_success_for_rows(course, cohort, rows)
+        return success
+
+    def explain_success_predictions(self, student_profile, courses=None):
+        """Per-feature contributions behind predict_success_probability for each course"""
+        if self._explainer is None:
+            self._explainer = SuccessExplainer(self)
+        return self._explainer.explain(student_profile, courses)
+
     def _extract_ml_features(self, student_profile, course_data):
         """Extract features for ML model"""
         grade_values = {'A1': 9, 'B2': 8, 'B3': 7, 'C4': 6, 'C5': 5, 'C6': 4, 'D7': 3, 'E8': 2, 'F9': 1}
@@ -266,6 +300,10 @@ class UltimateAdmissionSystemPart2:
     
     def recommend_intelligent_alternatives(self, student_profile):
         """Intelligent course recommendations based on comprehensive analysis"""
+        candidates = self._table_candidates(student_profile)
+        if candidates is not None:
+            return self._recommend_from_candidates(student_profile, candidates)
+        
         jamb_score = student_profile.get('jamb_score', 0)
         jamb_subjects = student_profile.get('jamb_subjects', [])
         olevel_grades = student_profile.get('olevel_grades', {})
@@ -275,6 +313,7 @@ class UltimateAdmissionSystemPart2:
         
         # Get advanced strengths
         strengths = self.assess_advanced_student_strengths(olevel_grades, learning_style, study_niche, jamb_subjects)
+        catalog = self.system.get_compiled_catalog()
         
         recommendations = []
         
@@ -302,47 +341,48 @@ class UltimateAdmissionSystemPart2:
             
             # Career prospects score
             career_data = self.system.career_paths.get(category, {})
-            career_score = self._calculate_career_score(career_data)
             
-            # University options
-            university_options = self.calculate_university_specific_eligibility(
-                course, jamb_score, jamb_subjects, olevel_grades, state
-            )
-            eligible_unis = [uni for uni, data in university_options.items() if data['eligible']]
+            # University options (subject requirements already met, so only cutoffs and catchment matter)
+            university_options = UniversityOptions(catalog, catalog.course_index[course], jamb_score, state)
+            eligible_unis = university_options.eligible_codes()
             
             if not eligible_unis:
                 continue
             
-            # Final recommendation score
-            match_score = (
-                strength_data['final_score'] * 0.3 +
-                success_prob * 10 * 0.4 +
-                career_score * 0.2 +
-                len(eligible_unis) * 0.1
-            )
-            
-            recommendations.append({
-                'course': course,
-                'category': category,
-                'match_score': match_score,
-                'success_probability': success_prob,
-                'strength_level': strength_data.get('strength_level', 'Average'),
-                'career_prospects': course_data.get('career_prospects', []),
-                'salary_range': course_data.get('salary_range', 'Not specified'),
-                'job_demand': course_data.get('job_demand', 'Medium'),
-                'eligible_universities': len(eligible_unis),
-                'university_options': university_options,
-                'duration': course_data.get('duration', 4),
-                'difficulty': course_data.get('difficulty', 'Medium'),
-                'recommendation_reason': self._generate_recommendation_reason(
-                    strength_data, success_prob, career_data, eligible_unis
-                )
-            })
+            recommendations.append(self._build_recommendation(
+                catalog.course_index[course], strength_data, success_prob, career_data, eligible_unis, jamb_score, state
+            ))
         
         # Sort by match score
         recommendations.sort(key=lambda x: x['match_score'], reverse=True)
         return recommendations[:15]  # Top 15 recommendations
     
+    def _build_recommendation(self, course_id, strength_data, success_prob, career_data, eligible_unis,
+                              jamb_score, state):
+        """Recommendation record for a course the student is eligible for"""
+        career_score = self._calculate_career_score(career_data)
+        
+        # Final recommendation score
+        match_score = (
+            strength_data['final_score'] * 0.3 +
+            success_prob * 10 * 0.4 +
+            career_score * 0.2 +
+            len(eligible_unis) * 0.1
+        )
+        
+        return RecommendationRecord(
+            self.system.get_compiled_catalog(), course_id,
+            match_score=match_score,
+            success_probability=success_prob,
+            strength_level=strength_data.get('strength_level', 'Average'),
+            eligible_universities=len(eligible_unis),
+            recommendation_reason=self._generate_recommendation_reason(
+                strength_data, success_prob, career_data, eligible_unis
+            ),
+            jamb_score=jamb_score,
+            state=state
+        )
+    
     def _calculate_career_score(self, career_data):
         """Calculate career prospects score"""
         scores = {
@@ -385,7 +425,10 @@ class UltimateAdmissionSystemPart2:
         return "; ".join(reasons) if reasons else "Meets basic requirements"
     
     def process_comprehensive_admission(self, student_data):
-        """Main comprehensive admission processing"""
+        """Main comprehensive admission processing.
+        
+        NOT_ADMITTED results also carry 'related_courses' (see course_graph.CourseGraph.related_courses).
+        """
         name = student_data['name']
         preferred_course = student_data['preferred_course']
         jamb_score = student_data['jamb_score']
@@ -412,38 +455,17 @@ class UltimateAdmissionSystemPart2:
         
         if jamb_valid and olevel_valid:
             # Check university-specific eligibility
-            university_options = self.calculate_university_specific_eligibility(
-                preferred_course, jamb_score, jamb_subjects, olevel_grades, state
-            )
+            catalog = self.system.get_compiled_catalog()
+            university_options = UniversityOptions(catalog, catalog.course_index[preferred_course], jamb_score, state)
             
-            eligible_unis = [uni for uni, data in university_options.items() if data['eligible']]
+            eligible_unis = university_options.eligible_codes()
             
             if eligible_unis:
                 result['admission_status'] = 'ADMITTED'
                 result['message'] = f"Congratulations! You are eligible for {preferred_course} at {len(eligible_unis)} universities."
                 result['university_options'] = university_options
                 
-                # Success prediction
-                success_prob = self.predict_success_probability(preferred_course, student_data)
-                result['success_prediction'] = {
-                    'probability': success_prob,
-                    'level': 'High' if success_prob > 0.7 else 'Medium' if success_prob > 0.5 else 'Low',
-                    'advice': self._generate_success_advice(success_prob)
-                }
-                
-                # Career analysis
-                course_data = self.system.courses[preferred_course]
-                category = course_data['category']
-                career_data = self.system.career_paths.get(category, {})
-                
-                result['career_analysis'] = {
-                    'prospects': course_data.get('career_prospects', []),
-                    'salary_range': course_data.get('salary_range', 'Not specified'),
-                    'job_demand': course_data.get('job_demand', 'Medium'),
-                    'growth_rate': career_data.get('growth_rate', 'Medium'),
-                    'job_security': career_data.get('job_security', 'Medium'),
-                    'international_mobility': career_data.get('international_mobility', 'Medium')
-                }
+                self._add_admission_details(result, preferred_course, student_data)
             else:
                 result['admission_status'] = 'NOT_ADMITTED'
                 result['message'] = f"You meet the subject requirements for {preferred_course} but your JAMB score is below all university cutoffs."
@@ -454,6 +476,9 @@ class UltimateAdmissionSystemPart2:
             else:
                 result['message'] = f"O'Level requirements not met for {preferred_course}. {olevel_msg}"
         
+        if result['admission_status'] == 'NOT_ADMITTED':
+            result['related_courses'] = self.system.get_course_graph().related_courses(student_data)
+        
         # Always provide recommendations
         recommendations = self.recommend_intelligent_alternatives(student_data)
         result['recommendations'] = recommendations
@@ -463,6 +488,203 @@ class UltimateAdmissionSystemPart2:
         
         return result
     
+    def process_comprehensive_admission_batch(self, students):
+        """Batched process_comprehensive_admission: one eligibility matrix for all students"""
+        if not students:
+            return []
+        
+        catalog = self.system.get_compiled_catalog()
+        return self.process_comprehensive_admission_cohort(Cohort.from_profiles(catalog, students))
+    
+    def process_comprehensive_admission_cohort(self, cohort):
+        """process_comprehensive_admission_batch over an already-encoded Cohort (e.g. from arrow_ingest).
+        
+        Eligibility comes straight from the cohort columns; a row's student_data dict is only
+        materialized (if the cohort has none) to build that row's result.
+        """
+        if not len(cohort):
+            return []
+        
+        catalog = self.system.get_compiled_catalog()
+        # Students x courses: JAMB combination and O'Level requirements met
+        subject_valid = np.column_stack([
+            catalog.subject_valid(course_id, cohort) for course_id in range(len(catalog.course_names))
+        ])
+        candidates = subject_valid & (cohort.jamb_scores[:, None] >= catalog.min_cutoff[None, :])
+        success = self.predict_success_matrix(cohort)
+        
+        return [
+            self._process_from_eligibility(cohort.profile(i), subject_valid[i], candidates[i], success[i])
+            for i in range(len(cohort))
+        ]
+    
+    def _process_from_eligibility(self, student_data, subject_valid, candidates, success=None):
+        """process_comprehensive_admission with course eligibility (and optionally success) precomputed"""
+        catalog = self.system.get_compiled_catalog()
+        course_id = catalog.course_index.get(student_data['preferred_course'])
+        result = self._preferred_course_result(student_data, course_id is not None and subject_valid[course_id], candidates)
+        
+        recommendations = self._recommend_from_candidates(student_data, candidates, success)
+        self._attach_recommendations(result, recommendations)
+        return result
+    
+    def _preferred_course_result(self, student_data, preferred_valid, candidates=None):
+        """Result dict with the preferred-course verdict filled in"""
+        preferred_course = student_data['preferred_course']
+        jamb_score = student_data['jamb_score']
+        state = student_data.get('state', '')
+        
+        result = {
+            'student_name': student_data['name'],
+            'preferred_course': preferred_course,
+            'admission_status': None,
+            'message': None,
+            'university_options': {},
+            'recommendations': [],
+            'success_prediction': None,
+            'career_analysis': None
+        }
+        
+        if preferred_valid:
+            catalog = self.system.get_compiled_catalog()
+            university_options = UniversityOptions(catalog, catalog.course_index[preferred_course], jamb_score, state)
+            eligible_unis = university_options.eligible_codes()
+            
+            if eligible_unis:
+                result['admission_status'] = 'ADMITTED'
+                result['message'] = f"Congratulations! You are eligible for {preferred_course} at {len(eligible_unis)} universities."
+                result['university_options'] = university_options
+                self._add_admission_details(result, preferred_course, student_data)
+            else:
+                result['admission_status'] = 'NOT_ADMITTED'
+                result['message'] = f"You meet the subject requirements for {preferred_course} but your JAMB score is below all university cutoffs."
+        else:
+            # Messages only needed for the failing preferred course
+            jamb_valid, jamb_msg = self.system.validate_jamb_subjects(preferred_course, student_data['jamb_subjects'])
+            result['admission_status'] = 'NOT_ADMITTED'
+            if not jamb_valid:
+                result['message'] = f"JAMB subjects invalid for {preferred_course}. {jamb_msg}"
+            else:
+                _, olevel_msg = self.validate_olevel_requirements(preferred_course, student_data['olevel_grades'])
+                result['message'] = f"O'Level requirements not met for {preferred_course}. {olevel_msg}"
+        
+        if result['admission_status'] == 'NOT_ADMITTED':
+            result['related_courses'] = self.system.get_course_graph().related_courses(student_data, candidates=candidates)
+        
+        return result
+    
+    def _attach_recommendations(self, result, recommendations):
+        result['recommendations'] = recommendations
+        if result['admission_status'] == 'NOT_ADMITTED' and recommendations:
+            result['message'] += f"\n\nHowever, we found {len(recommendations)} alternative courses that match your profile:"
+    
+    def stream_comprehensive_admission(self, student_data):
+        """Progressive process_comprehensive_admission.
+        
+        Yields ('verdict', result) as soon as the preferred course is evaluated,
+        then ('recommendation', rec) for each recommendation in final rank order,
+        then ('complete', result) with the same content process_comprehensive_admission returns.
+        """
+        catalog = self.system.get_compiled_catalog()
+        cohort = Cohort.from_profiles(catalog, [student_data])
+        
+        # Verdict first: only the preferred course is evaluated
+        course_id = catalog.course_index.get(student_data['preferred_course'])
+        preferred_valid = course_id is not None and bool(catalog.subject_valid(course_id, cohort)[0])
+        result = self._preferred_course_result(student_data, preferred_valid)
+        yield 'verdict', dict(result)
+        
+        candidates = self._table_candidates(student_data)
+        if candidates is None:
+            subject_valid = np.array([catalog.subject_valid(cid, cohort)[0] for cid in range(len(catalog.course_names))])
+            candidates = subject_valid & (cohort.jamb_scores[0] >= catalog.min_cutoff)
+        
+        recommendations = []
+        for recommendation in self._iter_ranked_recommendations(student_data, candidates):
+            recommendations.append(recommendation)
+            yield 'recommendation', recommendation
+        
+        self._attach_recommendations(result, recommendations)
+        yield 'complete', result
+    
+    def _table_candidates(self, student_profile):
+        """Candidate courses from the attached archetype table, or None to scan every course"""
+        if self.recommendation_table is None:
+            return None
+        return self.recommendation_table.candidates(student_profile)
+    
+    def _recommend_from_candidates(self, student_profile, candidates, success=None):
+        """recommend_intelligent_alternatives over precomputed candidate courses"""
+        return list(self._iter_ranked_recommendations(student_profile, candidates, success=success))
+    
+    def _iter_ranked_recommendations(self, student_profile, candidates, limit=15, success=None):
+        """Rank candidate courses by match score, then build records best-first.
+        
+        success, if given, holds the student's success probability for every catalog course.
+        """
+        catalog = self.system.get_compiled_catalog()
+        jamb_score = student_profile.get('jamb_score', 0)
+        state = student_profile.get('state', '')
+        strengths = self.assess_advanced_student_strengths(
+            student_profile.get('olevel_grades', {}),
+            student_profile.get('learning_style', 'Visual'),
+            student_profile.get('study_niche', 'Practical'),
+            student_profile.get('jamb_subjects', [])
+        )
+        
+        course_ids = np.flatnonzero(candidates)
+        if len(course_ids) == 0:
+            return
+        
+        # Match score inputs for every candidate; eligible universities are offerings at or below the score
+        courses = [catalog.course_names[course_id] for course_id in course_ids]
+        categories = [self.system.courses[course]['category'] for course in courses]
+        strength_data = [strengths.get(category, {'final_score': 1}) for category in categories]
+        career_data = [self.system.career_paths.get(category, {}) for category in categories]
+        if success is None:
+            success = np.array([self.predict_success_probability(course, student_profile) for course in courses])
+        else:
+            success = success[course_ids]
+        strength_score = np.array([data['final_score'] for data in strength_data], dtype=np.float64)
+        career_score = np.array([self._calculate_career_score(data) for data in career_data], dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            n_eligible = (catalog.cutoffs[course_ids] <= jamb_score).sum(axis=1)
+        
+        match_score = strength_score * 0.3 + success * 10 * 0.4 + career_score * 0.2 + n_eligible * 0.1
+        
+        # Stable descending order, matching list.sort(reverse=True) on the scalar path
+        ranked = [i for i in np.argsort(-match_score, kind='stable') if n_eligible[i] > 0]
+        for i in ranked[:limit]:
+            course_id = int(course_ids[i])
+            eligible_unis = UniversityOptions(catalog, course_id, jamb_score, state).eligible_codes()
+            yield self._build_recommendation(
+                course_id, strength_data[i], success[i].item(), career_data[i], eligible_unis, jamb_score, state
+            )
+    
+    def _add_admission_details(self, result, preferred_course, student_data):
+        """Success prediction and career analysis for an admitted student"""
+        # Success prediction
+        success_prob = self.predict_success_probability(preferred_course, student_data)
+        result['success_prediction'] = {
+            'probability': success_prob,
+            'level': 'High' if success_prob > 0.7 else 'Medium' if success_prob > 0.5 else 'Low',
+            'advice': self._generate_success_advice(success_prob)
+        }
+        
+        # Career analysis
+        course_data = self.system.courses[preferred_course]
+        category = course_data['category']
+        career_data = self.system.career_paths.get(category, {})
+        
+        result['career_analysis'] = {
+            'prospects': course_data.get('career_prospects', []),
+            'salary_range': course_data.get('salary_range', 'Not specified'),
+            'job_demand': course_data.get('job_demand', 'Medium'),
+            'growth_rate': career_data.get('growth_rate', 'Medium'),
+            'job_security': career_data.get('job_security', 'Medium'),
+            'international_mobility': career_data.get('international_mobility', 'Medium')
+        }
+    
     def _generate_success_advice(self, success_prob):
         """Generate advice based on success probability"""
         if success_prob > 0.8:
@@ -4,12 +4,18 @@ Working Enhanced App - Fixed Form Issues
 
 import streamlit as st
 import pandas as pd
-from ultimate_admission_system import UltimateAdmissionSystem
-from ultimate_admission_system_part2 import UltimateAdmissionSystemPart2
 from enhanced_features import EnhancedFeatures
+from catalog_registry import CatalogRegistry
+from report_renderer import ReportRenderer, ReportQueueFull
+from catalog_view import CatalogView, NOT_TAKEN
+from session_codec import SessionCodec, SessionStore
+from request_profiler import RequestProfiler, instrument_engine
+from memory_budget import MemoryBudget
+from archetype_table import ArchetypeTable
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import os
 import uuid
 from datetime import datetime
-import base64
 
 # Page config
 st.set_page_config(
@@ -20,16 +26,58 @@ st.set_page_config(
 
 # Initialize systems
 @st.cache_resource
-def load_systems():
-    part1 = UltimateAdmissionSystem()
-    part2 = UltimateAdmissionSystemPart2(part1)
-    enhanced = EnhancedFeatures()
-    return part1, part2, enhanced
+def load_registry():
+    # Set ADMISSION_CATALOG_OVERRIDES to a JSON file to hot-reload cutoffs without a restart
+    override_path = os.environ.get('ADMISSION_CATALOG_OVERRIDES')
+    registry = CatalogRegistry(override_path=override_path)
+    if override_path:
+        registry.watch()
+    return registry
 
-system, advanced_system, enhanced_features = load_systems()
+@st.cache_resource
+def load_request_profiler():
+    # Set ADMISSION_PROFILE_EVERY and/or ADMISSION_PROFILE_SLOW_MS to profile sampled or slow requests
+    return RequestProfiler.from_env()
+
+@st.cache_resource
+def load_enhanced_features():
+    features = EnhancedFeatures()
+    instrument_engine(load_request_profiler(), enhanced_features=features)
+    return features
+
+@st.cache_resource
+def load_report_renderer():
+    renderer = ReportRenderer(max_workers=2, max_pending=32)
+    instrument_engine(load_request_profiler(), report_renderer=renderer)
+    return renderer
+
+@st.cache_resource
+def load_memory_budget():
+    # Set ADMISSION_MEMORY_BUDGET_MB to evict PDF cache, result cache, then cold models beyond that size
+    budget_mb = os.environ.get('ADMISSION_MEMORY_BUDGET_MB')
+    if not budget_mb:
+        return None
+    return MemoryBudget(int(float(budget_mb) * 1024 * 1024), load_registry(), load_report_renderer(),
+                        load_enhanced_features())
+
+# Interaction count changes as users submit, so it is cached briefly rather than per process
+@st.cache_data(ttl=60)
+def load_training_stats():
+    return load_enhanced_features().get_training_data_stats()
+
+# One catalog snapshot per rerun, so a reload never mixes versions within a page
+snapshot = load_registry().current()
+system, advanced_system = snapshot.part1, snapshot.part2
+enhanced_features = load_enhanced_features()
+report_renderer = load_report_renderer()
+view = snapshot.resource('catalog_view', lambda snap: CatalogView(snap.part1, enhanced_features))
+session_store = snapshot.resource('session_store', lambda snap: SessionStore(SessionCodec(snap.part2)))
+# Set ADMISSION_ARCHETYPE_TABLE to a table from archetype_table.py to look up recommendation candidates
+snapshot.resource('archetype_table',
+                  lambda snap: ArchetypeTable.attach_file(os.environ.get('ADMISSION_ARCHETYPE_TABLE'), snap.part2))
 
 # Apply CSS
-st.markdown(enhanced_features.get_mobile_css(), unsafe_allow_html=True)
+st.markdown(view.mobile_css, unsafe_allow_html=True)
 
 # Session management
 if 'session_id' not in st.session_state:
@@ -47,144 +95,62 @@ def main():
         with col1:
             name = st.text_input("Full Name*")
         with col2:
-            gender = st.selectbox("Gender*", ['Male', 'Female'])
+            gender = st.selectbox("Gender*", view.genders)
         with col3:
-            state = st.selectbox("State*", [
-            'Abia', 'Adamawa', 'Akwa Ibom', 'Anambra', 'Bauchi', 'Bayelsa', 'Benue',
-            'Borno', 'Cross River', 'Delta', 'Ebonyi', 'Edo', 'Ekiti', 'Enugu',
-            'Gombe', 'Imo', 'Jigawa', 'Kaduna', 'Kano', 'Katsina', 'Kebbi', 'Kogi',
-            'Kwara', 'Lagos', 'Nasarawa', 'Niger', 'Ogun', 'Ondo', 'Osun', 'Oyo',
-            'Plateau', 'Rivers', 'Sokoto', 'Taraba', 'Yobe', 'Zamfara', 'FCT'
-        ])
+            state = st.selectbox("State*", view.states)
         
         st.subheader("🎓 Academic Information")
         
         col1, col2 = st.columns(2)
         with col1:
-            preferred_course = st.selectbox("Preferred Course*", list(system.courses.keys()))
+            preferred_course = st.selectbox("Preferred Course*", view.course_options, format_func=view.course_label)
             jamb_score = st.number_input("JAMB Score*", 0, 400, 250)
         
         with col2:
-            learning_style = st.selectbox("Learning Style*", ['Visual', 'Auditory', 'Kinesthetic', 'Reading/Writing'])
-            study_niche = st.selectbox("Study Preference*", ['Theoretical', 'Practical', 'Research', 'Applied'])
+            learning_style = st.selectbox("Learning Style*", view.learning_styles)
+            study_niche = st.selectbox("Study Preference*", view.study_niches)
         
         st.subheader("📝 JAMB Subjects")
         jamb_subjects = []
         jamb_cols = st.columns(4)
         
-        # ALL JAMB SUBJECTS - Complete List
-        all_jamb_subjects = [
-            'English Language', 'Mathematics', 'Physics', 'Chemistry', 'Biology',
-            'Economics', 'Government', 'Literature in English', 'Geography',
-            'Agricultural Science', 'Commerce', 'Accounting', 'History',
-            'Christian Religious Studies', 'Islamic Religious Studies', 'Fine Art',
-            'French', 'Arabic', 'Hausa', 'Igbo', 'Yoruba', 'Music'
-        ]
-        
-        for i, subject in enumerate(all_jamb_subjects):
+        for i, subject in enumerate(view.jamb_subjects):
             with jamb_cols[i % 4]:
                 if st.checkbox(subject, key=f"jamb_{i}"):
                     jamb_subjects.append(subject)
         
         st.subheader("📚 O'Level Grades")
-        grades = ['A1', 'B2', 'B3', 'C4', 'C5', 'C6', 'D7', 'E8', 'F9']
         olevel_grades = {}
         
         # Core Subjects (Always visible)
         st.write("**📖 CORE SUBJECTS (Compulsory)**")
-        core_subjects = ['English Language', 'Mathematics', 'Physics', 'Chemistry', 'Biology']
-        core_cols = st.columns(len(core_subjects))
+        core_cols = st.columns(len(view.core_subjects))
         
-        for i, subject in enumerate(core_subjects):
+        for i, subject in enumerate(view.core_subjects):
             with core_cols[i]:
-                grade = st.selectbox(f"{subject}*", grades + ['Not Taken'], index=2, key=f"core_{i}")
-                if grade != 'Not Taken':
+                grade = st.selectbox(f"{subject}*", view.grade_options, index=2, key=f"core_{i}")
+                if grade != NOT_TAKEN:
                     olevel_grades[subject] = grade
         
-        # Social Sciences
-        with st.expander("🏛️ SOCIAL SCIENCES", expanded=True):
-            social_subjects = [
-                'Government', 'Economics', 'Geography', 'History', 'Civic Education',
-                'Social Studies', 'Commerce', 'Accounting'
-            ]
-            social_cols = st.columns(4)
-            for i, subject in enumerate(social_subjects):
-                with social_cols[i % 4]:
-                    grade = st.selectbox(f"{subject}", grades + ['Not Taken'], index=len(grades), key=f"social_{i}")
-                    if grade != 'Not Taken':
-                        olevel_grades[subject] = grade
-        
-        # Languages & Literature
-        with st.expander("📚 LANGUAGES & LITERATURE", expanded=True):
-            lang_subjects = [
-                'Literature in English', 'French', 'Arabic', 'Hausa', 'Igbo', 'Yoruba'
-            ]
-            lang_cols = st.columns(3)
-            for i, subject in enumerate(lang_subjects):
-                with lang_cols[i % 3]:
-                    grade = st.selectbox(f"{subject}", grades + ['Not Taken'], index=len(grades), key=f"lang_{i}")
-                    if grade != 'Not Taken':
-                        olevel_grades[subject] = grade
-        
-        # Arts & Creative
-        with st.expander("🎨 ARTS & CREATIVE", expanded=True):
-            arts_subjects = [
-                'Fine Art', 'Visual Arts', 'Music', 'Technical Drawing'
-            ]
-            arts_cols = st.columns(4)
-            for i, subject in enumerate(arts_subjects):
-                with arts_cols[i]:
-                    grade = st.selectbox(f"{subject}", grades + ['Not Taken'], index=len(grades), key=f"arts_{i}")
-                    if grade != 'Not Taken':
-                        olevel_grades[subject] = grade
-        
-        # Agricultural & Technical
-        with st.expander("🌾 AGRICULTURAL & TECHNICAL", expanded=True):
-            agric_subjects = [
-                'Agricultural Science', 'Animal Husbandry', 'Food and Nutrition',
-                'Home Economics', 'Computer Studies', 'Data Processing'
-            ]
-            agric_cols = st.columns(3)
-            for i, subject in enumerate(agric_subjects):
-                with agric_cols[i % 3]:
-                    grade = st.selectbox(f"{subject}", grades + ['Not Taken'], index=len(grades), key=f"agric_{i}")
-                    if grade != 'Not Taken':
-                        olevel_grades[subject] = grade
-        
-        # Religious Studies
-        with st.expander("⛪ RELIGIOUS STUDIES", expanded=True):
-            rel_subjects = [
-                'Christian Religious Studies', 'Islamic Religious Studies', 'Bible Knowledge'
-            ]
-            rel_cols = st.columns(3)
-            for i, subject in enumerate(rel_subjects):
-                with rel_cols[i]:
-                    grade = st.selectbox(f"{subject}", grades + ['Not Taken'], index=len(grades), key=f"rel_{i}")
-                    if grade != 'Not Taken':
-                        olevel_grades[subject] = grade
-        
-        # Additional Sciences
-        with st.expander("🔬 ADDITIONAL SCIENCES", expanded=True):
-            add_sci_subjects = [
-                'Further Mathematics', 'Statistics', 'Health Education', 'Physical Education'
-            ]
-            add_sci_cols = st.columns(4)
-            for i, subject in enumerate(add_sci_subjects):
-                with add_sci_cols[i]:
-                    grade = st.selectbox(f"{subject}", grades + ['Not Taken'], index=len(grades), key=f"add_sci_{i}")
-                    if grade != 'Not Taken':
-                        olevel_grades[subject] = grade
+        for title, key_prefix, n_cols, subjects in view.olevel_groups:
+            with st.expander(title, expanded=True):
+                group_cols = st.columns(n_cols)
+                for i, subject in enumerate(subjects):
+                    with group_cols[i % n_cols]:
+                        grade = st.selectbox(f"{subject}", view.grade_options, index=len(view.grades), key=f"{key_prefix}_{i}")
+                        if grade != NOT_TAKEN:
+                            olevel_grades[subject] = grade
         
         # Form submission
         submitted = st.form_submit_button("🚀 ANALYZE ADMISSION", type="primary")
         
+        student_data = None
         if submitted:
             # Validation
             if not name or len(jamb_subjects) != 4 or len(olevel_grades) < 5:
                 st.error("Please fill all required fields")
                 return
             
-            # Process admission
             student_data = {
                 'name': name, 'gender': gender, 'state': state,
                 'preferred_course': preferred_course, 'jamb_score': jamb_score,
@@ -193,84 +159,137 @@ def main():
                 'career_interest': 'General', 'financial_status': 'Middle Income',
                 'extracurricular': [], 'work_experience': 'None', 'special_needs': 'None'
             }
-            
-            with st.spinner("Analyzing..."):
-                result = advanced_system.process_comprehensive_admission(student_data)
-                recommendations = result.get('recommendations', [])
-                interaction_id = enhanced_features.save_student_interaction(student_data, result, recommendations)
-            
-            # Store in session state
-            st.session_state.analysis_complete = True
-            st.session_state.result_data = {
-                'result': result,
-                'student_data': student_data,
-                'recommendations': recommendations,
-                'interaction_id': interaction_id
-            }
-            
-            st.success("✅ Analysis completed! See results below.")
     
-    # Display results outside form
-    if st.session_state.get('analysis_complete'):
+    # Display results outside form; a new submission is rendered as the engine streams it
+    if student_data is not None:
+        display_results(advanced_system.stream_comprehensive_admission(student_data), student_data)
+    elif st.session_state.get('analysis_complete'):
         display_results()
 
-def display_results():
-    """Display analysis results with enhanced features"""
-    data = st.session_state.result_data
-    result = data['result']
-    student_data = data['student_data']
-    recommendations = data['recommendations']
-    interaction_id = data['interaction_id']
+def display_results(stream=None, student_data=None):
+    """Display analysis results with enhanced features.
     
+    With an engine stream, each section is drawn as soon as its event arrives and
+    the completed analysis is stored in session state for later reruns.
+    """
     st.markdown("---")
     st.header("🎯 ADMISSION ANALYSIS RESULTS")
     
-    # Quick metrics
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("JAMB Score", student_data['jamb_score'])
-    with col2:
-        st.metric("Status", result['admission_status'])
-    with col3:
-        success_prob = (result.get('success_prediction') or {}).get('probability', 0)
-        st.metric("Success Rate", f"{success_prob:.1%}")
-    with col4:
-        st.metric("Recommendations", len(recommendations))
+    # Sections are laid out up front and filled as data becomes available
+    metrics_area = st.empty()
+    verdict_area = st.empty()
+    tools_area = st.container()
+    recommendations_area = st.container()
     
-    # Main result
-    if result['admission_status'] == 'ADMITTED':
-        st.success(f"🎉 CONGRATULATIONS {result['student_name'].upper()}!")
-        st.success(result['message'])
+    if stream is None:
+        data = st.session_state.result_data
+        result = data['result']
+        student_data = data['student_data']
+        recommendations = data['recommendations']
+        interaction_id = data['interaction_id']
+        for i, rec in enumerate(recommendations[:5], 1):
+            render_recommendation(recommendations_area, i, rec)
     else:
-        st.error(f"❌ NOT QUALIFIED FOR {result['preferred_course'].upper()}")
-        st.error(result['message'])
+        recommendations = []
+        profiler = load_request_profiler()
+        # Only the engine's steps are profiled; rendering between them is not
+        if profiler is not None:
+            stream = profiler.stream('process_comprehensive_admission', stream)
+        for event, payload in stream:
+            if event == 'verdict':
+                render_metrics(metrics_area, student_data, payload, recommendations)
+                render_verdict(verdict_area, payload)
+            elif event == 'recommendation':
+                recommendations.append(payload)
+                if len(recommendations) <= 5:
+                    render_recommendation(recommendations_area, len(recommendations), payload)
+            else:
+                result = payload
+        
+        interaction_id = enhanced_features.save_student_interaction(student_data, result, recommendations)
+        load_training_stats.clear()
+        budget = load_memory_budget()
+        if budget is not None:
+            budget.enforce()
+        
+        # Store in session state
+        st.session_state.analysis_complete = True
+        st.session_state.pdf_requested = False
+        st.session_state.result_data = {
+            'result': result,
+            'student_data': student_data,
+            'recommendations': recommendations,
+            'interaction_id': interaction_id
+        }
+        st.toast("✅ Analysis completed!")
     
-    # Enhanced features
+    render_metrics(metrics_area, student_data, result, recommendations)
+    render_verdict(verdict_area, result)
+    with tools_area:
+        render_tools(student_data, result, recommendations, interaction_id)
+
+def render_metrics(area, student_data, result, recommendations):
+    """Quick metrics row"""
+    with area.container():
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("JAMB Score", student_data['jamb_score'])
+        with col2:
+            st.metric("Status", result['admission_status'])
+        with col3:
+            success_prob = (result.get('success_prediction') or {}).get('probability', 0)
+            st.metric("Success Rate", f"{success_prob:.1%}")
+        with col4:
+            st.metric("Recommendations", len(recommendations))
+
+def render_verdict(area, result):
+    """Preferred course verdict"""
+    with area.container():
+        if result['admission_status'] == 'ADMITTED':
+            st.success(f"🎉 CONGRATULATIONS {result['student_name'].upper()}!")
+            st.success(result['message'])
+        else:
+            st.error(f"❌ NOT QUALIFIED FOR {result['preferred_course'].upper()}")
+            st.error(result['message'])
+
+            related = result.get('related_courses')
+            if related:
+                st.markdown(f"**🔗 Close to {result['preferred_course']} and within your reach:**")
+                for item in related:
+                    st.write(f"• **{item['course']}** ({item['category']}) — "
+                             f"{item['eligible_universities']} eligible universities, similarity {item['similarity']:.0%}")
+
+def render_tools(student_data, result, recommendations, interaction_id):
+    """PDF report, study plan and save buttons"""
     st.subheader("📋 Enhanced Tools")
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         if st.button("📄 Generate PDF Report", type="primary"):
-            with st.spinner("Generating PDF..."):
-                try:
-                    pdf = enhanced_features.generate_pdf_report(student_data, result, recommendations)
-                    pdf_bytes = pdf.output(dest='S')
-                    if isinstance(pdf_bytes, str):
-                        pdf_bytes = pdf_bytes.encode('latin1')
-                    b64_pdf = base64.b64encode(pdf_bytes).decode()
-                    
-                    href = f'<a href="data:application/pdf;base64,{b64_pdf}" download="admission_report.pdf">📥 Download PDF Report</a>'
-                    st.markdown(href, unsafe_allow_html=True)
-                    st.success("✅ PDF generated!")
-                except Exception as e:
-                    st.error(f"PDF generation failed. Showing text report instead.")
-                    st.text_area("Report Content", f"Student: {student_data['name']}\nCourse: {student_data['preferred_course']}\nStatus: {result['admission_status']}\nMessage: {result['message']}", height=200)
+            st.session_state.pdf_requested = True
+        
+        # Rendering runs on the report worker pool; finished PDFs are served from its cache
+        if st.session_state.get('pdf_requested'):
+            pdf_bytes = None
+            try:
+                with st.spinner("Generating PDF..."):
+                    _, future = report_renderer.submit(student_data, result, recommendations)
+                    pdf_bytes = future.result(timeout=5)
+            except (FutureTimeoutError, ReportQueueFull):
+                st.info("⏳ Your report is still being prepared. Click the button again in a moment.")
+            except Exception:
+                st.error(f"PDF generation failed. Showing text report instead.")
+                st.text_area("Report Content", f"Student: {student_data['name']}\nCourse: {student_data['preferred_course']}\nStatus: {result['admission_status']}\nMessage: {result['message']}", height=200)
+            
+            if pdf_bytes is not None:
+                st.download_button("📥 Download PDF Report", data=pdf_bytes,
+                                   file_name="admission_report.pdf", mime="application/pdf")
     
     with col2:
         if st.button("📚 Generate Study Plan", type="primary"):
             with st.spinner("Creating study plan..."):
-                study_plan = enhanced_features.generate_study_plan(student_data, result, recommendations)
+                study_plan = enhanced_features.generate_study_plan(student_data, result, recommendations, snapshot.catalog)
                 st.success("✅ Study plan created!")
                 
                 # Display study plan
@@ -280,34 +299,35 @@ def display_results():
     
     with col3:
         if st.button("💾 Save Analysis", type="primary"):
-            enhanced_features.save_session(f"analysis_{interaction_id}", {
+            session_store.save(f"analysis_{interaction_id}", {
                 'student_data': student_data,
                 'result': result,
                 'recommendations': recommendations
             })
             st.success("✅ Analysis saved!")
-    
-    # Show recommendations
-    if recommendations:
-        st.subheader("💡 Course Recommendations")
+
+def render_recommendation(area, i, rec):
+    """One recommendation card; the first card also draws the section header"""
+    with area:
+        if i == 1:
+            st.subheader("💡 Course Recommendations")
         
-        for i, rec in enumerate(recommendations[:5], 1):
-            with st.expander(f"{i}. {rec['course']} - {rec['success_probability']:.1%} Success Rate"):
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.metric("Category", rec['category'])
-                    st.metric("Difficulty", rec['difficulty'])
-                
-                with col2:
-                    st.metric("Match Score", f"{rec['match_score']:.1f}")
-                    st.metric("Job Demand", rec['job_demand'])
-                
-                with col3:
-                    st.metric("Salary Range", rec['salary_range'])
-                    st.metric("Universities", rec['eligible_universities'])
-                
-                st.info(f"**Why recommended:** {rec['recommendation_reason']}")
+        with st.expander(f"{i}. {rec['course']} - {rec['success_probability']:.1%} Success Rate"):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.metric("Category", rec['category'])
+                st.metric("Difficulty", rec['difficulty'])
+            
+            with col2:
+                st.metric("Match Score", f"{rec['match_score']:.1f}")
+                st.metric("Job Demand", rec['job_demand'])
+            
+            with col3:
+                st.metric("Salary Range", rec['salary_range'])
+                st.metric("Universities", rec['eligible_universities'])
+            
+            st.info(f"**Why recommended:** {rec['recommendation_reason']}")
 
 # Sidebar
 with st.sidebar:
@@ -319,7 +339,7 @@ with st.sidebar:
     st.write("✅ Data Collection & Learning")
     
     st.subheader("📊 System Stats")
-    stats = enhanced_features.get_training_data_stats()
+    stats = load_training_stats()
     st.metric("Total Users", stats['total_interactions'])
     st.metric("System Accuracy", "96.3%")
     
@@ -328,6 +348,8 @@ with st.sidebar:
             del st.session_state.analysis_complete
         if 'result_data' in st.session_state:
             del st.session_state.result_data
+        if 'pdf_requested' in st.session_state:
+            del st.session_state.pdf_requested
         st.rerun()
 
 if __name__ == "__main__":